@@ -0,0 +1,403 @@
+import logging
+from abc import ABC, abstractmethod
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from histogram2d.filters import FilterSettings
+from histogram2d.parallel import ParallelSettings
+from histogram2d.sources import get_data_format, open_data_source
+
+
+def is_group_column_name(column_name: str) -> bool:
+    """
+    Does string contain unnamed substring
+
+    Args:
+        column_name (str): column name
+
+    Returns:
+        bool: whether column name contains unnamed substring - which indicates a merged excell cells
+    """
+    return not "unnamed" in column_name.lower()
+
+
+def get_group_spans(column_names: list[str]) -> list[tuple[str, int, int]]:
+    """
+    Get the name, first column and last column (exclusive) of each group, given the header names
+
+    Args:
+        column_names (list[str]): header of the data file, where merged cells are named "unnamed: x"
+
+    Returns:
+        list[tuple[str, int, int]]: one (group name, start, stop) tuple per group. Empty if no group
+            was identified
+    """
+    group_columns = [
+        [column_name, idx]
+        for idx, column_name in enumerate(column_names)
+        if is_group_column_name(column_name)
+    ]
+    spans = []
+    for idx_group, (group_name, first_column_of_group) in enumerate(group_columns):
+        if idx_group == len(group_columns) - 1:
+            last_column_of_group = len(column_names)
+        else:
+            last_column_of_group = group_columns[idx_group + 1][1]
+        spans.append((group_name, first_column_of_group, last_column_of_group))
+    return spans
+
+
+class DataFrameBackend(ABC):
+    """
+    Engine used to read a grouped data file, split it into groups and convert each group to numeric.
+    Every backend returns the groups as pandas dataframes of numeric columns, so the plotting layer
+    does not depend on the engine.
+    """
+
+    name: str = ""
+
+    def __init__(
+        self,
+        parallel: ParallelSettings = None,
+        filters: FilterSettings = None,
+        logger: logging.Logger | logging.LoggerAdapter = None,
+    ) -> None:
+        self.parallel = parallel or ParallelSettings()
+        # rows filters and clipping, applied while the groups are converted to numeric
+        self.filters = filters
+        # the orchestrator reads with the logger of its run
+        self.logger = logger or logging.getLogger(__name__)
+
+    @abstractmethod
+    def read_groups(self, data_filepath: str) -> tuple[list[pd.DataFrame], list[str]]:
+        """
+        Read data from data file and split it into groups
+
+        Args:
+            data_filepath (str): path to excel or csv file
+
+        Returns:
+            list[pd.DataFrame]: list of dataframes, one per group
+            list[str]: list of group names
+        """
+
+
+class PandasBackend(DataFrameBackend):
+    name = "pandas"
+
+    def read_raw(self, data_filepath, sheet_name: str | int = 0) -> pd.DataFrame:
+        """
+        Read the data file as is, with the group names as header. Compressed files, the standard input
+        and file objects are streamed, see open_data_source. Excel files are read from the sheet
+        sheet_name, the first one by default
+        """
+        data_format = get_data_format(data_filepath)
+        if data_format == "csv":
+            # set read function to pd.read_csv
+            read_function = pd.read_csv
+        else:
+            # set read function to pd.read_excel
+            read_function = partial(pd.read_excel, sheet_name=sheet_name)
+        try:
+            with open_data_source(data_filepath, seekable=data_format == "excel") as stream:
+                df = read_function(stream)
+        except Exception as e:
+            self.logger.error(f"Error reading excel file: {e}")
+            raise e
+        self.logger.debug(">>>>>RAW DATA>>>>>")
+        self.logger.debug(df.head(6))
+        return df
+
+    def read_groups(
+        self, data_filepath: str, sheet_name: str | int = 0
+    ) -> tuple[list[pd.DataFrame], list[str]]:
+        return self.get_groups_df(
+            self.read_raw(data_filepath, sheet_name), self.parallel, self.filters, self.logger
+        )
+
+    @classmethod
+    def get_groups_df(
+        cls,
+        df: pd.DataFrame,
+        parallel: ParallelSettings = None,
+        filters: FilterSettings = None,
+        logger: logging.Logger | logging.LoggerAdapter = None,
+    ) -> tuple[list[pd.DataFrame], list[str]]:
+        """
+        Get the groups of the dataframe. See Orchestrator.get_groups_df. The groups are cleaned up
+        with the parallel settings, serially by default, and filtered with the filters settings
+        """
+        logger = logger or logging.getLogger(__name__)
+        spans = get_group_spans(df.columns)
+        if len(spans) == 0:
+            logger.warning("No groups identified.")
+            logger.warning("Returning the dataframe as a single group")
+            return [df], [""]
+
+        # get the sub dataframe of each group
+        sub_dfs = [
+            df[df.columns[first_column_of_group:last_column_of_group]]
+            for _, first_column_of_group, last_column_of_group in spans
+        ]
+        # cleanup, pandas' object columns conversion holds the GIL
+        dfs_of_groups = (parallel or ParallelSettings()).map(
+            partial(cls.cleanup_group_df, filters=filters, logger=logger),
+            sub_dfs,
+            releases_gil=False,
+        )
+        group_names = [span[0] for span in spans]
+        logger.debug(f"Grouped identified: {group_names}")
+        return dfs_of_groups, group_names
+
+    @staticmethod
+    def cleanup_group_df(
+        df: pd.DataFrame,
+        filters: FilterSettings = None,
+        logger: logging.Logger | logging.LoggerAdapter = None,
+    ) -> pd.DataFrame:
+        """
+        Cleanup the group dataframe by removing the first row and renaming the columns. The columns
+        are converted to numeric arrays, and when filters are given, the rows they reject are
+        dropped and the values clipped on those arrays, before the dataframe of the group is built
+        """
+        logger = logger or logging.getLogger(__name__)
+        # replace columns with the first row
+        df.columns = df.iloc[0]
+        # drop the first row
+        df = df.drop([0])
+
+        # drop rows
+        df = df.dropna()
+
+        # If not numeric, try transforming to numeric
+        columns = {}
+        for column in df.columns:
+            try:
+                columns[column] = pd.to_numeric(df[column]).to_numpy()
+            except:
+                error_message = f"Could not convert column {column} to numeric"
+                logger.error(error_message)
+                raise ValueError(error_message)
+
+        if filters is not None:
+            columns = filters.apply(columns, logger)
+
+        return pd.DataFrame(columns)
+
+
+class ColumnarBackend(DataFrameBackend):
+    """
+    Base for the multithreaded columnar engines. The csv is parsed as strings, with the group names
+    and the feature names as the first two rows, then each group drops its incomplete rows and
+    casts its columns to float64 inside the engine. The numeric buffers are handed over as numpy
+    arrays, without going through pandas' object columns.
+
+    Excel files are not supported by the columnar readers and are delegated to the pandas backend.
+    """
+
+    def read_groups(self, data_filepath) -> tuple[list[pd.DataFrame], list[str]]:
+        if get_data_format(data_filepath) != "csv":
+            self.logger.debug(f"{self.name} backend only reads csv files, using pandas instead")
+            return PandasBackend(self.parallel, self.filters, self.logger).read_groups(
+                data_filepath
+            )
+        try:
+            with open_data_source(data_filepath) as stream:
+                table = self.read_csv_as_strings(stream)
+        except Exception as e:
+            self.logger.error(f"Error reading csv file: {e}")
+            raise e
+        header, feature_names = self.get_header_rows(table)
+        column_names = [name if name else f"Unnamed: {idx}" for idx, name in enumerate(header)]
+        spans = get_group_spans(column_names)
+        if len(spans) == 0:
+            self.logger.warning("No groups identified.")
+            self.logger.warning("Returning the dataframe as a single group")
+            spans = [("", 0, len(column_names))]
+
+        def get_group_df(span: tuple[str, int, int]) -> pd.DataFrame:
+            _, first_column_of_group, last_column_of_group = span
+            columns = self.get_numeric_group(
+                table, range(first_column_of_group, last_column_of_group)
+            )
+            columns = dict(zip(feature_names[first_column_of_group:last_column_of_group], columns))
+            if self.filters is not None:
+                # on the numpy buffers, before the dataframe of the group is built
+                columns = self.filters.apply(columns, self.logger)
+            return pd.DataFrame(columns)
+
+        # the engines release the GIL while dropping nulls and casting, so the table is shared
+        # between threads instead of being copied to other processes
+        parallel = self.parallel
+        if parallel.get_mode() == "process":
+            parallel = ParallelSettings(mode="thread", max_workers=parallel.max_workers)
+        dfs_of_groups = parallel.map(get_group_df, spans)
+        group_names = [span[0] for span in spans]
+        self.logger.debug(f"Grouped identified: {group_names}")
+        return dfs_of_groups, group_names
+
+    @abstractmethod
+    def read_csv_as_strings(self, stream):
+        """
+        Read every cell of the csv stream as a nullable string, without header
+        """
+
+    @abstractmethod
+    def get_header_rows(self, table) -> tuple[list[str], list[str]]:
+        """
+        Get the group names row and the feature names row of the table
+        """
+
+    @abstractmethod
+    def get_numeric_group(self, table, column_indices) -> list[np.ndarray]:
+        """
+        Drop the data rows with missing values in any of the columns and cast the columns to float64
+        """
+
+    @staticmethod
+    def clean_header_cell(cell) -> str:
+        if cell is None:
+            return ""
+        # excel exports to csv often start with a byte order mark
+        return str(cell).lstrip("\ufeff")
+
+
+class PyArrowBackend(ColumnarBackend):
+    name = "pyarrow"
+
+    def __init__(
+        self,
+        parallel: ParallelSettings = None,
+        filters: FilterSettings = None,
+        logger: logging.Logger | logging.LoggerAdapter = None,
+    ) -> None:
+        super().__init__(parallel, filters, logger)
+        try:
+            import pyarrow
+        except ImportError as e:
+            error_message = "pyarrow backend requires pyarrow to be installed"
+            self.logger.error(error_message)
+            raise ImportError(error_message) from e
+
+    def read_csv_as_strings(self, stream):
+        from pyarrow import csv
+
+        return csv.read_csv(
+            stream,
+            read_options=csv.ReadOptions(autogenerate_column_names=True, use_threads=True),
+            convert_options=csv.ConvertOptions(strings_can_be_null=True),
+        )
+
+    def get_header_rows(self, table) -> tuple[list[str], list[str]]:
+        rows = table.slice(0, 2).to_pydict()
+        header = [self.clean_header_cell(column[0]) for column in rows.values()]
+        feature_names = [self.clean_header_cell(column[1]) for column in rows.values()]
+        return header, feature_names
+
+    def get_numeric_group(self, table, column_indices) -> list[np.ndarray]:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        group = table.slice(2).select(list(column_indices)).drop_null()
+        columns = []
+        for column_name, column in zip(group.column_names, group.columns):
+            try:
+                column = pc.cast(column, pa.float64())
+            except pa.ArrowInvalid:
+                error_message = f"Could not convert column {column_name} to numeric"
+                self.logger.error(error_message)
+                raise ValueError(error_message)
+            columns.append(column.to_numpy())
+        return columns
+
+
+class PolarsBackend(ColumnarBackend):
+    name = "polars"
+
+    def __init__(
+        self,
+        parallel: ParallelSettings = None,
+        filters: FilterSettings = None,
+        logger: logging.Logger | logging.LoggerAdapter = None,
+    ) -> None:
+        super().__init__(parallel, filters, logger)
+        try:
+            import polars
+        except ImportError as e:
+            error_message = "polars backend requires polars to be installed"
+            self.logger.error(error_message)
+            raise ImportError(error_message) from e
+
+    def read_csv_as_strings(self, stream):
+        import polars as pl
+
+        return pl.read_csv(stream, has_header=False, infer_schema=False)
+
+    def get_header_rows(self, table) -> tuple[list[str], list[str]]:
+        rows = table.head(2).rows()
+        header = [self.clean_header_cell(cell) for cell in rows[0]]
+        feature_names = [self.clean_header_cell(cell) for cell in rows[1]]
+        return header, feature_names
+
+    def get_numeric_group(self, table, column_indices) -> list[np.ndarray]:
+        import polars as pl
+
+        group = table.slice(2).select([table.columns[idx] for idx in column_indices]).drop_nulls()
+        columns = []
+        for column_name in group.columns:
+            try:
+                column = group[column_name].cast(pl.Float64, strict=True)
+            except pl.exceptions.InvalidOperationError:
+                error_message = f"Could not convert column {column_name} to numeric"
+                self.logger.error(error_message)
+                raise ValueError(error_message)
+            columns.append(column.to_numpy())
+        return columns
+
+
+BACKENDS = {
+    "pandas": PandasBackend,
+    "pyarrow": PyArrowBackend,
+    "polars": PolarsBackend,
+}
+
+
+def get_backend(
+    name: str = "pandas",
+    parallel: ParallelSettings = None,
+    filters: FilterSettings = None,
+    logger: logging.Logger | logging.LoggerAdapter = None,
+) -> DataFrameBackend:
+    """
+    Get the dataframe backend by name
+
+    Args:
+        name (str): one of "pandas", "pyarrow", "polars" or "auto". "auto" picks the first installed
+            of polars and pyarrow, and falls back to pandas
+        parallel (ParallelSettings, optional): executor of the per group cleanup. Defaults to serial
+        filters (FilterSettings, optional): rows filters and clipping. Defaults to None.
+        logger (logging.Logger | logging.LoggerAdapter, optional): logger of the reads. Defaults to
+            the logger of this module.
+
+    Raises:
+        ValueError: If the backend is unknown
+        ImportError: If the backend is not installed
+
+    Returns:
+        DataFrameBackend: backend instance
+    """
+    logger = logger or logging.getLogger(__name__)
+    if name == "auto":
+        for candidate in [PolarsBackend, PyArrowBackend]:
+            try:
+                return candidate(parallel, filters, logger)
+            except ImportError:
+                continue
+        return PandasBackend(parallel, filters, logger)
+    if name not in BACKENDS:
+        error_message = f"Unknown backend {name}. Expected one of {list(BACKENDS)} or auto"
+        logger.error(error_message)
+        raise ValueError(error_message)
+    return BACKENDS[name](parallel, filters, logger)
@@ -1,6 +1,155 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+import logging
+import math
+
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.colors import get_colorscale, sample_colorscale
+
+from histogram2d.kernels import count_groups, count_hexagons, get_hexagon_grid, get_hexagon_vertices
+
+logger = logging.getLogger(__name__)
+
+# key of the sampling metadata in DataFrame.attrs, set when a group is plotted from a sample
+SAMPLING_ATTRS_KEY = "sampling"
+
+
+def round_up(value: float, candidates: list[float], reverse: bool = False) -> float:
+    """
+    Find the smallest candidate above the value, or the largest at most the value if reverse, with
+    the binary search of plotly's roundUp
+    """
+    low, high = 0, len(candidates) - 1
+    while low < high:
+        if reverse:
+            mid = math.ceil((low + high) / 2)
+            if candidates[mid] <= value:
+                low = mid
+            else:
+                high = mid - 1
+        else:
+            mid = (low + high) // 2
+            if candidates[mid] <= value:
+                low = mid + 1
+            else:
+                high = mid
+    return candidates[low]
+
+
+def get_auto_bins(values: np.ndarray) -> tuple[float, float, float]:
+    """
+    Calculate the bins plotly picks for one axis of a 2D histogram trace whose bins are not set, a
+    port of plotly's autoBin: a round size from the spread of the values and the smallest distance
+    between them, and a start shifted so the values do not fall on the edges
+
+    Returns:
+        float: start of the first bin
+        float: end of the last bin
+        float: size of the bins
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    data_min, data_max = float(values.min()), float(values.max())
+    # the smallest distance between distinct values bounds the size from below
+    min_diff = (data_max - data_min) or 1.0
+    differences = np.diff(np.unique(values))
+    differences = differences[differences > min_diff / (len(values) - 1 or 1) / 10000]
+    if len(differences) > 0:
+        min_diff = min(min_diff, float(differences.min()))
+    exponent = 10 ** math.floor(math.log10(min_diff))
+    min_size = exponent * round_up(min_diff / exponent, [0.9, 1.9, 4.9, 9.9], reverse=True)
+    size = max(min_size, 2 * float(values.std()) / len(values) ** 0.25)
+    base = 10 ** math.floor(math.log10(size))
+    size = base * round_up(size / base, [2, 5, 10])
+    start = math.ceil((data_min * 1.0001 - data_max * 0.0001) / size) * size - size
+    if np.all(np.fmod(values, 1) == 0):
+        # integers are centered in their bins
+        if size < 1:
+            start = data_min - size / 2
+        else:
+            start -= 0.5
+            if start + size < data_min:
+                start += size
+    elif np.sum(np.fmod(1 + (values + size / 2 - start) * 100 / size, 100) < 2) < len(values) / 10:
+        # values piled on the edges, and not on the centers, are moved to the centers
+        on_edges = np.fmod(1 + (np.array([data_min, data_max]) - start) * 100 / size, 100) < 2
+        if np.sum(np.fmod(1 + (values - start) * 100 / size, 100) < 2) > len(values) * 0.3 or any(
+            on_edges
+        ):
+            start += size / 2 if start + size / 2 < data_min else -size / 2
+    number_of_bins = 1 + math.floor((data_max - start) / size)
+    # 2D histogram contours get an empty bin on each side, so the contours close
+    return start - size, start + (number_of_bins + 1) * size, size
+
+
+@dataclass
+class BinnedHistogram(object):
+    """
+    Counts of a group on a rectangular grid. Counts are indexed as [y bin, x bin], as plotly's z
+    """
+
+    counts: np.ndarray
+    x_edges: np.ndarray
+    y_edges: np.ndarray
+    normalized: bool = True
+
+    @property
+    def z(self) -> np.ndarray:
+        """
+        Percentage of the data points in each bin if normalized, else the count of each bin
+        """
+        if not self.normalized:
+            return self.counts
+        total = self.counts.sum()
+        if total == 0:
+            return np.zeros(self.counts.shape)
+        return self.counts * 100.0 / total
+
+    @property
+    def x_centers(self) -> np.ndarray:
+        return (self.x_edges[:-1] + self.x_edges[1:]) / 2
+
+    @property
+    def y_centers(self) -> np.ndarray:
+        return (self.y_edges[:-1] + self.y_edges[1:]) / 2
+
+
+@dataclass
+class HexbinnedHistogram(object):
+    """
+    Counts of a group on a hexagonal grid, one per hexagon, with the centers of the hexagons and
+    the spacings of the grid, see get_hexagon_grid
+    """
+
+    counts: np.ndarray
+    x_centers: np.ndarray
+    y_centers: np.ndarray
+    x_size: float
+    y_size: float
+    normalized: bool = True
+
+    @property
+    def z(self) -> np.ndarray:
+        """
+        Percentage of the data points in each hexagon if normalized, else the count of each hexagon
+        """
+        if not self.normalized:
+            return self.counts
+        total = self.counts.sum()
+        if total == 0:
+            return np.zeros(self.counts.shape)
+        return self.counts * 100.0 / total
+
+    def get_vertices(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the corners of each hexagon
+
+        Returns:
+            np.ndarray: hexagons x 6 x of the corners
+            np.ndarray: hexagons x 6 y of the corners
+        """
+        return get_hexagon_vertices(self.x_centers, self.y_centers, self.x_size, self.y_size)
 
 
 @dataclass
@@ -27,6 +176,19 @@ class Histogram2DContourSettings(object):
     normalized: bool = True
     xbins: dict = field(default_factory=dict)
     ybins: dict = field(default_factory=dict)
+    bin_shape: str = "rectangle"
+    hexagon_gridsize: int = 30
+
+    BIN_SHAPES = ("rectangle", "hexagon")
+    # number of fill colors of the hexagons, sampled from the colorscale
+    HEXAGON_COLORS = 32
+
+    def __post_init__(self):
+        if self.bin_shape not in self.BIN_SHAPES:
+            error_message = f"Unknown bin shape {self.bin_shape}. Expected one of {self.BIN_SHAPES}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
     def define_bins(self):
         if self.feature_1_bin_size is None:
             self.xbins = dict()
@@ -51,12 +213,302 @@ class Histogram2DContourSettings(object):
             except Exception as e:
                 self.ybins = dict()
         return
+
+    @staticmethod
+    def resolve_bins(values: np.ndarray, bins: dict) -> dict:
+        """
+        Get plotly's bins definition (start, end, size) of one axis with what plotly auto calculates
+        from the values filled in: the size when it is not defined, and the start and end too when
+        they are not defined either
+        """
+        values = np.asarray(values, dtype=float)
+        if bins.get("size") or not np.isfinite(values).any():
+            return bins
+        start, end, size = get_auto_bins(values)
+        # a start and end without a range between them are not bins, the whole range is binned
+        bins_start, bins_end = bins.get("start"), bins.get("end")
+        if bins_start is not None and bins_end is not None and bins_end > bins_start:
+            start, end = bins_start, bins_end
+        return dict(start=float(start), end=float(end), size=float(size))
+
+    @classmethod
+    def get_axis_edges(cls, values: np.ndarray, bins: dict) -> np.ndarray:
+        """
+        Get the bin edges of one axis from plotly's bins definition (start, end, size), the bins
+        plotly draws: from start, as many bins as fit before end. Undefined bins are auto calculated
+        from the values as plotly does
+        """
+        bins = cls.resolve_bins(values, bins)
+        if not bins.get("size"):
+            return np.array([0.0, 1.0])
+        start, end, size = bins["start"], bins["end"], bins["size"]
+        # an end on an edge closes the last bin, plotly's rounding tolerance included
+        number_of_bins = max(int(math.ceil((end - start) / size - 1e-6)), 1)
+        return start + size * np.arange(number_of_bins + 1)
+
+    def bin_dataframe(self, df: pd.DataFrame) -> BinnedHistogram:
+        """
+        Count the data points of the dataframe on the same grid the histogram traces use
+        """
+        self.define_bins()
+        x = df[self.x_axis_title].to_numpy(dtype=float)
+        y = df[self.y_axis_title].to_numpy(dtype=float)
+        x_edges = self.get_axis_edges(x, self.xbins)
+        y_edges = self.get_axis_edges(y, self.ybins)
+        counts, _, _ = np.histogram2d(y, x, bins=[y_edges, x_edges])
+        sampling = df.attrs.get(SAMPLING_ATTRS_KEY)
+        if sampling is not None:
+            # a uniform sample, scaled up to the size of the group
+            counts = counts * sampling["weight"]
+        return BinnedHistogram(
+            counts=counts, x_edges=x_edges, y_edges=y_edges, normalized=self.normalized
+        )
+
+    @staticmethod
+    def get_hexagon_range(values: np.ndarray, start: float, end: float) -> tuple[float, float]:
+        """
+        Get the range of one axis covered by the hexagons: the range of the feature in the settings
+        when it is set, else the range of the values
+        """
+        if start is not None and end is not None and end > start:
+            return float(start), float(end)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return 0.0, 1.0
+        start, end = float(values.min()), float(values.max())
+        if end == start:
+            return start - 0.5, end + 0.5
+        return start, end
+
+    def bin_hexagons(self, df: pd.DataFrame) -> HexbinnedHistogram:
+        """
+        Count the data points of the dataframe on a hexagonal grid of its own, independent of the
+        rectangular bins: hexagon_gridsize hexagons across the range of x, see get_hexagon_grid
+        """
+        x = df[self.x_axis_title].to_numpy(dtype=float)
+        y = df[self.y_axis_title].to_numpy(dtype=float)
+        x_range = self.get_hexagon_range(x, self.min_feature_1, self.max_feature_1)
+        y_range = self.get_hexagon_range(y, self.min_feature_2, self.max_feature_2)
+        counts, x_centers, y_centers = count_hexagons(x, y, x_range, y_range, self.hexagon_gridsize)
+        x_size, y_size, _, _ = get_hexagon_grid(x_range, y_range, self.hexagon_gridsize)
+        sampling = df.attrs.get(SAMPLING_ATTRS_KEY)
+        if sampling is not None:
+            counts = counts * sampling["weight"]
+        return HexbinnedHistogram(
+            counts=counts,
+            x_centers=x_centers,
+            y_centers=y_centers,
+            x_size=x_size,
+            y_size=y_size,
+            normalized=self.normalized,
+        )
+
+    def has_bin_sizes(self) -> bool:
+        """
+        Check whether the bin sizes of both axes are defined, so every group is drawn on the same grid
+        instead of the grid plotly auto sizes for it
+        """
+        self.define_bins()
+        return bool(self.xbins.get("size") and self.ybins.get("size"))
+
+    def get_shared_grid_settings(self, dfs: list[pd.DataFrame]) -> "Histogram2DContourSettings":
+        """
+        Get the settings with the bins of both axes defined, so all the dataframes can be counted on
+        one shared grid. Undefined bins are auto calculated from the data points of all the
+        dataframes, as plotly would for a single trace of them all
+        """
+        if self.has_bin_sizes():
+            return self
+        x = np.concatenate([df[self.x_axis_title].to_numpy(dtype=float) for df in dfs])
+        y = np.concatenate([df[self.y_axis_title].to_numpy(dtype=float) for df in dfs])
+        xbins = self.resolve_bins(x, self.xbins)
+        ybins = self.resolve_bins(y, self.ybins)
+        if not (xbins.get("size") and ybins.get("size")):
+            return self
+        # define_bins starts the grid one bin size below the minimum
+        settings = replace(
+            self,
+            min_feature_1=xbins["start"] + xbins["size"],
+            max_feature_1=xbins["end"],
+            feature_1_bin_size=xbins["size"],
+            min_feature_2=ybins["start"] + ybins["size"],
+            max_feature_2=ybins["end"],
+            feature_2_bin_size=ybins["size"],
+        )
+        settings.define_bins()
+        return settings
+
+    def count_dataframes(
+        self, dfs: list[pd.DataFrame], use_jit: bool = True
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Count the data points of all the dataframes on one shared grid with a fused kernel, a single
+        pass over the rows of every group. When the bins are not defined, the grid is the one of
+        get_shared_grid_settings
+
+        Args:
+            dfs (list[pd.DataFrame]): groups
+            use_jit (bool, optional): use the numba compiled kernel if numba is installed.
+                Defaults to True.
+
+        Returns:
+            np.ndarray: groups x y bins x x bins counts
+            np.ndarray: edges of the x bins
+            np.ndarray: edges of the y bins
+        """
+        settings = self.get_shared_grid_settings(dfs)
+        x = np.concatenate([df[self.x_axis_title].to_numpy(dtype=float) for df in dfs])
+        y = np.concatenate([df[self.y_axis_title].to_numpy(dtype=float) for df in dfs])
+        group_index = np.repeat(np.arange(len(dfs)), [len(df) for df in dfs])
+        x_edges = self.get_axis_edges(x, settings.xbins)
+        y_edges = self.get_axis_edges(y, settings.ybins)
+        counts = count_groups(group_index, y, x, y_edges, x_edges, len(dfs), use_jit)
+        # sampled groups are scaled up to their size, as in bin_dataframe
+        weights = [df.attrs.get(SAMPLING_ATTRS_KEY, {}).get("weight", 1) for df in dfs]
+        counts *= np.reshape(weights, (-1, 1, 1))
+        return counts, x_edges, y_edges
+
+    def bin_dataframes(
+        self, dfs: list[pd.DataFrame], use_jit: bool = True
+    ) -> list[BinnedHistogram]:
+        """
+        Count the data points of all the dataframes on the grids the histogram traces use. When the
+        bin sizes are defined, the grid is shared and counted in a single pass over the rows of every
+        group, the counts of each group being views of the groups x y bins x x bins array. Else
+        each group is binned on the grid plotly auto sizes for it
+        """
+        if not self.has_bin_sizes():
+            return [self.bin_dataframe(df) for df in dfs]
+        counts, x_edges, y_edges = self.count_dataframes(dfs, use_jit)
+        return [
+            BinnedHistogram(
+                counts=group_counts, x_edges=x_edges, y_edges=y_edges, normalized=self.normalized
+            )
+            for group_counts in counts
+        ]
+
     def get_z_colorbar_label(self):
         if self.normalized:
             return "Percentage"
         else:
             return "Count"
 
+    def create_binned_contour(self, binned: BinnedHistogram, meta: dict = None):
+        """
+        Create a contour trace from an already binned group, styled as the histogram traces, so
+        plotly draws the grid without binning the data points again
+        """
+        colorbar = dict(title=self.get_z_colorbar_label())
+        if self.normalized:
+            colorbar["ticksuffix"] = "%"
+        return go.Contour(
+            x=binned.x_centers,
+            y=binned.y_centers,
+            z=binned.z,
+            meta=meta,
+            colorscale=self.colorscale,
+            contours=self.contours,
+            zmin=self.hist_colorbar_min,
+            zmax=self.hist_colorbar_max,
+            colorbar=colorbar,
+        )
+
+    def get_hexagon_z_range(self, binned: list[HexbinnedHistogram]) -> tuple[float, float]:
+        """
+        Get the colorbar range of the hexagons, from the settings when set, else from 0 to the
+        highest hexagon of the groups
+        """
+        zmin, zmax = self.hist_colorbar_min, self.hist_colorbar_max
+        if zmin is None or zmax is None or zmax <= zmin:
+            zmin = 0.0
+            zmax = max(float(group.z.max(initial=0)) for group in binned)
+        if zmax <= zmin:
+            zmax = zmin + 1
+        return zmin, zmax
+
+    def create_hexbin_traces(
+        self, binned: HexbinnedHistogram, meta: dict = None, z_range: tuple[float, float] = None
+    ) -> list[go.Scatter]:
+        """
+        Create the traces drawing the hexagons holding data points as filled polygons, one trace
+        per band of the colorscale, the hexagons of a band separated by gaps. A last trace of
+        transparent markers at the centers of the hexagons holds the colorbar and the hover values
+
+        Args:
+            binned (HexbinnedHistogram): hexagonal counts of the group
+            meta (dict, optional): meta of the traces, the sampling of the group
+            z_range (tuple[float, float], optional): colorbar range. Defaults to the one of
+                get_hexagon_z_range for this group.
+        """
+        zmin, zmax = z_range or self.get_hexagon_z_range([binned])
+        filled = binned.counts > 0
+        z = binned.z[filled]
+        x_vertices, y_vertices = binned.get_vertices()
+        x_vertices, y_vertices = x_vertices[filled], y_vertices[filled]
+        bands = np.clip(
+            np.floor((z - zmin) / (zmax - zmin) * self.HEXAGON_COLORS), 0, self.HEXAGON_COLORS - 1
+        ).astype(int)
+        colorscale = get_colorscale(self.colorscale)
+        colors = sample_colorscale(
+            colorscale, (np.arange(self.HEXAGON_COLORS) + 0.5) / self.HEXAGON_COLORS
+        )
+        line = dict(width=0.5 if self.contour_show_lines else 0, color="white")
+        traces = []
+        for band in np.unique(bands):
+            in_band = bands == band
+            # each polygon is closed on its first corner and followed by a gap
+            x = np.column_stack(
+                [x_vertices[in_band], x_vertices[in_band, :1], np.full(in_band.sum(), np.nan)]
+            )
+            y = np.column_stack(
+                [y_vertices[in_band], y_vertices[in_band, :1], np.full(in_band.sum(), np.nan)]
+            )
+            traces.append(
+                go.Scatter(
+                    x=x.ravel(),
+                    y=y.ravel(),
+                    mode="lines",
+                    fill="toself",
+                    fillcolor=colors[band],
+                    line=line,
+                    hoverinfo="skip",
+                    showlegend=False,
+                )
+            )
+        colorbar = dict(title=self.get_z_colorbar_label())
+        if self.normalized:
+            colorbar["ticksuffix"] = "%"
+        traces.append(
+            go.Scatter(
+                x=binned.x_centers[filled],
+                y=binned.y_centers[filled],
+                mode="markers",
+                meta=meta,
+                marker=dict(
+                    color=z,
+                    colorscale=colorscale,
+                    cmin=zmin,
+                    cmax=zmax,
+                    opacity=0,
+                    showscale=True,
+                    colorbar=colorbar,
+                ),
+                showlegend=False,
+            )
+        )
+        return traces
+
+    def create_traces(self, df: pd.DataFrame) -> list:
+        """
+        Create the traces drawing the group: the filled hexagons with hexagonal bins, else the
+        histogram contour
+        """
+        if self.bin_shape == "hexagon":
+            return self.create_hexbin_traces(
+                self.bin_hexagons(df), meta=df.attrs.get(SAMPLING_ATTRS_KEY)
+            )
+        return [self.create_histogram2dcontour(df)]
+
     def create_histogram2dcontour(self, df: pd.DataFrame):
         if self.normalized:
             return self.create_frequency_histogram2dcontour(df)
@@ -66,15 +518,22 @@ class Histogram2DContourSettings(object):
 
     def create_count_histogram2dcontour(self, df: pd.DataFrame):
         self.define_bins()
+        sampling = df.attrs.get(SAMPLING_ATTRS_KEY)
+        weights = dict()
+        if sampling is not None:
+            # each sampled point stands for weight points of the group
+            weights = dict(z=np.full(len(df), sampling["weight"]), histfunc="sum")
         hist_data = go.Histogram2dContour(
             x=df[self.x_axis_title],
             y=df[self.y_axis_title],
+            meta=sampling,
+            **weights,
             colorscale=self.colorscale,
             contours=self.contours,
             zmin=self.hist_colorbar_min,
             zmax=self.hist_colorbar_max,
-            xbins=self.xbins,
-            ybins=self.ybins,
+            xbins=self.resolve_bins(df[self.x_axis_title], self.xbins),
+            ybins=self.resolve_bins(df[self.y_axis_title], self.ybins),
             colorbar=dict(title=self.get_z_colorbar_label()),
         )
 
@@ -85,13 +544,14 @@ class Histogram2DContourSettings(object):
         hist_data = go.Histogram2dContour(
             x=df[self.x_axis_title],
             y=df[self.y_axis_title],
+            meta=df.attrs.get(SAMPLING_ATTRS_KEY),
             colorscale=self.colorscale,
             contours=self.contours,
             histnorm="percent",
             zmin=self.hist_colorbar_min,
             zmax=self.hist_colorbar_max,
-            xbins=self.xbins,
-            ybins=self.ybins,
+            xbins=self.resolve_bins(df[self.x_axis_title], self.xbins),
+            ybins=self.resolve_bins(df[self.y_axis_title], self.ybins),
             colorbar=dict(title=self.get_z_colorbar_label(), ticksuffix="%"),
         )
 
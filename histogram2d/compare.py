@@ -0,0 +1,147 @@
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+from histogram2d.builder import BinnedHistogram
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ComparisonSettings(object):
+    """
+    Settings of the comparison of the groups on a shared grid. All the pairs are computed at once,
+    as (groups x groups x bins) arrays, so memory grows with the square of the number of groups.
+
+    metric:
+        "difference": difference of the percentages of each bin, in percentage points. The distance
+            is the total variation distance, in percentage points
+        "ratio": log2 of the ratio of the percentages of each bin. The distance is the mean absolute
+            log2 ratio over the bins where either group has data points
+        "kl": contribution of each bin to the Kullback-Leibler divergence of the first group from
+            the second one, negative where the first group is less frequent than the second one. The
+            distance is the divergence, in bits
+        "cdf_l1": absolute difference of the 2D cumulative distributions at each bin. The distance
+            is its mean over the bins. Unlike the differences of the percentages, it grows with how
+            far the data points moved, although it is not an earth mover's distance in 2D
+    """
+
+    metric: str = "difference"
+    reference: str = None
+    epsilon: float = 1e-6
+    colorscale: str = "RdBu_r"
+
+    METRICS = ("difference", "ratio", "kl", "cdf_l1")
+    # metrics whose maps are negative where the first group is less frequent, drawn around 0
+    SIGNED_METRICS = ("difference", "ratio", "kl")
+
+    def __post_init__(self):
+        if self.metric not in self.METRICS:
+            error_message = (
+                f"Unknown comparison metric {self.metric}. Expected one of {self.METRICS}"
+            )
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+    @staticmethod
+    def get_probabilities(binned: list[BinnedHistogram]) -> np.ndarray:
+        """
+        Stack the groups binned on a shared grid as probabilities
+
+        Returns:
+            np.ndarray: groups x y bins x x bins array, each group summing to 1
+        """
+        counts = np.stack([group.counts for group in binned]).astype(float)
+        totals = counts.sum(axis=(1, 2), keepdims=True)
+        return np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+
+    def compute_maps(self, probabilities: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """
+        Compute the map of the metric of every pair of groups as one batched operation
+
+        Args:
+            probabilities (np.ndarray): groups x y bins x x bins probabilities
+            rows (np.ndarray, optional): index of the groups compared against all the others.
+                Defaults to all the groups.
+
+        Returns:
+            np.ndarray: rows x groups x y bins x x bins maps, where [i, j] compares rows[i] to group j
+        """
+        if rows is None:
+            rows = np.arange(len(probabilities))
+        first = probabilities[rows][:, None]
+        second = probabilities[None, :]
+        if self.metric == "difference":
+            return (first - second) * 100
+        if self.metric == "ratio":
+            return np.log2((first + self.epsilon) / (second + self.epsilon))
+        if self.metric == "kl":
+            return first * np.log2((first + self.epsilon) / (second + self.epsilon))
+        cumulative = probabilities.cumsum(axis=1).cumsum(axis=2)
+        return np.abs(cumulative[rows][:, None] - cumulative[None, :])
+
+    def compute_distances(
+        self, probabilities: np.ndarray, maps: np.ndarray, rows: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Reduce the maps of every pair of groups to a distance
+
+        Returns:
+            np.ndarray: rows x groups distance matrix
+        """
+        if rows is None:
+            rows = np.arange(len(probabilities))
+        if self.metric == "difference":
+            return np.abs(maps).sum(axis=(2, 3)) / 2
+        if self.metric == "ratio":
+            occupied = (probabilities[rows][:, None] > 0) | (probabilities[None, :] > 0)
+            occupied_bins = occupied.sum(axis=(2, 3))
+            total = np.where(occupied, np.abs(maps), 0).sum(axis=(2, 3))
+            return np.divide(
+                total, occupied_bins, out=np.zeros(total.shape), where=occupied_bins > 0
+            )
+        if self.metric == "kl":
+            return maps.sum(axis=(2, 3))
+        return maps.mean(axis=(2, 3))
+
+    def get_rows(self, groups: list[str]) -> np.ndarray:
+        """
+        Get the index of the groups compared against all the others: the reference group if set,
+        else every group
+
+        Raises:
+            ValueError: If the reference group does not exist
+        """
+        if self.reference is None:
+            return np.arange(len(groups))
+        if self.reference not in groups:
+            error_message = f"Reference group {self.reference} does not exist in {groups}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+        return np.array([groups.index(self.reference)])
+
+    def get_map_label(self) -> str:
+        return {
+            "difference": "Difference (pp)",
+            "ratio": "log2 ratio",
+            "kl": "KL (bits)",
+            "cdf_l1": "CDF difference",
+        }[self.metric]
+
+    def compare(
+        self, binned: list[BinnedHistogram], groups: list[str]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Compare the groups binned on a shared grid
+
+        Returns:
+            np.ndarray: index of the groups compared against all the others
+            np.ndarray: rows x groups x y bins x x bins maps
+            np.ndarray: rows x groups distance matrix
+        """
+        rows = self.get_rows(groups)
+        probabilities = self.get_probabilities(binned)
+        maps = self.compute_maps(probabilities, rows)
+        distances = self.compute_distances(probabilities, maps, rows)
+        return rows, maps, distances
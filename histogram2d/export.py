@@ -0,0 +1,187 @@
+import logging
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from histogram2d.builder import SAMPLING_ATTRS_KEY, BinnedHistogram
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExportSettings(object):
+    """
+    Settings of the export of the numbers behind the figures. Each group's bins, with their edges,
+    counts and percentages, and the summary statistics of each feature are written next to the
+    figures, so they can be analysed without reading and binning the raw data again.
+
+    formats:
+        "csv": bins.csv and statistics.csv, one row per bin and per group
+        "parquet": bins.parquet and statistics.parquet, the same tables. Requires pyarrow
+        "npz": binned.npz, with the counts_<i>, x_edges_<i> and y_edges_<i> arrays of the i-th group
+            of the groups array, and the statistics table as one array per column
+    """
+
+    formats: list[str] = field(default_factory=lambda: ["csv"])
+    quantiles: list[float] = field(default_factory=lambda: [0.05, 0.25, 0.5, 0.75, 0.95])
+
+    FORMATS = ("csv", "parquet", "npz")
+    BINS_NAME = "bins"
+    STATISTICS_NAME = "statistics"
+    NPZ_NAME = "binned"
+
+    def __post_init__(self):
+        unknown_formats = [extension for extension in self.formats if extension not in self.FORMATS]
+        if len(unknown_formats) > 0:
+            error_message = (
+                f"Unknown export formats {unknown_formats}. Expected any of {self.FORMATS}"
+            )
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+    def get_filenames(self) -> list[str]:
+        """
+        Get the filenames written in the formats of the settings
+        """
+        filenames = []
+        for extension in self.formats:
+            if extension == "npz":
+                filenames.append(f"{self.NPZ_NAME}.npz")
+            else:
+                filenames.append(f"{self.BINS_NAME}.{extension}")
+                filenames.append(f"{self.STATISTICS_NAME}.{extension}")
+        return filenames
+
+    def get_statistics(
+        self, dfs: list[pd.DataFrame], groups: list[str], features: list[str]
+    ) -> pd.DataFrame:
+        """
+        Summarize each feature of each group: number of data points, minimum, maximum, mean and
+        quantiles. For sampled groups, n is the number of rows of the whole group and the other
+        statistics are estimated from the sample
+
+        Returns:
+            pd.DataFrame: one row per group and feature
+        """
+        rows = []
+        for df, group in zip(dfs, groups):
+            sampling = df.attrs.get(SAMPLING_ATTRS_KEY)
+            number_of_rows = len(df) if sampling is None else sampling["total_rows"]
+            values = df[features].to_numpy(dtype=float)
+            empty = len(values) == 0
+            quantiles = (
+                np.full((len(self.quantiles), len(features)), np.nan)
+                if empty
+                else np.quantile(values, self.quantiles, axis=0)
+            )
+            for idx, feature in enumerate(features):
+                row = {
+                    "group": group,
+                    "feature": feature,
+                    "n": number_of_rows,
+                    "min": np.nan if empty else values[:, idx].min(),
+                    "max": np.nan if empty else values[:, idx].max(),
+                    "mean": np.nan if empty else values[:, idx].mean(),
+                }
+                for quantile, value in zip(self.quantiles, quantiles[:, idx]):
+                    row[f"q{quantile:g}"] = value
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def get_bins(binned: list[BinnedHistogram], groups: list[str]) -> pd.DataFrame:
+        """
+        Flatten the binned groups into one table
+
+        Returns:
+            pd.DataFrame: one row per group and bin, with the bin edges, its count and the percentage
+                of the group in it
+        """
+        tables = []
+        for group_binned, group in zip(binned, groups):
+            x_start, y_start = np.meshgrid(group_binned.x_edges[:-1], group_binned.y_edges[:-1])
+            x_end, y_end = np.meshgrid(group_binned.x_edges[1:], group_binned.y_edges[1:])
+            total = group_binned.counts.sum()
+            percentage = (
+                group_binned.counts * 100.0 / total
+                if total > 0
+                else np.zeros(group_binned.counts.shape)
+            )
+            tables.append(
+                pd.DataFrame(
+                    {
+                        "group": group,
+                        "x_start": x_start.ravel(),
+                        "x_end": x_end.ravel(),
+                        "y_start": y_start.ravel(),
+                        "y_end": y_end.ravel(),
+                        "count": group_binned.counts.ravel(),
+                        "percentage": percentage.ravel(),
+                    }
+                )
+            )
+        return pd.concat(tables, ignore_index=True)
+
+    def write(
+        self,
+        folder: str,
+        binned: list[BinnedHistogram],
+        groups: list[str],
+        statistics: pd.DataFrame,
+        filenames: list[str] = None,
+    ) -> list[str]:
+        """
+        Write the binned groups and their statistics in every format of the settings
+
+        Args:
+            folder (str): folder of the run
+            binned (list[BinnedHistogram]): binned grid of each group, as plotted
+            groups (list[str]): group names
+            statistics (pd.DataFrame): statistics of the groups, from get_statistics
+            filenames (list[str], optional): the files to write. Defaults to all of them.
+
+        Returns:
+            list[str]: filenames written
+
+        Raises:
+            ImportError: If parquet is requested and pyarrow is not installed
+        """
+        if filenames is None:
+            filenames = self.get_filenames()
+        bins = None
+        written = []
+        for filename in filenames:
+            filepath = os.path.join(folder, filename)
+            name, extension = os.path.splitext(filename)
+            if extension == ".npz":
+                arrays = {"groups": np.array(groups, dtype=str)}
+                for idx, group_binned in enumerate(binned):
+                    arrays[f"counts_{idx}"] = group_binned.counts
+                    arrays[f"x_edges_{idx}"] = group_binned.x_edges
+                    arrays[f"y_edges_{idx}"] = group_binned.y_edges
+                for column in statistics.columns:
+                    arrays[f"statistics_{column}"] = statistics[column].to_numpy(
+                        dtype=str if column in ("group", "feature") else float
+                    )
+                np.savez_compressed(filepath, **arrays)
+                written.append(filename)
+                continue
+            if name == self.BINS_NAME:
+                if bins is None:
+                    bins = self.get_bins(binned, groups)
+                table = bins
+            else:
+                table = statistics
+            if extension == ".csv":
+                table.to_csv(filepath, index=False)
+            else:
+                try:
+                    table.to_parquet(filepath, index=False)
+                except ImportError as e:
+                    error_message = "Parquet export requires pyarrow to be installed"
+                    logger.error(error_message)
+                    raise ImportError(error_message) from e
+            written.append(filename)
+        return written
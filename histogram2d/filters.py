@@ -0,0 +1,139 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Mapping
+
+import numpy as np
+
+OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+# feature name, operator and value, as "Area > 1000"
+EXPRESSION_PATTERN = re.compile(r"^\s*([^<>=!]+?)\s*(>=|<=|==|!=|>|<)\s*(\S+)\s*$")
+
+
+@dataclass
+class RowFilter(object):
+    """
+    Condition on the value of one feature that a row has to meet to be kept
+    """
+
+    feature: str
+    operator: str
+    value: float
+
+    def __post_init__(self):
+        if self.operator not in OPERATORS:
+            error_message = (
+                f"Unknown filter operator {self.operator}. Expected one of {list(OPERATORS)}"
+            )
+            logging.getLogger(__name__).error(error_message)
+            raise ValueError(error_message)
+
+    @classmethod
+    def parse(cls, expression: str) -> "RowFilter":
+        """
+        Parse a filter expression, a feature name, an operator and a number, as "Area > 1000"
+
+        Raises:
+            ValueError: If the expression is not a comparison of a feature with a number
+        """
+        match = EXPRESSION_PATTERN.match(expression)
+        try:
+            return cls(match.group(1), match.group(2), float(match.group(3)))
+        except (AttributeError, ValueError) as e:
+            error_message = (
+                f"Could not parse filter {expression}. Expected <feature> <operator> <number>"
+            )
+            logging.getLogger(__name__).error(error_message)
+            raise ValueError(error_message) from e
+
+    def get_mask(self, values: np.ndarray) -> np.ndarray:
+        """
+        Whether each value meets the condition
+        """
+        return OPERATORS[self.operator](values, self.value)
+
+
+@dataclass
+class FilterSettings(object):
+    """
+    Settings of the rows kept from the data file. The filters and the clipping are applied while
+    each group is converted to numeric, so the rejected rows never make it into the groups, nor into
+    the features ranges, the binning or the figures.
+
+    filters: conditions every kept row meets, as RowFilter or expressions such as "Area > 1000" or
+        "Intensity <= 0.5". A feature filtered must exist in every group
+    clip: (minimum, maximum) of the values of each feature, either of them None for no bound. Values
+        out of the bounds are set to the bound, after the rows are filtered
+    """
+
+    filters: list[str | RowFilter] = field(default_factory=list)
+    clip: dict[str, tuple[float, float]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # fail on invalid expressions when the settings are created, not while reading
+        self.get_row_filters()
+
+    def get_row_filters(self) -> list[RowFilter]:
+        return [
+            row_filter if isinstance(row_filter, RowFilter) else RowFilter.parse(row_filter)
+            for row_filter in self.filters
+        ]
+
+    def get_mask(
+        self, columns: Mapping, logger: logging.Logger | logging.LoggerAdapter = None
+    ) -> np.ndarray:
+        """
+        Whether each row meets every filter
+
+        Args:
+            columns (Mapping): numeric values of each feature, as a dataframe or a dict of arrays
+            logger (logging.Logger | logging.LoggerAdapter, optional): logger of the read, as
+                the one of the run of the orchestrator. Defaults to the logger of this module.
+
+        Returns:
+            np.ndarray: mask of the rows kept, None when there is no filter
+
+        Raises:
+            ValueError: If a filtered feature is not one of the columns
+        """
+        mask = None
+        for row_filter in self.get_row_filters():
+            if row_filter.feature not in columns:
+                error_message = (
+                    f"Filtered feature {row_filter.feature} does not exist in {list(columns)}"
+                )
+                (logger or logging.getLogger(__name__)).error(error_message)
+                raise ValueError(error_message)
+            feature_mask = row_filter.get_mask(np.asarray(columns[row_filter.feature], dtype=float))
+            mask = feature_mask if mask is None else mask & feature_mask
+        return mask
+
+    def clip_values(self, feature: str, values: np.ndarray) -> np.ndarray:
+        """
+        Clip the values of a feature to its bounds, if it has any
+        """
+        lower, upper = self.clip.get(feature, (None, None))
+        if lower is None and upper is None:
+            return values
+        return np.clip(values, lower, upper)
+
+    def apply(
+        self,
+        columns: dict[str, np.ndarray],
+        logger: logging.Logger | logging.LoggerAdapter = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Filter the rows of the numeric columns of a group and clip their values, see get_mask
+        """
+        mask = self.get_mask(columns, logger)
+        return {
+            feature: self.clip_values(feature, values if mask is None else values[mask])
+            for feature, values in columns.items()
+        }
@@ -0,0 +1,222 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def get_bin_index(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Get the bin of each value, as np.histogram does: bins are closed on the left, the last one also on
+    the right. Values out of the edges, and NaN, get -1
+    """
+    number_of_bins = len(edges) - 1
+    index = np.searchsorted(edges, values, side="right") - 1
+    index[values == edges[-1]] = number_of_bins - 1
+    index[(index < 0) | (index >= number_of_bins)] = -1
+    return index
+
+
+def count_groups_numpy(
+    group_index: np.ndarray,
+    y: np.ndarray,
+    x: np.ndarray,
+    y_edges: np.ndarray,
+    x_edges: np.ndarray,
+    number_of_groups: int,
+) -> np.ndarray:
+    """
+    Count the rows of every group on the grid with one bincount over the combined
+    (group, y bin, x bin) index of each row
+
+    Returns:
+        np.ndarray: groups x y bins x x bins counts
+    """
+    number_of_y_bins = len(y_edges) - 1
+    number_of_x_bins = len(x_edges) - 1
+    y_index = get_bin_index(y, y_edges)
+    x_index = get_bin_index(x, x_edges)
+    inside = (y_index >= 0) & (x_index >= 0)
+    codes = (group_index[inside] * number_of_y_bins + y_index[inside]) * number_of_x_bins + x_index[
+        inside
+    ]
+    size = number_of_groups * number_of_y_bins * number_of_x_bins
+    counts = np.bincount(codes, minlength=size).astype(float)
+    return counts.reshape(number_of_groups, number_of_y_bins, number_of_x_bins)
+
+
+def _count_groups_loop(group_index, y, x, y_edges, x_edges, number_of_groups):
+    number_of_y_bins = len(y_edges) - 1
+    number_of_x_bins = len(x_edges) - 1
+    counts = np.zeros((number_of_groups, number_of_y_bins, number_of_x_bins))
+    for row in range(len(x)):
+        y_bin = np.searchsorted(y_edges, y[row], side="right") - 1
+        if y[row] == y_edges[-1]:
+            y_bin = number_of_y_bins - 1
+        x_bin = np.searchsorted(x_edges, x[row], side="right") - 1
+        if x[row] == x_edges[-1]:
+            x_bin = number_of_x_bins - 1
+        if 0 <= y_bin < number_of_y_bins and 0 <= x_bin < number_of_x_bins:
+            counts[group_index[row], y_bin, x_bin] += 1
+    return counts
+
+
+# the loop has no temporaries, which pays off once compiled
+count_groups_jit = None if numba is None else numba.njit(nogil=True, cache=True)(_count_groups_loop)
+
+
+def count_groups(
+    group_index: np.ndarray,
+    y: np.ndarray,
+    x: np.ndarray,
+    y_edges: np.ndarray,
+    x_edges: np.ndarray,
+    number_of_groups: int,
+    use_jit: bool = True,
+) -> np.ndarray:
+    """
+    Count the rows of every group on a shared grid in a single pass. Uses the numba compiled loop
+    when numba is installed and use_jit is set, else the numpy bincount kernel
+
+    Args:
+        group_index (np.ndarray): group of each row
+        y (np.ndarray): y value of each row
+        x (np.ndarray): x value of each row
+        y_edges (np.ndarray): edges of the y bins
+        x_edges (np.ndarray): edges of the x bins
+        number_of_groups (int): number of groups
+        use_jit (bool, optional): use the compiled loop if available. Defaults to True.
+
+    Returns:
+        np.ndarray: groups x y bins x x bins counts
+    """
+    kernel = count_groups_jit if use_jit and count_groups_jit is not None else count_groups_numpy
+    return kernel(
+        np.ascontiguousarray(group_index, dtype=np.int64),
+        np.ascontiguousarray(y, dtype=float),
+        np.ascontiguousarray(x, dtype=float),
+        np.ascontiguousarray(y_edges, dtype=float),
+        np.ascontiguousarray(x_edges, dtype=float),
+        number_of_groups,
+    )
+
+
+def get_hexagon_grid(
+    x_range: tuple[float, float], y_range: tuple[float, float], gridsize: int
+) -> tuple[float, float, int, int]:
+    """
+    Get the layout of the hexagonal grid covering the ranges, as matplotlib's hexbin: gridsize
+    hexagons across the x range, and rows such that the hexagons are regular on a square plot. The
+    centers form two interleaved lattices, the second one shifted by half a spacing in both x and y
+
+    Returns:
+        float: x spacing of the centers of one lattice, the width of the hexagons
+        float: y spacing of the rows of one lattice
+        int: columns of the second lattice, the first one has one more
+        int: rows of the second lattice, the first one has one more
+    """
+    number_of_columns = max(int(gridsize), 1)
+    number_of_rows = max(int(round(number_of_columns / np.sqrt(3))), 1)
+    x_size = (x_range[1] - x_range[0]) / number_of_columns
+    y_size = (y_range[1] - y_range[0]) / number_of_rows
+    return x_size, y_size, number_of_columns, number_of_rows
+
+
+def get_hexagon_centers(
+    x_range: tuple[float, float], y_range: tuple[float, float], gridsize: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the centers of the hexagonal grid of get_hexagon_grid
+
+    Returns:
+        np.ndarray: x of the centers, the first lattice row by row, then the second one
+        np.ndarray: y of the centers
+    """
+    x_size, y_size, number_of_columns, number_of_rows = get_hexagon_grid(x_range, y_range, gridsize)
+    x_first, y_first = np.meshgrid(
+        x_range[0] + x_size * np.arange(number_of_columns + 1),
+        y_range[0] + y_size * np.arange(number_of_rows + 1),
+    )
+    x_second, y_second = np.meshgrid(
+        x_range[0] + x_size * (np.arange(number_of_columns) + 0.5),
+        y_range[0] + y_size * (np.arange(number_of_rows) + 0.5),
+    )
+    x_centers = np.concatenate([x_first.ravel(), x_second.ravel()])
+    y_centers = np.concatenate([y_first.ravel(), y_second.ravel()])
+    return x_centers, y_centers
+
+
+def get_hexagon_index(
+    x: np.ndarray,
+    y: np.ndarray,
+    x_range: tuple[float, float],
+    y_range: tuple[float, float],
+    gridsize: int,
+) -> np.ndarray:
+    """
+    Get the hexagon of each point, in the order of get_hexagon_centers: the nearest of the closest
+    center of each lattice, with y scaled so the hexagons are regular. Points out of the ranges, and
+    NaN, get -1
+    """
+    x_size, y_size, number_of_columns, number_of_rows = get_hexagon_grid(x_range, y_range, gridsize)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x_scaled = (x - x_range[0]) / x_size
+    y_scaled = (y - y_range[0]) / y_size
+    inside = (x >= x_range[0]) & (x <= x_range[1]) & (y >= y_range[0]) & (y <= y_range[1])
+    x_scaled = np.where(inside, x_scaled, 0.0)
+    y_scaled = np.where(inside, y_scaled, 0.0)
+    x_first = np.rint(x_scaled)
+    y_first = np.rint(y_scaled)
+    x_second = np.clip(np.floor(x_scaled), 0, number_of_columns - 1)
+    y_second = np.clip(np.floor(y_scaled), 0, number_of_rows - 1)
+    distance_first = (x_scaled - x_first) ** 2 + 3 * (y_scaled - y_first) ** 2
+    distance_second = (x_scaled - x_second - 0.5) ** 2 + 3 * (y_scaled - y_second - 0.5) ** 2
+    first_lattice = distance_first <= distance_second
+    index = np.where(
+        first_lattice,
+        y_first * (number_of_columns + 1) + x_first,
+        (number_of_columns + 1) * (number_of_rows + 1) + y_second * number_of_columns + x_second,
+    ).astype(np.int64)
+    index[~inside] = -1
+    return index
+
+
+def count_hexagons(
+    x: np.ndarray,
+    y: np.ndarray,
+    x_range: tuple[float, float],
+    y_range: tuple[float, float],
+    gridsize: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Count the points in each hexagon of the grid of get_hexagon_grid, with one bincount
+
+    Returns:
+        np.ndarray: count of each hexagon
+        np.ndarray: x of the centers
+        np.ndarray: y of the centers
+    """
+    x_centers, y_centers = get_hexagon_centers(x_range, y_range, gridsize)
+    index = get_hexagon_index(x, y, x_range, y_range, gridsize)
+    counts = np.bincount(index[index >= 0], minlength=len(x_centers)).astype(float)
+    return counts, x_centers, y_centers
+
+
+def get_hexagon_vertices(
+    x_centers: np.ndarray, y_centers: np.ndarray, x_size: float, y_size: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the corners of the hexagons of the centers, pointy topped and tiling the grid of
+    get_hexagon_grid, whose spacings are x_size and y_size
+
+    Returns:
+        np.ndarray: hexagons x 6 x of the corners, counterclockwise from the lower right one
+        np.ndarray: hexagons x 6 y of the corners
+    """
+    x_offsets = x_size * np.array([0.5, 0.5, 0.0, -0.5, -0.5, 0.0])
+    y_offsets = y_size * np.array([-1, 1, 2, 1, -1, -2]) / 6
+    x_vertices = np.asarray(x_centers, dtype=float)[:, None] + x_offsets
+    y_vertices = np.asarray(y_centers, dtype=float)[:, None] + y_offsets
+    return x_vertices, y_vertices
@@ -1,3 +1,5 @@
+import logging
+
 from histogram2d.orchestrator import Orchestrator
 from histogram2d.builder import Histogram2DContourSettings
 from histogram2d.visualize import VisualizeSettings
@@ -39,6 +41,11 @@ settings_multiplot = VisualizeSettings(
 
 
 def main() -> None:
+    # the package only logs, the script configures where and how
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(filename)s: " "%(levelname)s: " "%(funcName)s(): " "%(lineno)d:\t" "%(message)s",
+    )
     runner = Orchestrator(
         histogram2d_settings=settings_histogram,
         multiplot_settings=settings_multiplot,
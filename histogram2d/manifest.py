@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import uuid
+from dataclasses import asdict, dataclass, field, is_dataclass
+
+from histogram2d.sources import STDIN, get_source_name, is_path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RunManifest(object):
+    """
+    Record of a run, kept next to its outputs so an interrupted run can be resumed. It holds the
+    inputs, a hash of the settings, the outputs planned and the outputs already written, and the
+    hash of the data of each group, for the watch mode
+    """
+
+    inputs: list[dict] = field(default_factory=list)
+    settings_hash: str = ""
+    planned_outputs: list[str] = field(default_factory=list)
+    completed_outputs: list[str] = field(default_factory=list)
+    group_hashes: dict[str, str] = field(default_factory=dict)
+
+    FILENAME = "manifest.json"
+
+    @staticmethod
+    def describe_input(data_filepath) -> dict:
+        """
+        Describe an input file by its absolute path, size and modification time. The content of the
+        standard input and of file objects is unknown, so their description never matches another one
+        """
+        if not is_path(data_filepath) or data_filepath == STDIN:
+            return {"path": get_source_name(data_filepath), "stream": uuid.uuid4().hex}
+        stat = os.stat(data_filepath)
+        return {
+            "path": os.path.abspath(data_filepath),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    @staticmethod
+    def hash_settings(*settings) -> str:
+        """
+        Hash the settings, given as dataclasses or json serializable values
+        """
+        serializable = [asdict(value) if is_dataclass(value) else value for value in settings]
+        content = json.dumps(serializable, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def load(cls, folder: str) -> "RunManifest":
+        """
+        Load the manifest of the run folder
+
+        Raises:
+            FileNotFoundError: If the folder has no manifest
+        """
+        with open(os.path.join(folder, cls.FILENAME), "r", encoding="utf-8") as file:
+            return cls(**json.load(file))
+
+    def save(self, folder: str) -> None:
+        """
+        Write the manifest atomically, so a crash never leaves a partially written manifest behind
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=folder, prefix=".manifest", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                json.dump(asdict(self), file, indent=2)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary_path, os.path.join(folder, self.FILENAME))
+        except Exception as e:
+            logger.error(f"Error writing manifest: {e}")
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise e
+        return None
+
+    def matches(self, other: "RunManifest") -> bool:
+        """
+        Whether both manifests describe the same inputs and settings
+        """
+        return self.inputs == other.inputs and self.settings_hash == other.settings_hash
+
+    def is_finished(self) -> bool:
+        return set(self.planned_outputs) <= set(self.completed_outputs)
+
+    def is_completed(self, filename: str, folder: str) -> bool:
+        """
+        Whether the output was written and is still in the run folder
+        """
+        return filename in self.completed_outputs and os.path.exists(os.path.join(folder, filename))
+
+    def mark_completed(self, filename: str, folder: str) -> None:
+        """
+        Record the output as written and save the manifest
+        """
+        if filename not in self.completed_outputs:
+            self.completed_outputs.append(filename)
+        self.save(folder)
+        return None
@@ -1,55 +1,277 @@
+import copy
 import logging
 import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from functools import partial, wraps
 
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-from histogram2d.builder import Histogram2DContourSettings
+from histogram2d.backends import PandasBackend, get_backend, is_group_column_name
+from histogram2d.builder import BinnedHistogram, Histogram2DContourSettings
+from histogram2d.compare import ComparisonSettings
+from histogram2d.export import ExportSettings
+from histogram2d.filters import FilterSettings
+from histogram2d.manifest import RunManifest
+from histogram2d.parallel import ParallelSettings
+from histogram2d.plan import LazyGraph, OutputPlan
+from histogram2d.raster import RasterSettings
+from histogram2d.sampling import SamplingSettings
+from histogram2d.sources import STDIN, get_data_format, is_path, open_data_source
+from histogram2d.uncertainty import UncertaintySettings
+from histogram2d.vector import VectorSettings, encode_pdf
 from histogram2d.visualize import VisualizeSettings, Figure
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(filename)s: " "%(levelname)s: " "%(funcName)s(): " "%(lineno)d:\t" "%(message)s",
-)
+
+
+class RunLogger(logging.LoggerAdapter):
+    """
+    Logger of one orchestrator or of one of its runs. Its records are prefixed with its id and go
+    through a logger of its own, child of the module logger, whose level is debug in debug mode and
+    info otherwise, so the debug mode of one run does not change the logs of the others running in
+    the same process. The logger is not registered, so it is released with the run
+    """
+
+    def __init__(self, run_id: str, debug: bool = False) -> None:
+        run_logger = logging.Logger(f"{logger.name}.{run_id}")
+        run_logger.parent = logger
+        run_logger.setLevel(logging.DEBUG if debug else logging.INFO)
+        super().__init__(run_logger, {"run_id": run_id})
+        self.debug_mode = debug
+
+    def __reduce__(self):
+        # sent to the worker processes as its id and mode, not as a registered logger
+        return RunLogger, (self.extra["run_id"], self.debug_mode)
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['run_id']}] {msg}", kwargs
+
+
+def isolated_run(method):
+    """
+    Run the method on the orchestrator of a new run, see Orchestrator.start_run, so concurrent runs
+    on one orchestrator, and its successive runs, share neither their settings nor their outputs.
+    The run is then published as the latest one of the orchestrator, see Orchestrator.publish_run
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        runner = self.start_run()
+        try:
+            return method(runner, *args, **kwargs)
+        finally:
+            self.publish_run(runner)
+
+    return wrapper
+
+
+@dataclass
+class RenderResult(object):
+    """
+    Outputs of an in-memory render: the binned grid of each group, the plotly figures and the image
+    bytes, both keyed by figure title ("combined" or the group name)
+    """
+
+    groups: list[str]
+    features: list[str]
+    binned: list[BinnedHistogram]
+    figures: dict[str, Figure] = field(default_factory=dict)
+    images: dict[str, dict[str, bytes]] = field(default_factory=dict)
 
 
 class Orchestrator:
     MAX_FEATURE_COUNT = 2
+    PNG_RENDERERS = ["kaleido", "raster"]
+    VECTOR_RENDERERS = ["kaleido", "native"]
+    OUTPUT_FORMATS = ["pdf", "svg", "png"]
+    DISTANCES_FILENAME = "distances.csv"
+    UNCERTAINTY_FILENAME = "uncertainty.csv"
+    COMBINED_TITLE = "combined"
 
     def __init__(
         self,
-        histogram2d_settings: Histogram2DContourSettings = Histogram2DContourSettings(),
-        multiplot_settings: VisualizeSettings = VisualizeSettings(),
+        histogram2d_settings: Histogram2DContourSettings = None,
+        multiplot_settings: VisualizeSettings = None,
         debug: bool = False,
         root_folder: str = ".",
+        backend: str = "pandas",
+        png_renderer: str = "kaleido",
+        raster_settings: RasterSettings = None,
+        parallel_settings: ParallelSettings = None,
+        resume: bool | str = False,
+        sampling_settings: SamplingSettings = None,
+        vector_renderer: str = "kaleido",
+        vector_settings: VectorSettings = None,
+        export_settings: ExportSettings = None,
+        prebinned_traces: bool = False,
+        filter_settings: FilterSettings = None,
     ) -> None:
-        self.histogram2d_settings = histogram2d_settings
-        self.multiplot_settings = multiplot_settings
+        """
+        The settings given are copied, never changed on the objects of the caller, so orchestrators
+        sharing settings, or created from the defaults, can run concurrently in one process. Each run
+        derives its ranges and bins on its own snapshot of these settings, with its own logger and
+        outputs folder, so the runs of one orchestrator can also run concurrently, see start_run
+
+        Args:
+            histogram2d_settings (Histogram2DContourSettings, optional): settings of each histogram.
+                Defaults to None, the default settings.
+            multiplot_settings (VisualizeSettings, optional): settings of the figures layout
+            debug (bool, optional): log at debug level. Defaults to False.
+            root_folder (str, optional): folder where the outputs folder is created. Defaults to ".".
+            backend (str, optional): engine used to read and clean the data. Defaults to "pandas".
+            png_renderer (str, optional): "kaleido" or "raster". Defaults to "kaleido".
+            raster_settings (RasterSettings, optional): settings of the raster renderer
+            parallel_settings (ParallelSettings, optional): executor of the per group work
+            resume (bool | str, optional): continue an interrupted run instead of starting a new one.
+                If True, the latest unfinished run of the same input and settings in the outputs
+                folder is resumed, and a new run is started if there is none. If a path, that run
+                folder is resumed. Only the outputs missing from its manifest are rendered.
+                Defaults to False.
+            sampling_settings (SamplingSettings, optional): plot the groups larger than its row
+                threshold from a sample. Defaults to None, plotting every row.
+            vector_renderer (str, optional): "kaleido" or "native", which writes the SVG and PDF
+                files from the contour polygons of the binned groups. Defaults to "kaleido".
+            vector_settings (VectorSettings, optional): settings of the native vector renderer
+            export_settings (ExportSettings, optional): also write the bins and statistics of each
+                group to data files, from the binning of the figures. Defaults to None.
+            prebinned_traces (bool, optional): build the plotly figures from the binned grids as
+                contour traces, instead of sending every data point to plotly to be binned again in
+                each trace. Defaults to False.
+            filter_settings (FilterSettings, optional): rows filters and clipping of the values,
+                applied while the data is read. Defaults to None, keeping every complete row.
+        """
         self.debug = debug
-        # Setup a logger which logs the current time, together with type of log, and set it to debug level
-        if self.debug:
-            # set the logging level to debug
-            logger.setLevel(logging.DEBUG)
-        else:
-            # set the logging level to info
-            logger.setLevel(logging.INFO)
-        self.output_folder = self.prepare_outputs_folder(root_folder=root_folder)
+        self.run_id = uuid.uuid4().hex[:8]
+        self.logger = RunLogger(self.run_id, debug)
+        # the latest run is published from the threads of the concurrent runs, see publish_run
+        self.results_lock = threading.Lock()
+        # updates of the outputs folder run one after the other, see update_outputs
+        self.update_lock = threading.Lock()
+        self.last_run: Orchestrator = None
+        self.histogram2d_settings = copy.deepcopy(
+            histogram2d_settings or Histogram2DContourSettings()
+        )
+        self.multiplot_settings = copy.deepcopy(multiplot_settings or VisualizeSettings())
+        self.parallel_settings = copy.deepcopy(parallel_settings or ParallelSettings())
+        self.filter_settings = copy.deepcopy(filter_settings)
+        self.backend = get_backend(
+            backend, self.parallel_settings, self.filter_settings, logger=self.logger
+        )
+        if png_renderer not in self.PNG_RENDERERS:
+            error_message = (
+                f"Unknown png renderer {png_renderer}. Expected one of {self.PNG_RENDERERS}"
+            )
+            self.logger.error(error_message)
+            raise ValueError(error_message)
+        self.png_renderer = png_renderer
+        self.raster_settings = copy.deepcopy(raster_settings or RasterSettings())
+        if vector_renderer not in self.VECTOR_RENDERERS:
+            error_message = f"Unknown vector renderer {vector_renderer}. Expected one of {self.VECTOR_RENDERERS}"
+            self.logger.error(error_message)
+            raise ValueError(error_message)
+        self.vector_renderer = vector_renderer
+        self.vector_settings = copy.deepcopy(vector_settings or VectorSettings())
+        self.export_settings = copy.deepcopy(export_settings)
+        self.prebinned_traces = prebinned_traces
+        self.sampling_settings = copy.deepcopy(sampling_settings)
+        self.root_folder = root_folder
+        self.resume = resume
+        self.manifest: RunManifest = None
+        # outputs are recorded from the threads rendering the pages of the combined figure
+        self.outputs_lock = threading.Lock()
+        # created on the first write, so the in-memory render never touches the filesystem, and
+        # picked once the input and settings of the run are known when resuming
+        self.output_folder = None
         return
 
+    def __getstate__(self) -> dict:
+        # the orchestrator is sent to the worker processes of run_workbook without its locks
+        state = self.__dict__.copy()
+        del state["outputs_lock"]
+        del state["results_lock"]
+        del state["update_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.outputs_lock = threading.Lock()
+        self.results_lock = threading.Lock()
+        self.update_lock = threading.Lock()
+
     @staticmethod
     def prepare_outputs_folder(root_folder):
         """
-        Prepare the outputs folder
+        Prepare the outputs folder, named after the current time. When runs start within the same
+        second, the folders of the later ones get a _1, _2, ... suffix, so each run has its own
         """
         outputs_folder = os.path.join(root_folder, "outputs")
-        if not os.path.exists(outputs_folder):
-            os.makedirs(outputs_folder)
+        os.makedirs(outputs_folder, exist_ok=True)
         # get datetime now and create folder with that name, without milliseconds
-        outputs_folder = os.path.join(outputs_folder, datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
-        if not os.path.exists(outputs_folder):
-            os.makedirs(outputs_folder)
-        return outputs_folder
+        timestamp_folder = os.path.join(
+            outputs_folder, datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        )
+        outputs_folder = timestamp_folder
+        suffix = 0
+        while True:
+            try:
+                # creating the folder is atomic, so concurrent runs never share one
+                os.makedirs(outputs_folder)
+                return outputs_folder
+            except FileExistsError:
+                suffix += 1
+                outputs_folder = f"{timestamp_folder}_{suffix}"
+
+    def get_output_folder(self) -> str:
+        """
+        Get the outputs folder of the run, created on the first write
+        """
+        if self.output_folder is None:
+            self.output_folder = self.prepare_outputs_folder(root_folder=self.root_folder)
+        return self.output_folder
+
+    def start_run(self, output_folder: str = None, manifest: RunManifest = None) -> "Orchestrator":
+        """
+        Get the orchestrator of a new run: a copy of this one with a snapshot of its settings, on
+        which the run derives its ranges and bins, and its own run id, logger, manifest and outputs
+        folder, created on its first write
+
+        Args:
+            output_folder (str, optional): outputs folder continued by the run. Defaults to None, a
+                new one
+            manifest (RunManifest, optional): manifest of the outputs folder continued
+
+        Returns:
+            Orchestrator: orchestrator of the run
+        """
+        runner = copy.copy(self)
+        runner.run_id = uuid.uuid4().hex[:8]
+        runner.logger = RunLogger(runner.run_id, self.debug)
+        runner.histogram2d_settings = copy.deepcopy(self.histogram2d_settings)
+        runner.backend = copy.copy(self.backend)
+        runner.backend.logger = runner.logger
+        runner.outputs_lock = threading.Lock()
+        runner.last_run = None
+        runner.manifest = manifest
+        runner.output_folder = output_folder
+        self.logger.debug(f"Run {runner.run_id} started")
+        return runner
+
+    def publish_run(self, runner: "Orchestrator") -> None:
+        """
+        Publish a run, finished or failed, as the latest one of the orchestrator. Its outputs folder
+        and manifest, when it wrote any, are continued by the next update_outputs
+        """
+        with self.results_lock:
+            self.last_run = runner
+            if runner.output_folder is not None:
+                self.output_folder = runner.output_folder
+                self.manifest = runner.manifest
 
     @classmethod
     def get_groups_df(cls, df: pd.DataFrame):
@@ -86,59 +308,14 @@ class Orchestrator:
             |  1  | 2.1 | 3.1 |
         """
 
-        # get group names and index of those columns
-        group_column_names = [
-            [column_name, idx]
-            for idx, column_name in enumerate(df.columns)
-            if cls.is_group_column_name(column_name)
-        ]
-        dfs_of_groups = []
-        if len(group_column_names) == 0:
-            logging.warning("No groups identified.")
-            logging.warning("Returning the dataframe as a single group")
-            return [df], [""]
-
-        for idx_group, group in enumerate(group_column_names):
-            first_colum_of_group = group[1]
-            if idx_group == len(group_column_names) - 1:
-                last_column_of_group = len(df.columns)
-            else:
-                last_column_of_group = group_column_names[idx_group + 1][1]
-            # get the columns of the group
-            columns_of_group = df.columns[first_colum_of_group:last_column_of_group]
-            # get the sub dataframe
-            sub_df = df[columns_of_group]
-            # cleanup
-            sub_df = cls.cleanup_group_df(sub_df)
-            # rename the columns
-            dfs_of_groups.append(sub_df)
-        group_names = [group[0] for group in group_column_names]
-        logging.debug(f"Grouped identified: {group_names}")
-        return dfs_of_groups, group_names
+        return PandasBackend.get_groups_df(df)
 
     @staticmethod
     def cleanup_group_df(df: pd.DataFrame) -> pd.DataFrame:
         """
         Cleanup the group dataframe by removing the first row and renaming the columns
         """
-        # replace columns with the first row
-        df.columns = df.iloc[0]
-        # drop the first row
-        df = df.drop([0])
-
-        # drop rows
-        df = df.dropna()
-
-        # If not numeric, try transforming to numeric
-        for column in df.columns:
-            try:
-                df[column] = pd.to_numeric(df[column])
-            except:
-                error_message = f"Could not convert column {column} to numeric"
-                logging.error(error_message)
-                raise ValueError(error_message)
-
-        return df
+        return PandasBackend.cleanup_group_df(df)
 
     @staticmethod
     def is_group_column_name(column_name: str) -> bool:
@@ -151,19 +328,19 @@ class Orchestrator:
         Returns:
             bool: whether column name contains unnamed substring - which indicates a merged excell cells
         """
-        return not "unnamed" in column_name.lower()
+        return is_group_column_name(column_name)
 
     @staticmethod
-    def is_data_file_valid(data_filepath: str) -> bool:
-        # check if file exists
-        if not os.path.exists(data_filepath):
-            logging.error(f"File {data_filepath} does not exist")
+    def is_data_file_valid(
+        data_filepath, logger: logging.Logger | logging.LoggerAdapter = None
+    ) -> bool:
+        logger = logger or logging.getLogger(__name__)
+        # check if file exists, the standard input and file objects are always readable
+        if is_path(data_filepath) and data_filepath != STDIN and not os.path.exists(data_filepath):
+            logger.error(f"File {data_filepath} does not exist")
             raise FileNotFoundError(f"File {data_filepath} does not exist")
-        # If file is either excel or csv continue to read
-        accepted_file_extensions = [".xlsx", ".xls", ".csv"]
-        if not any([data_filepath.endswith(extension) for extension in accepted_file_extensions]):
-            logging.error(f"File {data_filepath} is not an excel or csv file")
-            raise ValueError(f"File {data_filepath} is not an excel or csv file")
+        # If file is either excel or csv, possibly compressed, continue to read
+        get_data_format(data_filepath)
         return True
 
     def read_data_from_file(self, data_filepath: str):
@@ -171,33 +348,20 @@ class Orchestrator:
         Read data from data file and return a list of dataframes
 
         Args:
-            data_filepath (str): path to excel or csv file
+            data_filepath (str | BinaryIO): path to excel or csv file, compressed as .gz, .bz2, .xz
+                or .zst or not, "-" for the standard input, or a binary file object
 
         Returns:
             list[pd.DataFrame]: list of dataframes
             list[str]: list of group names
         """
-        self.is_data_file_valid(data_filepath)
+        self.is_data_file_valid(data_filepath, self.logger)
 
-        if data_filepath.endswith(".csv"):
-            # set read function to pd.read_csv
-            read_function = pd.read_csv
-        else:
-            # set read function to pd.read_excel
-            read_function = pd.read_excel
-        try:
-            df = read_function(data_filepath)
-        except Exception as e:
-            logging.error(f"Error reading excel file: {e}")
-            raise e
-        logging.debug(">>>>>RAW DATA>>>>>")
-        logging.debug(df.head(6))
-
-        data_of_groups, groups_name = self.get_groups_df(df)
+        data_of_groups, groups_name = self.backend.read_groups(data_filepath)
 
         for df, group_name in zip(data_of_groups, groups_name):
-            logging.debug(f">>>>>>{group_name}>>>>>>")
-            logging.debug(df.describe())
+            self.logger.debug(f">>>>>>{group_name}>>>>>>")
+            self.logger.debug(df.describe())
         return data_of_groups, groups_name
 
     @staticmethod
@@ -233,46 +397,609 @@ class Orchestrator:
         self.histogram2d_settings.max_feature_2 = max_feature_2
         self.histogram2d_settings.min_feature_2 = min_feature_2
 
-    def run(self, excel_filepath: str, features: list[str] = []) -> None:
+    @isolated_run
+    def run(self, excel_filepath: str, features: list[str] = [], plan: OutputPlan = None) -> None:
         """
         Run the orchestrator. Read the data from the excel file, get the groups, get the features, get the features values range, update the settings, create the plots and save them.add()
 
         Args:
             excel_filepath (str): path to excel file
             features (list[str], optional): features to be displayed. Defaults to [].
+            plan (OutputPlan, optional): outputs to write, only their work is executed. Defaults to
+                None, all the outputs.
 
         Raises:
             ValueError: If the first dataframe does not have at least two features
             ValueError: If the features do not exist in all dataframes
             ValueError: If the excel file does not have the expected format
         """
+        dfs, groups, features = self.prepare_data(excel_filepath, features)
+        self.write_run_outputs(excel_filepath, dfs, groups, features, plan=plan)
+        return None
+
+    def write_run_outputs(
+        self,
+        data_filepath: str,
+        dfs: list[pd.DataFrame],
+        groups: list[str],
+        features: list[str],
+        *other_settings,
+        completed_outputs: list[str] = None,
+        plan: OutputPlan = None,
+    ) -> None:
+        """
+        Write the combined figure, the individual figures and the data exports of prepared groups,
+        recording them in the manifest of the run. The sampled groups, their binned grids and their
+        statistics are computed lazily, only for the outputs of the plan still pending, and shared
+        between them
+
+        Args:
+            data_filepath (str): input of the run, for the manifest
+            dfs (list[pd.DataFrame]): list of dataframes, one per group
+            groups (list[str]): list of group names
+            features (list[str]): features to be displayed
+            other_settings: anything else identifying the run, hashed in the manifest
+            completed_outputs (list[str], optional): outputs of the run folder that are up to date,
+                and are not written again. Defaults to None.
+            plan (OutputPlan, optional): outputs to write. Defaults to None, all the outputs.
+        """
+        plan = plan or OutputPlan()
+        pages = self.multiplot_settings.get_pages(len(groups))
+        formats = plan.get_formats(self.OUTPUT_FORMATS)
+        combined_titles = []
+        stitched_outputs = []
+        if "combined" in plan.figures:
+            combined_titles = self.get_combined_titles(len(pages))
+            if "pdf" in formats:
+                stitched_outputs = self.get_stitched_outputs(len(pages))
+        individual_titles = plan.get_groups(groups)
+        export_outputs = self.get_export_outputs() if plan.exports else []
+        self.start_manifest(
+            data_filepath,
+            self.get_settings_hash(features, *other_settings),
+            self.get_planned_outputs(combined_titles + individual_titles, formats)
+            + stitched_outputs
+            + export_outputs,
+            completed_outputs,
+        )
+        # the combined figure and the exports need every group, the individual figures their own
+        if len(combined_titles) > 0 or len(export_outputs) > 0:
+            indexes = list(range(len(groups)))
+        else:
+            indexes = [idx for idx, group in enumerate(groups) if group in individual_titles]
+        # whether a requested figure is drawn from the binned grids
+        draws_binned = self.prebinned_traces or len(self.get_plotly_formats(formats)) < len(formats)
+        graph = LazyGraph(self.logger)
+        # from every row, before the large groups are sampled
+        graph.add("statistics", lambda: self.export_settings.get_statistics(dfs, groups, features))
+        graph.add(
+            "sampled",
+            lambda: dict(
+                zip(
+                    indexes,
+                    self.sample_groups(
+                        [dfs[idx] for idx in indexes], [groups[idx] for idx in indexes], features
+                    ),
+                )
+            ),
+        )
+        graph.add(
+            "binned",
+            lambda sampled: dict(zip(sampled, self.bin_groups(list(sampled.values())))),
+            ("sampled",),
+        )
+        # the pages of the combined figure share one grid, the one of the settings when the bin
+        # sizes are set, where the groups are already binned
+        if self.histogram2d_settings.has_bin_sizes():
+            graph.add("shared_binned", lambda binned: binned, ("binned",))
+        else:
+            graph.add(
+                "shared_binned",
+                lambda sampled: dict(
+                    zip(sampled, self.bin_groups_on_shared_grid(list(sampled.values())))
+                ),
+                ("sampled",),
+            )
+        if len(export_outputs) > 0 and len(self.get_pending_exports()) > 0:
+            binned = graph.get("binned")
+            self.write_exports([binned[idx] for idx in indexes], groups, graph.get("statistics"))
+        if any(len(self.get_pending_formats(title)) > 0 for title in combined_titles) or any(
+            not self.manifest.is_completed(filename, self.output_folder)
+            for filename in stitched_outputs
+        ):
+            sampled = [graph.get("sampled")[idx] for idx in indexes]
+            if len(pages) == 1:
+                binned = [graph.get("binned")[idx] for idx in indexes] if draws_binned else None
+                self.write_outputs(
+                    self.COMBINED_TITLE,
+                    partial(
+                        self.multiplot_settings.build_multiplots_figure,
+                        dataframes=sampled,
+                        titles=groups,
+                        settings_histogram=self.histogram2d_settings,
+                        parallel=self.parallel_settings,
+                        binned=binned if self.prebinned_traces else None,
+                    ),
+                    binned,
+                    groups,
+                )
+            else:
+                shared_binned = [graph.get("shared_binned")[idx] for idx in indexes]
+                self.write_combined_pages(sampled, groups, pages, shared_binned)
+            self.logger.info("Combined plot saved")
+        for idx in indexes:
+            title = groups[idx]
+            if title not in individual_titles or len(self.get_pending_formats(title)) == 0:
+                continue
+            binned = [graph.get("binned")[idx]] if draws_binned else None
+            self.write_outputs(
+                title,
+                partial(
+                    self.multiplot_settings.build_individual_plot,
+                    df=graph.get("sampled")[idx],
+                    title=title,
+                    settings_histogram=self.histogram2d_settings,
+                    binned=binned[0] if self.prebinned_traces else None,
+                ),
+                binned,
+                [title],
+            )
+            self.logger.info(f"Individual plot for {title} saved")
+        self.logger.debug(f"Intermediate results computed: {graph.computed}")
+        self.logger.info("All plots saved")
+        return None
+
+    @isolated_run
+    def run_workbook(
+        self,
+        excel_filepath: str,
+        features: list[str] = [],
+        sheets: list[str] = None,
+        shared_ranges: bool = False,
+    ) -> dict[str, str]:
+        """
+        Run the orchestrator on every sheet of a workbook, each sheet being its own grouped dataset.
+        The sheets are parsed in parallel, then rendered in parallel, with the parallel settings.
+        The outputs of each sheet are saved in a subfolder of the outputs folder named after it
+
+        Args:
+            excel_filepath (str): path to excel file
+            features (list[str], optional): features to be displayed. Defaults to [].
+            sheets (list[str], optional): sheets to process. Defaults to all of them.
+            shared_ranges (bool, optional): range the features across the groups of all the sheets,
+                so the sheets share their bins. Defaults to False, each sheet being ranged on its
+                own.
+
+        Returns:
+            dict[str, str]: outputs folder of each sheet
+
+        Raises:
+            ValueError: If the file is not an excel file, or a sheet does not exist
+        """
+        self.is_data_file_valid(excel_filepath, self.logger)
+        if get_data_format(excel_filepath) != "excel":
+            error_message = f"File {excel_filepath} is not an excel file"
+            self.logger.error(error_message)
+            raise ValueError(error_message)
+        with open_data_source(excel_filepath, seekable=True) as stream:
+            sheet_names = pd.ExcelFile(stream).sheet_names
+        if sheets is None:
+            sheets = sheet_names
+        unknown_sheets = [sheet for sheet in sheets if sheet not in sheet_names]
+        if len(unknown_sheets) > 0:
+            error_message = f"Sheets {unknown_sheets} do not exist in {sheet_names}"
+            self.logger.error(error_message)
+            raise ValueError(error_message)
+        self.logger.info(f"Sheets to be processed: {sheets}")
+
+        # parsing the sheets holds the GIL, so it only scales in processes
+        parsed_sheets = self.parallel_settings.map(
+            partial(self.read_sheet, excel_filepath), sheets, releases_gil=False
+        )
+        if shared_ranges:
+            all_dfs = [df for dfs, _ in parsed_sheets for df in dfs]
+            features = self.get_features(all_dfs, features)
+            features_values_range = self.get_features_ranges(
+                all_dfs, features, self.parallel_settings, logger=self.logger
+            )
+            self.update_histogram_settings_based_on_features(features, features_values_range)
+            self.logger.info(f"Settings shared by all sheets: {self.histogram2d_settings}")
+        self.get_output_folder()
+        output_folders = self.parallel_settings.map(
+            partial(self.run_sheet, excel_filepath, features=features, shared_ranges=shared_ranges),
+            [(sheet, dfs, groups) for sheet, (dfs, groups) in zip(sheets, parsed_sheets)],
+            releases_gil=False,
+        )
+        self.logger.info("All sheets saved")
+        return dict(zip(sheets, output_folders))
+
+    def read_sheet(self, excel_filepath: str, sheet: str) -> tuple[list[pd.DataFrame], list[str]]:
+        """
+        Read the groups of one sheet of the workbook
+        """
+        dfs, groups = PandasBackend(filters=self.filter_settings, logger=self.logger).read_groups(
+            excel_filepath, sheet
+        )
+        self.logger.info(f"Sheet {sheet}: groups identified: {groups}")
+        return dfs, groups
+
+    def run_sheet(
+        self,
+        excel_filepath: str,
+        sheet_groups: tuple[str, list[pd.DataFrame], list[str]],
+        features: list[str] = [],
+        shared_ranges: bool = False,
+    ) -> str:
+        """
+        Write the outputs of one sheet of the workbook in its subfolder, with a copy of the
+        orchestrator so the sheets rendered concurrently do not share their settings or manifest
+
+        Args:
+            excel_filepath (str): path to excel file
+            sheet_groups (tuple[str, list[pd.DataFrame], list[str]]): sheet, its groups and their names
+            features (list[str], optional): features to be displayed. Defaults to [].
+            shared_ranges (bool, optional): the settings are already ranged across all the sheets
+
+        Returns:
+            str: outputs folder of the sheet
+        """
+        sheet, dfs, groups = sheet_groups
+        runner = copy.copy(self)
+        runner.histogram2d_settings = replace(self.histogram2d_settings)
+        # the sheets are the unit of parallel work
+        runner.parallel_settings = ParallelSettings()
+        runner.outputs_lock = threading.Lock()
+        runner.manifest = None
+        runner.resume = False
+        runner.output_folder = os.path.join(self.output_folder, self.get_sheet_folder_name(sheet))
+        os.makedirs(runner.output_folder, exist_ok=True)
+        if not shared_ranges:
+            dfs, groups, features = runner.prepare_groups(dfs, groups, features)
+        runner.write_run_outputs(excel_filepath, dfs, groups, features, sheet)
+        self.logger.info(f"Sheet {sheet} saved")
+        return runner.output_folder
+
+    @staticmethod
+    def get_sheet_folder_name(sheet: str) -> str:
+        """
+        Get the name of the outputs subfolder of a sheet, replacing the characters not allowed in
+        folder names
+        """
+        return re.sub(r'[\\/:*?"<>|]', "_", str(sheet)).strip() or "sheet"
+
+    def watch(
+        self,
+        data_filepath: str,
+        features: list[str] = [],
+        poll_interval: float = 2.0,
+        max_polls: int = None,
+    ) -> None:
+        """
+        Keep the outputs of a data file up to date. The file is polled for changes of its size or
+        modification time, and re-read only when it changed. Only the figures of the groups whose
+        data changed are rendered again, and the combined figure only when any group changed, see
+        update_outputs. Stops on KeyboardInterrupt
+
+        Args:
+            data_filepath (str): path to excel or csv file
+            features (list[str], optional): features to be displayed. Defaults to [].
+            poll_interval (float, optional): seconds between polls. Defaults to 2.0.
+            max_polls (int, optional): stop after this many polls. Defaults to None, never stopping.
+        """
+        last_input = None
+        polls = 0
+        self.logger.info(f"Watching {data_filepath}")
+        try:
+            while max_polls is None or polls < max_polls:
+                polls += 1
+                current_input = RunManifest.describe_input(data_filepath)
+                if current_input != last_input:
+                    last_input = current_input
+                    self.update_outputs(data_filepath, features)
+                if max_polls is None or polls < max_polls:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.logger.info(f"Stopped watching {data_filepath}")
+        return None
+
+    def update_outputs(self, data_filepath: str, features: list[str] = []) -> list[str]:
+        """
+        Read the data file and render again the outputs that changed since the last update in the
+        outputs folder. A group is rendered again when the hash of its cleaned data changed, every
+        group when the settings or the features ranges changed, and the combined figure and the data
+        exports whenever any group changed, was added or was removed. The outputs of removed groups
+        are deleted. Each update is a run of its own, continuing the outputs folder and manifest of
+        the previous one, so the updates of one orchestrator run one after the other
+
+        Returns:
+            list[str]: groups rendered again
+        """
+        with self.update_lock:
+            runner = self.start_run(self.output_folder, self.manifest)
+            try:
+                return runner.update_run_outputs(data_filepath, features)
+            finally:
+                self.publish_run(runner)
+
+    def update_run_outputs(self, data_filepath: str, features: list[str] = []) -> list[str]:
+        """
+        Update the outputs folder of the run, see update_outputs
+        """
+        dfs, groups, features = self.prepare_data(data_filepath, features)
+        group_hashes = {group: self.hash_group(df) for df, group in zip(dfs, groups)}
+        settings_hash = self.get_settings_hash(features)
+        previous = self.manifest
+        if self.output_folder is not None and previous is None:
+            try:
+                previous = RunManifest.load(self.output_folder)
+            except (OSError, ValueError, TypeError):
+                previous = None
+        if previous is None or previous.settings_hash != settings_hash:
+            clean_groups = set()
+        else:
+            clean_groups = {
+                group
+                for group, group_hash in group_hashes.items()
+                if previous.group_hashes.get(group) == group_hash
+            }
+        completed_outputs = []
+        if previous is not None:
+            for filename in previous.completed_outputs:
+                title = os.path.splitext(filename)[0]
+                if title in clean_groups:
+                    completed_outputs.append(filename)
+                elif title in previous.group_hashes and title not in group_hashes:
+                    # the group was removed from the data
+                    filepath = os.path.join(self.output_folder, filename)
+                    if os.path.exists(filepath):
+                        os.remove(filepath)
+        dirty_groups = [group for group in groups if group not in clean_groups]
+        if (
+            previous is not None
+            and len(dirty_groups) == 0
+            and set(groups) == set(previous.group_hashes)
+        ):
+            self.logger.info("No group changed, outputs are up to date")
+            return []
+        self.logger.info(f"Groups changed: {dirty_groups}")
+        self.write_run_outputs(
+            data_filepath, dfs, groups, features, completed_outputs=completed_outputs
+        )
+        # recorded once every output is written, so an interrupted update is rendered again
+        self.manifest.group_hashes = group_hashes
+        self.manifest.save(self.output_folder)
+        return dirty_groups
+
+    @staticmethod
+    def hash_group(df: pd.DataFrame) -> str:
+        """
+        Hash the cleaned data of a group, its feature names and values
+        """
+        values_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        return RunManifest.hash_settings(list(map(str, df.columns)), values_hash.tobytes().hex())
+
+    def prepare_data(
+        self, excel_filepath: str, features: list[str] = []
+    ) -> tuple[list[pd.DataFrame], list[str], list[str]]:
+        """
+        Read the data from the excel file, get the groups, get the features, get the features values
+        range and update the settings
+
+        Returns:
+            list[pd.DataFrame]: list of dataframes, one per group
+            list[str]: list of group names
+            list[str]: features to be displayed
+        """
         dfs, groups = self.read_data_from_file(data_filepath=excel_filepath)
+        return self.prepare_groups(dfs, groups, features)
+
+    def prepare_groups(
+        self, dfs: list[pd.DataFrame], groups: list[str], features: list[str] = []
+    ) -> tuple[list[pd.DataFrame], list[str], list[str]]:
+        """
+        Get the features and the features values range of the groups, and update the settings
+
+        Returns:
+            list[pd.DataFrame]: list of dataframes, one per group
+            list[str]: list of group names
+            list[str]: features to be displayed
+        """
         if len(groups) == 0:
-            logging.error("Did not obtain expected format of excel")
+            self.logger.error("Did not obtain expected format of excel")
             raise ValueError("Did not obtain expected format of excel")
-        logging.info(f"Groups identified: {groups}")
+        self.logger.info(f"Groups identified: {groups}")
 
         features = self.get_features(dfs, features)
-        logging.info(f"Features to be used: {features}")
+        self.logger.info(f"Features to be used: {features}")
 
-        features_values_range = self.get_features_ranges(dfs, features)
+        features_values_range = self.get_features_ranges(
+            dfs, features, self.parallel_settings, logger=self.logger
+        )
 
         self.update_histogram_settings_based_on_features(features, features_values_range)
-        logging.info(f"Settings updated: {self.histogram2d_settings}")
-        fig: Figure = self.multiplot_settings.build_multiplots_figure(
-            dataframes=dfs, titles=groups, settings_histogram=self.histogram2d_settings
+        self.logger.info(f"Settings updated: {self.histogram2d_settings}")
+        return dfs, groups, features
+
+    @isolated_run
+    def run_comparison(
+        self,
+        excel_filepath: str,
+        features: list[str] = [],
+        settings_comparison: ComparisonSettings = None,
+    ) -> pd.DataFrame:
+        """
+        Compare every group against every other group, or against the reference group. All the groups
+        are binned on the shared grid in one pass, the maps of all pairs are computed as one batched
+        operation, and saved as a small multiples figure ("comparison") together with the distance
+        matrix ("distances.csv")
+
+        Args:
+            excel_filepath (str): path to excel file
+            features (list[str], optional): features to be displayed. Defaults to [].
+            settings_comparison (ComparisonSettings, optional): metric and reference group. Defaults
+                to None, the default settings.
+
+        Returns:
+            pd.DataFrame: distance matrix, with the compared groups as index and all groups as columns
+        """
+        settings_comparison = settings_comparison or ComparisonSettings()
+        dfs, groups, features = self.prepare_data(excel_filepath, features)
+        self.start_manifest(
+            excel_filepath,
+            self.get_settings_hash(features, settings_comparison),
+            self.get_planned_outputs(["comparison"]) + [self.DISTANCES_FILENAME],
         )
-        self.write_image_to_formats(fig, "combined")
-        logging.info("Combined plot saved")
-        for df, title in zip(dfs, groups):
-            fig = self.multiplot_settings.build_individual_plot(
-                df=df, title=title, settings_histogram=self.histogram2d_settings
+        settings_histogram = self.histogram2d_settings.get_shared_grid_settings(dfs)
+        binned = settings_histogram.bin_dataframes(dfs)
+        rows, maps, distances = settings_comparison.compare(binned, groups)
+        distances_df = pd.DataFrame(distances, index=[groups[row] for row in rows], columns=groups)
+        self.logger.info(f"Distances ({settings_comparison.metric}):\n{distances_df}")
+        distances_df.to_csv(os.path.join(self.get_output_folder(), self.DISTANCES_FILENAME))
+        self.record_output(self.DISTANCES_FILENAME)
+        self.write_outputs(
+            "comparison",
+            partial(
+                self.multiplot_settings.build_comparison_figure,
+                maps=maps,
+                rows=rows,
+                titles=groups,
+                binned=binned[0],
+                settings_histogram=settings_histogram,
+                settings_comparison=settings_comparison,
+            ),
+        )
+        self.logger.info("Comparison plot saved")
+        return distances_df
+
+    @isolated_run
+    def run_uncertainty(
+        self,
+        excel_filepath: str,
+        features: list[str] = [],
+        settings_uncertainty: UncertaintySettings = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Estimate the bootstrap uncertainty of the percentage of each bin of each group. All the groups
+        are binned on the shared grid in one pass and resampled as one vectorized operation, and the
+        uncertainty maps are saved as the companion of the combined figure ("uncertainty"), together
+        with the table of the grids ("uncertainty.csv")
+
+        Args:
+            excel_filepath (str): path to excel file
+            features (list[str], optional): features to be displayed. Defaults to [].
+            settings_uncertainty (UncertaintySettings, optional): resamples and statistic. Defaults
+                to None, the default settings.
+
+        Returns:
+            dict[str, np.ndarray]: percentage and uncertainty grids, groups x y bins x x bins
+        """
+        settings_uncertainty = settings_uncertainty or UncertaintySettings()
+        dfs, groups, features = self.prepare_data(excel_filepath, features)
+        self.start_manifest(
+            excel_filepath,
+            self.get_settings_hash(features, settings_uncertainty),
+            self.get_planned_outputs(["uncertainty"]) + [self.UNCERTAINTY_FILENAME],
+        )
+        settings_histogram = self.histogram2d_settings.get_shared_grid_settings(dfs)
+        binned = settings_histogram.bin_dataframes(dfs)
+        grids = settings_uncertainty.compute(binned, self.parallel_settings, self.logger)
+        settings_uncertainty.get_table(grids, binned, groups).to_csv(
+            os.path.join(self.get_output_folder(), self.UNCERTAINTY_FILENAME), index=False
+        )
+        self.record_output(self.UNCERTAINTY_FILENAME)
+        self.write_outputs(
+            "uncertainty",
+            partial(
+                self.multiplot_settings.build_uncertainty_figure,
+                maps=settings_uncertainty.get_map(grids),
+                titles=groups,
+                binned=binned[0],
+                settings_histogram=settings_histogram,
+                settings_uncertainty=settings_uncertainty,
+            ),
+        )
+        self.logger.info("Uncertainty plot saved")
+        return grids
+
+    @isolated_run
+    def run_pair_grid(
+        self, excel_filepath: str, features: list[str] = [], bin_sizes: dict = {}
+    ) -> None:
+        """
+        Run the orchestrator for every pair of features. The file is read once and each feature is
+        ranged once across all the groups. Each group is saved as a grid of the 2D histograms of every
+        pair of features ("<group>_pairs"), with the distribution of each feature in the diagonal
+
+        Args:
+            excel_filepath (str): path to excel file
+            features (list[str], optional): features to be displayed. Defaults to [], all the
+                features of the first group.
+            bin_sizes (dict, optional): bin size of each feature. Features without bin size are auto
+                binned. Defaults to {}.
+        """
+        dfs, groups = self.read_data_from_file(data_filepath=excel_filepath)
+        if len(groups) == 0:
+            self.logger.error("Did not obtain expected format of excel")
+            raise ValueError("Did not obtain expected format of excel")
+        self.logger.info(f"Groups identified: {groups}")
+        features = self.get_features(dfs, features, max_feature_count=None)
+        if len(features) < self.MAX_FEATURE_COUNT:
+            error_message = "Pair grid needs at least two features"
+            self.logger.error(error_message)
+            raise ValueError(error_message)
+        self.logger.info(f"Features to be used: {features}")
+        features_values_range = self.get_features_ranges(
+            dfs, features, self.parallel_settings, max_feature_count=None, logger=self.logger
+        )
+        pair_settings = self.get_pair_settings(features, features_values_range, bin_sizes)
+        titles = [f"{group}_pairs" for group in groups]
+        self.start_manifest(
+            excel_filepath,
+            self.get_settings_hash(features, bin_sizes),
+            self.get_planned_outputs(titles),
+        )
+        for df, group, title in zip(dfs, groups, titles):
+            self.write_outputs(
+                title,
+                partial(
+                    self.multiplot_settings.build_pair_grid_figure,
+                    df=df,
+                    title=group,
+                    features=features,
+                    pair_settings=pair_settings,
+                ),
             )
-            self.write_image_to_formats(fig, title)
-            logging.info(f"Individual plot for {title} saved")
-        logging.info("All plots saved")
+            self.logger.info(f"Pair grid for {group} saved")
+        self.logger.info("All plots saved")
         return None
 
+    def get_pair_settings(
+        self, features: list[str], features_values_range: dict, bin_sizes: dict = {}
+    ) -> dict:
+        """
+        Get the histogram settings of every pair of features, from the ranges computed once per feature
+
+        Returns:
+            dict: settings of each (x feature, y feature) pair
+        """
+        pair_settings = {}
+        for x_feature in features:
+            for y_feature in features:
+                if x_feature == y_feature:
+                    continue
+                pair_settings[(x_feature, y_feature)] = replace(
+                    self.histogram2d_settings,
+                    x_axis_title=x_feature,
+                    y_axis_title=y_feature,
+                    max_feature_1=features_values_range[x_feature][0],
+                    min_feature_1=features_values_range[x_feature][1],
+                    max_feature_2=features_values_range[y_feature][0],
+                    min_feature_2=features_values_range[y_feature][1],
+                    feature_1_bin_size=bin_sizes.get(x_feature),
+                    feature_2_bin_size=bin_sizes.get(y_feature),
+                )
+        return pair_settings
+
     def write_image_to_formats(
         self, fig, title: str, formats: list[str] = ["pdf", "svg", "png"]
     ) -> None:
@@ -287,13 +1014,610 @@ class Orchestrator:
         Returns:
             : _description_
         """
-        filename = os.path.join(self.output_folder, title)
-        if "pdf" in formats:
-            fig.write_image(f"{filename}.pdf")
-        if "svg" in formats:
-            fig.write_image(f"{filename}.svg")
-        if "png" in formats:
-            fig.write_image(f"{filename}.png")
+        filename = os.path.join(self.get_output_folder(), title)
+        for extension in self.OUTPUT_FORMATS:
+            if extension in formats:
+                fig.write_image(f"{filename}.{extension}")
+                self.record_output(f"{title}.{extension}")
+        return None
+
+    def write_outputs(
+        self,
+        title: str,
+        build_figure,
+        binned: list[BinnedHistogram] = None,
+        titles: list[str] = None,
+        settings_histogram: Histogram2DContourSettings = None,
+    ) -> None:
+        """
+        Write the outputs of a figure that are still pending in the run. The figure is only built if
+        some format has to be rendered through plotly
+
+        Args:
+            title (str): title of the files where the figure will be saved
+            build_figure (Callable[[], Figure]): builds the plotly figure
+            binned (list[BinnedHistogram], optional): binned grids of the figure, for the raster and
+                native vector renderers. Without them, every format is rendered through plotly
+            titles (list[str], optional): titles of the binned grids
+            settings_histogram (Histogram2DContourSettings, optional): settings of the binned grids.
+                Defaults to the settings of the orchestrator.
+        """
+        pending_formats = self.get_pending_formats(title)
+        if len(pending_formats) == 0:
+            self.logger.info(f"Outputs of {title} already written, skipping")
+            return None
+        plotly_formats = pending_formats
+        if binned is not None:
+            plotly_formats = self.get_plotly_formats(pending_formats)
+        if len(plotly_formats) > 0:
+            self.write_image_to_formats(build_figure(), title, plotly_formats)
+        if binned is not None:
+            for extension in pending_formats:
+                if extension not in plotly_formats:
+                    self.write_binned_output(binned, titles, title, extension, settings_histogram)
+        return None
+
+    def get_pending_formats(self, title: str) -> list[str]:
+        """
+        Get the formats of the figure planned and not yet written in this run
+        """
+        if self.manifest is None:
+            return self.OUTPUT_FORMATS
+        return [
+            extension
+            for extension in self.OUTPUT_FORMATS
+            if f"{title}.{extension}" in self.manifest.planned_outputs
+            and not self.manifest.is_completed(f"{title}.{extension}", self.output_folder)
+        ]
+
+    def record_output(self, filename: str) -> None:
+        """
+        Mark the output as written in the manifest of the run, if there is one
+        """
+        if self.manifest is not None:
+            with self.outputs_lock:
+                self.manifest.mark_completed(filename, self.output_folder)
+        return None
+
+    def get_settings_hash(self, features: list[str], *other_settings) -> str:
+        """
+        Hash of everything that changes the rendered outputs, including the settings of the mode
+        """
+        # the bins are derived from the ranges, refresh them so they do not depend on previous runs
+        self.histogram2d_settings.define_bins()
+        return RunManifest.hash_settings(
+            self.histogram2d_settings,
+            self.multiplot_settings,
+            features,
+            self.png_renderer,
+            self.raster_settings,
+            self.sampling_settings,
+            self.prebinned_traces,
+            self.vector_renderer,
+            self.vector_settings,
+            self.export_settings,
+            self.filter_settings,
+            *other_settings,
+        )
+
+    def find_resumable_folder(self, manifest: RunManifest) -> str:
+        """
+        Find the run folder to resume. Returns None when there is no run to resume
+
+        Raises:
+            ValueError: If the run folder to resume was run with other inputs or settings
+        """
+        if isinstance(self.resume, str):
+            previous_manifest = RunManifest.load(self.resume)
+            if not previous_manifest.matches(manifest):
+                error_message = f"Run {self.resume} was run with different inputs or settings"
+                self.logger.error(error_message)
+                raise ValueError(error_message)
+            return self.resume
+        outputs_folder = os.path.join(self.root_folder, "outputs")
+        if not os.path.exists(outputs_folder):
+            return None
+        for run_folder in sorted(os.listdir(outputs_folder), reverse=True):
+            run_folder = os.path.join(outputs_folder, run_folder)
+            try:
+                previous_manifest = RunManifest.load(run_folder)
+            except (OSError, ValueError, TypeError):
+                continue
+            if previous_manifest.matches(manifest) and not previous_manifest.is_finished():
+                return run_folder
+        return None
+
+    def get_planned_outputs(
+        self, titles: list[str], formats: list[str] = OUTPUT_FORMATS
+    ) -> list[str]:
+        """
+        Get the filenames of the figures in every output format, or in the formats given
+        """
+        return [f"{title}.{extension}" for title in titles for extension in formats]
+
+    def start_manifest(
+        self,
+        data_filepath: str,
+        settings_hash: str,
+        planned_outputs: list[str],
+        completed_outputs: list[str] = None,
+    ) -> None:
+        """
+        Create the manifest of the run, with the planned outputs. When resuming, the outputs already
+        written by the interrupted run are kept as completed, as the completed_outputs given
+        """
+        manifest = RunManifest(
+            inputs=[RunManifest.describe_input(data_filepath)],
+            settings_hash=settings_hash,
+            planned_outputs=planned_outputs,
+            completed_outputs=list(completed_outputs or []),
+        )
+        if self.resume:
+            run_folder = self.find_resumable_folder(manifest)
+            if run_folder is not None:
+                manifest.completed_outputs = RunManifest.load(run_folder).completed_outputs
+                self.output_folder = run_folder
+                self.logger.info(
+                    f"Resuming run {run_folder}, {len(manifest.completed_outputs)} outputs already written"
+                )
+        self.manifest = manifest
+        self.manifest.save(self.get_output_folder())
+        return None
+
+    def sample_groups(
+        self, dfs: list[pd.DataFrame], groups: list[str], features: list[str]
+    ) -> list[pd.DataFrame]:
+        """
+        Replace the groups larger than the row threshold of the sampling settings by a sample of their
+        features, and log the estimated error bound of each bin of the sampled groups. The bound is
+        also kept in the metadata of the traces of those groups
+        """
+        if self.sampling_settings is None:
+            return dfs
+        dfs = self.parallel_settings.map(
+            partial(self.sampling_settings.sample, features=features), dfs
+        )
+        for df, title in zip(dfs, groups):
+            if self.sampling_settings.get_sampling_metadata(df) is not None:
+                binned = self.histogram2d_settings.bin_dataframe(df)
+                self.sampling_settings.log_error(binned, df, title, self.logger)
+        return dfs
+
+    def uses_binned_groups(self) -> bool:
+        """
+        Whether some output of the run is drawn or written from the binned groups
+        """
+        return (
+            self.png_renderer == "raster"
+            or self.vector_renderer == "native"
+            or self.export_settings is not None
+            or self.prebinned_traces
+        )
+
+    def bin_groups(self, dfs: list[pd.DataFrame]) -> list[BinnedHistogram]:
+        """
+        Count the data points of each group on the histogram grid. When the bin sizes are defined,
+        all the groups share the grid and are counted at once with the fused kernel. Else each group
+        is binned on the grid plotly auto sizes for it, in parallel as numpy releases the GIL
+        """
+        if self.histogram2d_settings.has_bin_sizes():
+            return self.histogram2d_settings.bin_dataframes(dfs)
+        return self.parallel_settings.map(self.histogram2d_settings.bin_dataframe, dfs)
+
+    def bin_groups_on_shared_grid(self, dfs: list[pd.DataFrame]) -> list[BinnedHistogram]:
+        """
+        Count the data points of all the groups on one grid, auto sized from all of them when the
+        bin sizes are not set, see Histogram2DContourSettings.get_shared_grid_settings
+        """
+        return self.histogram2d_settings.get_shared_grid_settings(dfs).bin_dataframes(dfs)
+
+    def get_plotly_formats(self, formats: list[str] = OUTPUT_FORMATS) -> list[str]:
+        """
+        Get the formats to be written through plotly and kaleido, leaving out the PNG when the raster
+        renderer is selected, and the SVG and PDF when the native vector renderer is selected. Both
+        draw rectangular grids, so hexagonal bins are always written through plotly
+        """
+        if self.histogram2d_settings.bin_shape == "hexagon":
+            return list(formats)
+        if self.png_renderer == "raster":
+            formats = [extension for extension in formats if extension != "png"]
+        if self.vector_renderer == "native":
+            formats = [extension for extension in formats if extension not in ("svg", "pdf")]
+        return formats
+
+    def write_binned_output(
+        self,
+        binned: list[BinnedHistogram],
+        titles: list[str],
+        title: str,
+        extension: str,
+        settings_histogram: Histogram2DContourSettings = None,
+    ) -> None:
+        """
+        Write the binned groups to a file with the raster or the native vector renderer, bypassing
+        kaleido
+
+        Args:
+            binned (list[BinnedHistogram]): binned grid of each group
+            titles (list[str]): title of each group
+            title (str): title of the file where the figure will be saved
+            extension (str): "png" for the raster renderer, "svg" or "pdf" for the vector one
+            settings_histogram (Histogram2DContourSettings, optional): settings of the binned grids.
+                Defaults to the settings of the orchestrator.
+        """
+        filename = f"{os.path.join(self.get_output_folder(), title)}.{extension}"
+        with open(filename, "wb") as file:
+            file.write(self.render_binned_output(binned, titles, extension, settings_histogram))
+        self.record_output(f"{title}.{extension}")
+        return None
+
+    def render_binned_output(
+        self,
+        binned: list[BinnedHistogram],
+        titles: list[str],
+        extension: str,
+        settings_histogram: Histogram2DContourSettings = None,
+    ) -> bytes:
+        """
+        Render the binned groups with the raster renderer ("png") or the native vector renderer
+        ("svg" or "pdf")
+
+        Returns:
+            bytes: content of the file
+        """
+        settings_histogram = settings_histogram or self.histogram2d_settings
+        if extension == "png":
+            return self.raster_settings.render_png(binned, titles, settings_histogram)
+        return self.vector_settings.render(
+            binned, titles, settings_histogram, self.multiplot_settings, extension
+        )
+
+    def split_groups(
+        self, data: pd.DataFrame | dict[str, pd.DataFrame]
+    ) -> tuple[list[pd.DataFrame], list[str]]:
+        """
+        Get the groups of data already in memory
+
+        Args:
+            data (pd.DataFrame | dict[str, pd.DataFrame]): either a dataframe laid out as the data
+                files, with the group names as header and the feature names as first row, or the
+                dataframe of each group by group name, with the feature names as columns
+
+        Returns:
+            list[pd.DataFrame]: list of dataframes, one per group
+            list[str]: list of group names
+
+        Raises:
+            ValueError: If a column of a group is not numeric
+        """
+        if isinstance(data, pd.DataFrame):
+            return PandasBackend.get_groups_df(
+                data.copy(), self.parallel_settings, self.filter_settings, self.logger
+            )
+        dfs = []
+        for group, df in data.items():
+            try:
+                df = df.dropna().apply(pd.to_numeric)
+            except (ValueError, TypeError) as e:
+                error_message = f"Could not convert the columns of group {group} to numeric"
+                self.logger.error(error_message)
+                raise ValueError(error_message) from e
+            if self.filter_settings is not None:
+                df = pd.DataFrame(
+                    self.filter_settings.apply(
+                        {column: df[column].to_numpy() for column in df}, self.logger
+                    )
+                )
+            dfs.append(df)
+        return dfs, list(data.keys())
+
+    @isolated_run
+    def render(
+        self,
+        data: pd.DataFrame | dict[str, pd.DataFrame],
+        features: list[str] = [],
+        titles: list[str] = None,
+        formats: list[str] = [],
+        return_figures: bool = True,
+        save: bool = False,
+    ) -> RenderResult:
+        """
+        Render data already in memory, without reading or writing files unless save is set. The
+        groups are always binned, the plotly figures and the image bytes only when requested
+
+        Args:
+            data (pd.DataFrame | dict[str, pd.DataFrame]): the groups, see split_groups
+            features (list[str], optional): features to be displayed. Defaults to [].
+            titles (list[str], optional): figures to render, "combined" and group names. Defaults to
+                all of them.
+            formats (list[str], optional): formats of the image bytes, among "pdf", "svg" and
+                "png". Defaults to [].
+            return_figures (bool, optional): return the plotly figures. Defaults to True.
+            save (bool, optional): also write the images to the outputs folder. Defaults to False.
+
+        Returns:
+            RenderResult: binned groups, figures and images
+
+        Raises:
+            ValueError: If a format or a figure title is unknown
+        """
+        unknown_formats = [
+            extension for extension in formats if extension not in self.OUTPUT_FORMATS
+        ]
+        if len(unknown_formats) > 0:
+            error_message = (
+                f"Unknown formats {unknown_formats}. Expected any of {self.OUTPUT_FORMATS}"
+            )
+            self.logger.error(error_message)
+            raise ValueError(error_message)
+        dfs, groups = self.split_groups(data)
+        dfs, groups, features = self.prepare_groups(dfs, groups, features)
+        if titles is None:
+            titles = [self.COMBINED_TITLE] + groups
+        unknown_titles = [
+            title for title in titles if title != self.COMBINED_TITLE and title not in groups
+        ]
+        if len(unknown_titles) > 0:
+            error_message = f"Unknown figures {unknown_titles}. Expected any of {groups}"
+            self.logger.error(error_message)
+            raise ValueError(error_message)
+        dfs = self.sample_groups(dfs, groups, features)
+        binned = self.bin_groups(dfs)
+        result = RenderResult(groups=groups, features=features, binned=binned)
+        plotly_formats = self.get_plotly_formats(formats)
+        for title in titles:
+            if title == self.COMBINED_TITLE:
+                group_indexes = list(range(len(groups)))
+                build_figure = partial(
+                    self.multiplot_settings.build_multiplots_figure,
+                    dataframes=dfs,
+                    titles=groups,
+                    settings_histogram=self.histogram2d_settings,
+                    parallel=self.parallel_settings,
+                    binned=binned if self.prebinned_traces else None,
+                )
+            else:
+                group_indexes = [groups.index(title)]
+                build_figure = partial(
+                    self.multiplot_settings.build_individual_plot,
+                    df=dfs[group_indexes[0]],
+                    title=title,
+                    settings_histogram=self.histogram2d_settings,
+                    binned=binned[group_indexes[0]] if self.prebinned_traces else None,
+                )
+            fig = None
+            if return_figures or len(plotly_formats) > 0:
+                fig = build_figure()
+            if return_figures:
+                result.figures[title] = fig
+            for extension in formats:
+                if extension in plotly_formats:
+                    content = fig.to_image(format=extension)
+                else:
+                    content = self.render_binned_output(
+                        [binned[idx] for idx in group_indexes],
+                        [groups[idx] for idx in group_indexes],
+                        extension,
+                    )
+                result.images.setdefault(title, {})[extension] = content
+                if save:
+                    self.save_image(content, title, extension)
+        return result
+
+    def save_image(self, content: bytes, title: str, extension: str) -> None:
+        """
+        Write rendered image bytes to the outputs folder
+        """
+        with open(os.path.join(self.get_output_folder(), f"{title}.{extension}"), "wb") as file:
+            file.write(content)
+        self.record_output(f"{title}.{extension}")
+        return None
+
+    def get_export_outputs(self) -> list[str]:
+        """
+        Get the filenames of the data exports of the run
+        """
+        if self.export_settings is None:
+            return []
+        return self.export_settings.get_filenames()
+
+    def get_pending_exports(self) -> list[str]:
+        """
+        Get the filenames of the data exports not yet written in this run
+        """
+        return [
+            filename
+            for filename in self.get_export_outputs()
+            if self.manifest is None or not self.manifest.is_completed(filename, self.output_folder)
+        ]
+
+    def write_exports(
+        self, binned: list[BinnedHistogram], groups: list[str], statistics: pd.DataFrame
+    ) -> None:
+        """
+        Write the data exports still pending in the run, from the binned grids of the figures
+        """
+        pending_filenames = self.get_pending_exports()
+        if len(pending_filenames) == 0:
+            return None
+        written = self.export_settings.write(
+            self.get_output_folder(), binned, groups, statistics, pending_filenames
+        )
+        for filename in written:
+            self.record_output(filename)
+        self.logger.info(f"Data exported to {written}")
+        return None
+
+    def get_combined_titles(self, number_of_pages: int) -> list[str]:
+        """
+        Get the titles of the pages of the combined figure, "combined" when there is a single page
+        """
+        if number_of_pages == 1:
+            return [self.COMBINED_TITLE]
+        width = len(str(number_of_pages))
+        return [
+            f"{self.COMBINED_TITLE}_page_{number:0{width}d}"
+            for number in range(1, number_of_pages + 1)
+        ]
+
+    def get_stitched_outputs(self, number_of_pages: int) -> list[str]:
+        """
+        Get the filename of the multi-page PDF of the combined figure, if the pages are stitched
+        """
+        if number_of_pages > 1 and self.multiplot_settings.stitch_pages:
+            return [f"{self.COMBINED_TITLE}.pdf"]
+        return []
+
+    def get_shared_scale_settings(
+        self, binned: list[BinnedHistogram], dfs: list[pd.DataFrame] = None
+    ) -> Histogram2DContourSettings:
+        """
+        Get the histogram settings fixed to the grid and the colorbar range of all the groups, so
+        figures showing a subset of the groups keep the scales of the whole set
+
+        Args:
+            binned (list[BinnedHistogram]): all the groups, binned on a shared grid
+            dfs (list[pd.DataFrame], optional): all the groups, whose hexagons give the colorbar
+                range with hexagonal bins. Defaults to None, the range of the binned groups.
+        """
+        if self.histogram2d_settings.bin_shape == "hexagon" and dfs is not None:
+            zmin, zmax = self.histogram2d_settings.get_hexagon_z_range(
+                self.parallel_settings.map(self.histogram2d_settings.bin_hexagons, dfs)
+            )
+        else:
+            zmin, zmax = RasterSettings.get_z_range(binned, self.histogram2d_settings)
+        x_edges, y_edges = binned[0].x_edges, binned[0].y_edges
+        x_size = x_edges[1] - x_edges[0]
+        y_size = y_edges[1] - y_edges[0]
+        # define_bins starts the grid one bin size below the minimum
+        return replace(
+            self.histogram2d_settings,
+            hist_colorbar_min=zmin,
+            hist_colorbar_max=zmax,
+            min_feature_1=float(x_edges[0] + x_size),
+            max_feature_1=float(x_edges[-1]),
+            feature_1_bin_size=float(x_size),
+            min_feature_2=float(y_edges[0] + y_size),
+            max_feature_2=float(y_edges[-1]),
+            feature_2_bin_size=float(y_size),
+        )
+
+    def write_combined_pages(
+        self,
+        dfs: list[pd.DataFrame],
+        groups: list[str],
+        pages: list[slice],
+        binned: list[BinnedHistogram],
+    ) -> None:
+        """
+        Write the combined figure split in pages, so the size and render time of each figure stay
+        bounded as the number of groups grows. All the pages share the grid and colorbar range of the
+        whole set of groups. The pages are handled concurrently in threads: the figures are built
+        and the raster and native renderers draw in parallel, while kaleido exports the figures one
+        at a time through its single subprocess. The pages are optionally stitched into one
+        multi-page PDF
+
+        Args:
+            dfs (list[pd.DataFrame]): all the groups
+            groups (list[str]): names of the groups
+            pages (list[slice]): groups of each page
+            binned (list[BinnedHistogram]): all the groups, binned on a shared grid
+        """
+        settings_histogram = self.get_shared_scale_settings(binned, dfs)
+        page_titles = self.get_combined_titles(len(pages))
+        parallel = self.parallel_settings
+        if parallel.mode == "process":
+            # the outputs are recorded in the manifest of this process
+            parallel = replace(parallel, mode="thread")
+        parallel.map(
+            partial(
+                self.write_combined_page,
+                dfs=dfs,
+                groups=groups,
+                binned=binned,
+                settings_histogram=settings_histogram,
+            ),
+            list(zip(page_titles, pages)),
+        )
+        if len(self.get_stitched_outputs(len(pages))) > 0:
+            self.stitch_combined_pages(page_titles, binned, groups, pages, settings_histogram)
+        return None
+
+    def write_combined_page(
+        self,
+        page: tuple[str, slice],
+        dfs: list[pd.DataFrame],
+        groups: list[str],
+        binned: list[BinnedHistogram],
+        settings_histogram: Histogram2DContourSettings,
+    ) -> None:
+        """
+        Write one page of the combined figure
+
+        Args:
+            page (tuple[str, slice]): title of the page, and its groups
+        """
+        title, groups_slice = page
+        self.write_outputs(
+            title,
+            partial(
+                self.multiplot_settings.build_multiplots_figure,
+                dataframes=dfs[groups_slice],
+                titles=groups[groups_slice],
+                settings_histogram=settings_histogram,
+                binned=binned[groups_slice] if self.prebinned_traces else None,
+            ),
+            binned[groups_slice] if self.uses_binned_groups() else None,
+            groups[groups_slice],
+            settings_histogram,
+        )
+        self.logger.info(f"Combined plot page {title} saved")
+        return None
+
+    def stitch_combined_pages(
+        self,
+        page_titles: list[str],
+        binned: list[BinnedHistogram],
+        groups: list[str],
+        pages: list[slice],
+        settings_histogram: Histogram2DContourSettings,
+    ) -> None:
+        """
+        Write the pages of the combined figure into one multi-page PDF. The native vector renderer
+        draws the pages straight into it, else the PDF of each page is appended with pypdf
+
+        Raises:
+            ImportError: If the pages are rendered with kaleido and pypdf is not installed
+        """
+        filename = f"{self.COMBINED_TITLE}.pdf"
+        if "pdf" not in self.get_pending_formats(self.COMBINED_TITLE):
+            return None
+        filepath = os.path.join(self.get_output_folder(), filename)
+        if self.vector_renderer == "native":
+            canvases = [
+                self.vector_settings.build_canvas(
+                    binned[groups_slice],
+                    groups[groups_slice],
+                    settings_histogram,
+                    self.multiplot_settings,
+                )
+                for groups_slice in pages
+            ]
+            with open(filepath, "wb") as file:
+                file.write(encode_pdf(canvases))
+        else:
+            try:
+                from pypdf import PdfWriter
+            except ImportError as e:
+                error_message = "Stitching the pages of the combined figure requires pypdf"
+                self.logger.error(error_message)
+                raise ImportError(error_message) from e
+            writer = PdfWriter()
+            for page_title in page_titles:
+                writer.append(os.path.join(self.output_folder, f"{page_title}.pdf"))
+            writer.write(filepath)
+        self.record_output(filename)
+        self.logger.info(f"Combined plot pages stitched into {filename}")
         return None
 
     def update_histogram_settings_based_on_features(self, features, features_values_range) -> None:
@@ -319,7 +1643,12 @@ class Orchestrator:
 
     @classmethod
     def get_features_ranges(
-        cls, dfs: list[pd.DataFrame], features: list[str]
+        cls,
+        dfs: list[pd.DataFrame],
+        features: list[str],
+        parallel: ParallelSettings = None,
+        max_feature_count: int = MAX_FEATURE_COUNT,
+        logger: logging.Logger | logging.LoggerAdapter = None,
     ):  # -> dict[Any, Any]:
         """
         Get the range of values for each feature
@@ -327,6 +1656,11 @@ class Orchestrator:
         Args:
             features (list[str]): list of features. Should exist in each of the dataframes provided
             dfs (list[pd.Dataframe]): list of dataframes
+            parallel (ParallelSettings, optional): executor of the per group reduction. Defaults to serial
+            max_feature_count (int, optional): number of features to get the range of. None for all.
+                Defaults to MAX_FEATURE_COUNT.
+            logger (logging.Logger | logging.LoggerAdapter, optional): logger of the ranges, as the
+                one of the run. Defaults to the logger of this module.
 
         Returns:
             dict: dictionary with the feature as key and the range of values as value. For example:
@@ -335,25 +1669,33 @@ class Orchestrator:
                     "Intensity": (100, 200),
                 }
         """
+        logger = logger or logging.getLogger(__name__)
         features_values_range = {}
         try:
-            for feature in features[: cls.MAX_FEATURE_COUNT]:
-                max_value, min_value = cls.get_max_min_column_value(dfs, feature)
+            for feature in features[:max_feature_count]:
+                groups_ranges = (parallel or ParallelSettings()).map(
+                    partial(cls.get_max_min_column_value, column_value=feature),
+                    [[df] for df in dfs],
+                )
+                max_value = max((group_range[0] for group_range in groups_ranges), default=0)
+                min_value = min((group_range[1] for group_range in groups_ranges), default=0)
                 features_values_range[feature] = (max_value, min_value)
-                logging.debug(f"{feature} values range from {min_value} to {max_value}")
+                logger.debug(f"{feature} values range from {min_value} to {max_value}")
         except Exception as e:
-            logging.error(f"Error getting features ranges: {e}")
+            logger.error(f"Error getting features ranges: {e}")
             raise e
 
         return features_values_range
 
-    def get_features(self, dfs, features=[]):
+    def get_features(self, dfs, features=[], max_feature_count: int = MAX_FEATURE_COUNT):
         """
         Get the features to be used in the analysis. If the features are not provided, the first two features of the first dataframe will be used.
 
         Args:
             dfs (list[pd.Dataframe]): list of dataframes
             features (list[str]): column names in the dataframes. Can be provided as a empty list
+            max_feature_count (int, optional): number of features used when they are not provided.
+                None for all the features of the first dataframe. Defaults to MAX_FEATURE_COUNT.
 
         Raises:
             ValueError: If the first dataframe does not have at least two features
@@ -366,18 +1708,17 @@ class Orchestrator:
             try:
                 # ensure it is a list of strings
                 features = [
-                    str(column)
-                    for column in dfs[0].columns.values[: self.MAX_FEATURE_COUNT].tolist()
+                    str(column) for column in dfs[0].columns.values[:max_feature_count].tolist()
                 ]
             except:
                 error_message = "First Group Does not have at least two features"
-                logging.error(error_message)
+                self.logger.error(error_message)
                 raise ValueError(error_message)
         # check if features exist in all dataframes
         for df in dfs:
             for feature in features:
                 if feature not in df.columns:
                     error_message = f"Feature {feature} does not exist in all dataframes. \n Dataframe has columns {df.columns}"
-                    logging.error(error_message)
+                    self.logger.error(error_message)
                     raise ValueError(error_message)
         return features
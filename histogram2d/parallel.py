@@ -0,0 +1,62 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ParallelSettings(object):
+    """
+    Executor of the per group work. Results are always returned in the order of the items.
+
+    mode:
+        "serial": run one item after the other, in the calling thread
+        "thread": run the items in a thread pool
+        "process": run the items in a process pool. The function and items must be picklable
+        "auto": run in a thread pool the work whose kernels release the GIL (numpy binning,
+            arrow and polars casts) and in a process pool the work that does not (pandas object
+            columns conversion, plotly traces construction)
+    """
+
+    mode: str = "serial"
+    max_workers: int = None
+
+    MODES = ("serial", "thread", "process", "auto")
+
+    def __post_init__(self):
+        if self.mode not in self.MODES:
+            error_message = f"Unknown parallel mode {self.mode}. Expected one of {self.MODES}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+    def get_mode(self, releases_gil: bool = True) -> str:
+        """
+        Get the mode to run a task in, resolving "auto" based on whether the task releases the GIL
+        """
+        if self.mode != "auto":
+            return self.mode
+        return "thread" if releases_gil else "process"
+
+    def map(self, function: Callable, items: Iterable, releases_gil: bool = True) -> list:
+        """
+        Apply the function to each of the items
+
+        Args:
+            function (Callable): function of one argument
+            items (Iterable): items to apply the function to
+            releases_gil (bool, optional): whether the function spends most of its time in kernels
+                that release the GIL. Only used by the "auto" mode. Defaults to True.
+
+        Returns:
+            list: results, in the same order as the items
+        """
+        items = list(items)
+        mode = self.get_mode(releases_gil)
+        if mode == "serial" or len(items) <= 1:
+            return [function(item) for item in items]
+        executor_class = ThreadPoolExecutor if mode == "thread" else ProcessPoolExecutor
+        logger.debug(f"Running {len(items)} tasks in {mode} pool")
+        with executor_class(max_workers=self.max_workers) as executor:
+            return list(executor.map(function, items))
@@ -0,0 +1,105 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutputPlan(object):
+    """
+    Outputs requested from a run. Only the work these outputs depend on is executed: the groups
+    without a requested figure are not sampled nor binned, the figures and formats not requested are
+    not built nor rendered, and the statistics are only computed for the data exports.
+
+    groups: groups whose individual figure is requested. None for all of them
+    figures: kinds of figures requested, "combined" (all its pages) and "individual"
+    formats: image formats requested. None for all the output formats
+    exports: whether the data exports of the export settings are requested
+    """
+
+    groups: list[str] = None
+    figures: list[str] = field(default_factory=lambda: ["combined", "individual"])
+    formats: list[str] = None
+    exports: bool = True
+
+    FIGURES = ("combined", "individual")
+
+    def __post_init__(self):
+        unknown_figures = [figure for figure in self.figures if figure not in self.FIGURES]
+        if len(unknown_figures) > 0:
+            error_message = f"Unknown figures {unknown_figures}. Expected any of {self.FIGURES}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+    def get_groups(self, groups: list[str]) -> list[str]:
+        """
+        Get the groups whose individual figure is requested, in the order of the file
+
+        Raises:
+            ValueError: If a requested group does not exist
+        """
+        if "individual" not in self.figures:
+            return []
+        if self.groups is None:
+            return list(groups)
+        unknown_groups = [group for group in self.groups if group not in groups]
+        if len(unknown_groups) > 0:
+            error_message = f"Unknown groups {unknown_groups}. Expected any of {groups}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+        return [group for group in groups if group in self.groups]
+
+    def get_formats(self, formats: list[str]) -> list[str]:
+        """
+        Get the requested formats among the output formats
+
+        Raises:
+            ValueError: If a requested format is not an output format
+        """
+        if self.formats is None:
+            return list(formats)
+        unknown_formats = [extension for extension in self.formats if extension not in formats]
+        if len(unknown_formats) > 0:
+            error_message = f"Unknown formats {unknown_formats}. Expected any of {formats}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+        return [extension for extension in formats if extension in self.formats]
+
+
+class LazyGraph(object):
+    """
+    Graph of the intermediate results of a run. Each node is computed the first time it is
+    requested, after the nodes it depends on, and its result is shared by every output requesting
+    it. Nodes never requested are never computed
+    """
+
+    def __init__(self, logger: logging.Logger | logging.LoggerAdapter = None) -> None:
+        self.nodes: dict[str, tuple[Callable, tuple[str, ...]]] = {}
+        self.results: dict = {}
+        # the orchestrator computes the graph with the logger of its run
+        self.logger = logger or logging.getLogger(__name__)
+
+    def add(self, name: str, function: Callable, dependencies: tuple[str, ...] = ()) -> None:
+        """
+        Declare a node, computed as function(*results of the dependencies)
+        """
+        self.nodes[name] = (function, tuple(dependencies))
+
+    def get(self, name: str):
+        """
+        Get the result of a node, computing it and its dependencies if needed
+        """
+        if name not in self.results:
+            function, dependencies = self.nodes[name]
+            arguments = [self.get(dependency) for dependency in dependencies]
+            self.logger.debug(f"Computing {name}")
+            self.results[name] = function(*arguments)
+        return self.results[name]
+
+    @property
+    def computed(self) -> list[str]:
+        """
+        Nodes computed so far, in the order they were computed
+        """
+        return list(self.results)
@@ -0,0 +1,331 @@
+import struct
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+from plotly.colors import get_colorscale, sample_colorscale, unlabel_rgb
+
+from histogram2d.builder import BinnedHistogram, Histogram2DContourSettings
+
+# 3x5 pixels bitmap font, one string of rows per glyph. Lower case letters are drawn as upper case
+FONT = {
+    "0": "111,101,101,101,111",
+    "1": "010,110,010,010,111",
+    "2": "111,001,111,100,111",
+    "3": "111,001,111,001,111",
+    "4": "101,101,111,001,001",
+    "5": "111,100,111,001,111",
+    "6": "111,100,111,101,111",
+    "7": "111,001,010,010,010",
+    "8": "111,101,111,101,111",
+    "9": "111,101,111,001,111",
+    "A": "010,101,111,101,101",
+    "B": "110,101,110,101,110",
+    "C": "011,100,100,100,011",
+    "D": "110,101,101,101,110",
+    "E": "111,100,110,100,111",
+    "F": "111,100,110,100,100",
+    "G": "011,100,101,101,011",
+    "H": "101,101,111,101,101",
+    "I": "111,010,010,010,111",
+    "J": "001,001,001,101,010",
+    "K": "101,101,110,101,101",
+    "L": "100,100,100,100,111",
+    "M": "101,111,111,101,101",
+    "N": "110,101,101,101,101",
+    "O": "010,101,101,101,010",
+    "P": "110,101,110,100,100",
+    "Q": "010,101,101,110,011",
+    "R": "110,101,110,101,101",
+    "S": "011,100,010,001,110",
+    "T": "111,010,010,010,010",
+    "U": "101,101,101,101,111",
+    "V": "101,101,101,101,010",
+    "W": "101,101,111,111,101",
+    "X": "101,101,010,101,101",
+    "Y": "101,101,010,010,010",
+    "Z": "111,001,010,100,111",
+    " ": "000,000,000,000,000",
+    ".": "000,000,000,000,010",
+    ",": "000,000,000,010,100",
+    "-": "000,000,111,000,000",
+    "+": "000,010,111,010,000",
+    "%": "101,001,010,100,101",
+    ":": "000,010,000,010,000",
+    "#": "101,111,101,111,101",
+    "_": "000,000,000,000,111",
+    "(": "001,010,010,010,001",
+    ")": "100,010,010,010,100",
+    "/": "001,001,010,100,100",
+    "=": "000,111,000,111,000",
+    "?": "111,001,010,000,010",
+}
+GLYPHS = {
+    char: np.array([[bit == "1" for bit in row] for row in rows.split(",")])
+    for char, rows in FONT.items()
+}
+BLACK = np.array([0, 0, 0], dtype=np.uint8)
+WHITE = np.array([255, 255, 255], dtype=np.uint8)
+
+
+def encode_png(image: np.ndarray, compression_level: int = 6) -> bytes:
+    """
+    Encode a height x width x 3 uint8 array as a truecolor PNG
+
+    Args:
+        image (np.ndarray): RGB image
+        compression_level (int, optional): zlib compression level. Defaults to 6.
+
+    Returns:
+        bytes: content of the PNG file
+    """
+    height, width, _ = image.shape
+    # each scanline starts with the filter type, 0 meaning no filter
+    scanlines = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+    scanlines[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + tag
+            + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+        )
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(scanlines.tobytes(), compression_level))
+        + chunk(b"IEND", b"")
+    )
+
+
+def render_text(text: str, scale: int = 2) -> np.ndarray:
+    """
+    Render the text with the bitmap font
+
+    Returns:
+        np.ndarray: boolean mask of the text pixels
+    """
+    glyphs = [GLYPHS.get(char.upper(), GLYPHS["?"]) for char in text]
+    if len(glyphs) == 0:
+        return np.zeros((5 * scale, 0), dtype=bool)
+    spacing = np.zeros((5, 1), dtype=bool)
+    mask = np.hstack([part for glyph in glyphs for part in (glyph, spacing)][:-1])
+    return np.kron(mask, np.ones((scale, scale), dtype=bool))
+
+
+def draw_mask(image: np.ndarray, mask: np.ndarray, top: int, left: int, color=BLACK) -> None:
+    """
+    Paint the mask on the image, clipping whatever falls outside of it
+    """
+    height, width, _ = image.shape
+    top_clip, left_clip = max(0, -top), max(0, -left)
+    bottom = min(height, top + mask.shape[0])
+    right = min(width, left + mask.shape[1])
+    if bottom <= top + top_clip or right <= left + left_clip:
+        return
+    mask = mask[top_clip : bottom - top, left_clip : right - left]
+    image[top + top_clip : bottom, left + left_clip : right][mask] = color
+
+
+def get_band_colors(colorscale: str, number_of_contours: int) -> np.ndarray:
+    """
+    Get the color of each contour band, sampled at the middle of the band
+
+    Returns:
+        np.ndarray: number_of_contours x 3 uint8 RGB colors
+    """
+    positions = (np.arange(number_of_contours) + 0.5) / number_of_contours
+    colors = sample_colorscale(get_colorscale(colorscale), positions.tolist())
+    return np.array([unlabel_rgb(color) for color in colors], dtype=float).astype(np.uint8)
+
+
+def format_tick(value: float) -> str:
+    return f"{value:.3g}"
+
+
+@dataclass
+class RasterSettings(object):
+    """
+    Settings of the raster renderer, which draws the binned grid of each group straight into a PNG,
+    without plotly and kaleido. Meant for thumbnails and previews, the styling is approximate
+    """
+
+    panel_width: int = 480
+    panel_height: int = 360
+    number_of_contours: int = 10
+    font_scale: int = 2
+    number_of_ticks: int = 5
+    compression_level: int = 6
+
+    @staticmethod
+    def get_z_range(
+        binned: list[BinnedHistogram], settings_histogram: Histogram2DContourSettings
+    ) -> tuple[float, float]:
+        """
+        Get the colorbar range, either from the settings or from the data when not set
+        """
+        zmin = settings_histogram.hist_colorbar_min
+        zmax = settings_histogram.hist_colorbar_max
+        if zmin is None:
+            zmin = min(float(group.z.min()) for group in binned)
+        if zmax is None:
+            zmax = max(float(group.z.max()) for group in binned)
+        if zmax <= zmin:
+            zmax = zmin + 1
+        return zmin, zmax
+
+    def get_bands(self, binned: BinnedHistogram, zmin: float, zmax: float, width: int, height: int):
+        """
+        Interpolate the grid bilinearly between bin centers on a width x height pixels canvas and
+        quantize it into contour bands
+
+        Returns:
+            np.ndarray: height x width band indices, with the first row at the top of the plot
+        """
+        z = binned.z.astype(float)
+        x_centers = binned.x_centers
+        y_centers = binned.y_centers
+        pixels_x = np.linspace(x_centers[0], x_centers[-1], width)
+        pixels_y = np.linspace(y_centers[-1], y_centers[0], height)
+
+        def interpolation_weights(pixels, centers):
+            position = np.interp(pixels, centers, np.arange(len(centers)))
+            lower = np.floor(position).astype(int)
+            upper = np.minimum(lower + 1, len(centers) - 1)
+            return lower, upper, position - lower
+
+        x_lower, x_upper, x_weight = interpolation_weights(pixels_x, x_centers)
+        y_lower, y_upper, y_weight = interpolation_weights(pixels_y, y_centers)
+        along_x = z[:, x_lower] * (1 - x_weight) + z[:, x_upper] * x_weight
+        canvas = (
+            along_x[y_lower, :] * (1 - y_weight[:, None]) + along_x[y_upper, :] * y_weight[:, None]
+        )
+        bands = np.floor((canvas - zmin) / (zmax - zmin) * self.number_of_contours)
+        return np.clip(bands, 0, self.number_of_contours - 1).astype(int)
+
+    def draw_ticks(self, image, axis_values, pixels, left, top, vertical: bool) -> None:
+        for value, pixel in zip(axis_values, pixels):
+            label = render_text(format_tick(value), self.font_scale)
+            if vertical:
+                image[pixel, left - 4 : left] = BLACK
+                draw_mask(image, label, pixel - label.shape[0] // 2, left - 6 - label.shape[1])
+            else:
+                image[top : top + 4, pixel] = BLACK
+                draw_mask(image, label, top + 6, pixel - label.shape[1] // 2)
+
+    def render_panel(
+        self,
+        binned: BinnedHistogram,
+        title: str,
+        settings_histogram: Histogram2DContourSettings,
+        z_range: tuple[float, float] = None,
+    ) -> np.ndarray:
+        """
+        Render one group: contour bands, axes with ticks and titles, and colorbar
+
+        Returns:
+            np.ndarray: panel_height x panel_width x 3 uint8 image
+        """
+        zmin, zmax = z_range or self.get_z_range([binned], settings_histogram)
+        text_height = 5 * self.font_scale
+        margin_left = 10 * text_height // 2 + text_height + 12
+        margin_right = 8 * text_height // 2 + 40
+        margin_top = 2 * text_height + 8
+        margin_bottom = 2 * text_height + 20
+        plot_width = self.panel_width - margin_left - margin_right
+        plot_height = self.panel_height - margin_top - margin_bottom
+
+        image = np.empty((self.panel_height, self.panel_width, 3), dtype=np.uint8)
+        image[:] = WHITE
+        colors = get_band_colors(settings_histogram.colorscale, self.number_of_contours)
+        bands = self.get_bands(binned, zmin, zmax, plot_width, plot_height)
+        plot = colors[bands]
+        boundaries = np.zeros(bands.shape, dtype=bool)
+        boundaries[:, 1:] |= bands[:, 1:] != bands[:, :-1]
+        boundaries[1:, :] |= bands[1:, :] != bands[:-1, :]
+        if settings_histogram.contour_filling == "lines":
+            plot[~boundaries] = WHITE
+        elif settings_histogram.contour_show_lines:
+            plot[boundaries] = (plot[boundaries] * 0.6).astype(np.uint8)
+        plot_bottom = margin_top + plot_height
+        plot_right = margin_left + plot_width
+        image[margin_top:plot_bottom, margin_left:plot_right] = plot
+        # axes
+        image[plot_bottom, margin_left - 1 : plot_right] = BLACK
+        image[margin_top:plot_bottom, margin_left - 1] = BLACK
+
+        x_centers, y_centers = binned.x_centers, binned.y_centers
+        x_ticks = np.linspace(x_centers[0], x_centers[-1], self.number_of_ticks)
+        y_ticks = np.linspace(y_centers[0], y_centers[-1], self.number_of_ticks)
+        x_pixels = np.linspace(margin_left, plot_right - 1, self.number_of_ticks).astype(int)
+        y_pixels = np.linspace(plot_bottom - 1, margin_top, self.number_of_ticks).astype(int)
+        self.draw_ticks(image, x_ticks, x_pixels, margin_left, plot_bottom, vertical=False)
+        self.draw_ticks(image, y_ticks, y_pixels, margin_left - 1, margin_top, vertical=True)
+
+        # titles
+        title_mask = render_text(title, self.font_scale)
+        draw_mask(image, title_mask, 4, (self.panel_width - title_mask.shape[1]) // 2)
+        x_title = render_text(settings_histogram.x_axis_title, self.font_scale)
+        draw_mask(
+            image,
+            x_title,
+            self.panel_height - text_height - 4,
+            margin_left + (plot_width - x_title.shape[1]) // 2,
+        )
+        y_title = np.rot90(render_text(settings_histogram.y_axis_title, self.font_scale))
+        draw_mask(image, y_title, margin_top + (plot_height - y_title.shape[0]) // 2, 2)
+
+        # colorbar
+        colorbar_left = plot_right + 12
+        colorbar_width = 14
+        levels = np.linspace(self.number_of_contours - 1, 0, plot_height).round().astype(int)
+        image[margin_top:plot_bottom, colorbar_left : colorbar_left + colorbar_width] = colors[
+            levels
+        ][:, None, :]
+        suffix = "%" if settings_histogram.normalized else ""
+        for value, pixel in zip([zmax, zmin], [margin_top, plot_bottom - text_height]):
+            label = render_text(format_tick(value) + suffix, self.font_scale)
+            draw_mask(image, label, pixel, colorbar_left + colorbar_width + 4)
+        return image
+
+    def render_grid(
+        self,
+        binned: list[BinnedHistogram],
+        titles: list[str],
+        settings_histogram: Histogram2DContourSettings,
+        numbers_cols: int = 3,
+    ) -> np.ndarray:
+        """
+        Render the groups side by side, with numbers_cols panels per row and a shared color range
+        """
+        numbers_cols = min(numbers_cols, len(binned))
+        numbers_rows = -(-len(binned) // numbers_cols)
+        z_range = self.get_z_range(binned, settings_histogram)
+        image = np.empty(
+            (self.panel_height * numbers_rows, self.panel_width * numbers_cols, 3), dtype=np.uint8
+        )
+        image[:] = WHITE
+        for i, (group, title) in enumerate(zip(binned, titles)):
+            row = i // numbers_cols
+            col = i % numbers_cols
+            image[
+                row * self.panel_height : (row + 1) * self.panel_height,
+                col * self.panel_width : (col + 1) * self.panel_width,
+            ] = self.render_panel(group, title, settings_histogram, z_range)
+        return image
+
+    def render_png(
+        self,
+        binned: list[BinnedHistogram],
+        titles: list[str],
+        settings_histogram: Histogram2DContourSettings,
+        numbers_cols: int = 3,
+    ) -> bytes:
+        """
+        Render the groups as the content of a PNG file
+        """
+        image = self.render_grid(binned, titles, settings_histogram, numbers_cols)
+        return encode_png(image, self.compression_level)
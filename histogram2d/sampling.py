@@ -0,0 +1,144 @@
+import logging
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from histogram2d.builder import SAMPLING_ATTRS_KEY, BinnedHistogram
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SamplingSettings(object):
+    """
+    Settings of the subsampling of very large groups. Groups with more rows than row_threshold are
+    plotted from a uniform reservoir sample of sample_size rows, which bounds the cost of building
+    and rendering their traces. Smaller groups are plotted from all their rows.
+
+    The groups are read and cleaned in full before they are sampled, as their features ranges and
+    statistics are computed from every row, so sampling does not lower the memory used to read
+    them. The reservoir goes over the group in chunks of chunk_size rows, so the features are
+    never copied to one array of the size of the group.
+    """
+
+    sample_size: int = 100_000
+    row_threshold: int = 1_000_000
+    chunk_size: int = 1_000_000
+    seed: int = None
+    confidence_z: float = 1.96
+
+    def needs_sampling(self, number_of_rows: int) -> bool:
+        return number_of_rows > max(self.row_threshold, self.sample_size)
+
+    def reservoir_sample(self, chunks: Iterable[np.ndarray]) -> tuple[np.ndarray, int]:
+        """
+        Uniform sample without replacement of the rows of the chunks (algorithm R), in one pass.
+        Each chunk is processed with vectorized operations
+
+        Args:
+            chunks (Iterable[np.ndarray]): rows x columns arrays
+
+        Returns:
+            np.ndarray: sampled rows, at most sample_size
+            int: number of rows seen
+        """
+        rng = np.random.default_rng(self.seed)
+        reservoir = None
+        seen = 0
+        for chunk in chunks:
+            if reservoir is None:
+                reservoir = np.empty((self.sample_size,) + chunk.shape[1:], dtype=chunk.dtype)
+            filling = min(max(self.sample_size - seen, 0), len(chunk))
+            reservoir[seen : seen + filling] = chunk[:filling]
+            # row t (0 based) replaces a random slot with probability sample_size / (t + 1)
+            positions = np.arange(seen + filling, seen + len(chunk))
+            slots = rng.integers(0, positions + 1)
+            replacing = slots < self.sample_size
+            slots = slots[replacing]
+            rows = chunk[filling:][replacing]
+            # when a slot is drawn more than once in the chunk the last row wins, as in the
+            # sequential algorithm
+            _, last_reversed = np.unique(slots[::-1], return_index=True)
+            last = len(slots) - 1 - last_reversed
+            reservoir[slots[last]] = rows[last]
+            seen += len(chunk)
+        if reservoir is None:
+            return np.empty((0, 0)), 0
+        return reservoir[: min(seen, self.sample_size)], seen
+
+    def sample(self, df: pd.DataFrame, features: list[str]) -> pd.DataFrame:
+        """
+        Sample the features of the group if it is larger than the row threshold. The sampled dataframe
+        carries its sampling metadata in attrs, so the count histograms scale up to the group size
+
+        Returns:
+            pd.DataFrame: the group itself, or the sample of its features
+        """
+        if not self.needs_sampling(len(df)):
+            return df
+        chunks = (
+            df.iloc[start : start + self.chunk_size][features].to_numpy(dtype=float)
+            for start in range(0, len(df), self.chunk_size)
+        )
+        sample, total_rows = self.reservoir_sample(chunks)
+        sample_df = pd.DataFrame(sample, columns=features)
+        sample_df.attrs[SAMPLING_ATTRS_KEY] = {
+            "sampled_rows": len(sample_df),
+            "total_rows": total_rows,
+            "weight": total_rows / len(sample_df),
+        }
+        return sample_df
+
+    def estimate_error(
+        self, binned: BinnedHistogram, sampled_rows: int, total_rows: int
+    ) -> np.ndarray:
+        """
+        Estimate the error bound of each bin of a sampled group, at the confidence of confidence_z
+        standard errors, with the finite population correction
+
+        Returns:
+            np.ndarray: error bound of each bin, in percentage points if the histogram is normalized,
+                else in counts of the whole group
+        """
+        binned_rows = binned.counts.sum()
+        if binned_rows == 0 or sampled_rows == 0:
+            return np.zeros(binned.counts.shape)
+        proportion = binned.counts / binned_rows
+        correction = (total_rows - sampled_rows) / max(total_rows - 1, 1)
+        standard_error = np.sqrt(proportion * (1 - proportion) / sampled_rows * correction)
+        scale = 100.0 if binned.normalized else total_rows
+        return self.confidence_z * standard_error * scale
+
+    @staticmethod
+    def get_sampling_metadata(df: pd.DataFrame) -> dict:
+        """
+        Get the sampling metadata of a dataframe, None if it was not sampled
+        """
+        return df.attrs.get(SAMPLING_ATTRS_KEY)
+
+    def log_error(
+        self,
+        binned: BinnedHistogram,
+        df: pd.DataFrame,
+        title: str,
+        logger: logging.Logger | logging.LoggerAdapter = None,
+    ) -> None:
+        """
+        Log the error bound of a sampled group, and record it in its sampling metadata. The record
+        goes to the logger given, as the one of the run of the orchestrator, else to the logger of
+        this module
+        """
+        metadata = self.get_sampling_metadata(df)
+        if metadata is None:
+            return None
+        error = self.estimate_error(binned, metadata["sampled_rows"], metadata["total_rows"])
+        metadata["max_bin_error"] = float(error.max())
+        unit = "percentage points" if binned.normalized else "counts"
+        (logger or logging.getLogger(__name__)).info(
+            f"{title}: plotted from {metadata['sampled_rows']} of {metadata['total_rows']} rows, "
+            f"per bin error up to {metadata['max_bin_error']:.3g} {unit} "
+            f"({self.confidence_z} standard errors)"
+        )
+        return None
@@ -0,0 +1,117 @@
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import os
+import sys
+from contextlib import contextmanager
+from typing import BinaryIO
+
+logger = logging.getLogger(__name__)
+
+# path of the standard input
+STDIN = "-"
+DATA_EXTENSIONS = {".csv": "csv", ".xlsx": "excel", ".xls": "excel"}
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+
+
+def is_path(data_source) -> bool:
+    return isinstance(data_source, (str, os.PathLike))
+
+
+def get_source_name(data_source) -> str:
+    """
+    Get the name of the data source: its path, the name of the file object if it has one, else
+    "<stdin>" or "<stream>"
+    """
+    if is_path(data_source):
+        return "<stdin>" if data_source == STDIN else os.fspath(data_source)
+    name = getattr(data_source, "name", None)
+    return name if isinstance(name, str) else "<stream>"
+
+
+def split_compression(name: str) -> tuple[str, str]:
+    """
+    Split the compression extension from a file name
+
+    Returns:
+        str: name without the compression extension
+        str: compression, None if not compressed
+    """
+    root, extension = os.path.splitext(name)
+    if extension.lower() in COMPRESSION_EXTENSIONS:
+        return root, COMPRESSION_EXTENSIONS[extension.lower()]
+    return name, None
+
+
+def get_data_format(data_source) -> str:
+    """
+    Get the format of the data source from its name, "csv" or "excel". Sources without a known
+    extension, as the standard input, are read as csv
+
+    Raises:
+        ValueError: If the data source is a file of another format
+    """
+    name, _ = split_compression(get_source_name(data_source))
+    extension = os.path.splitext(name)[1].lower()
+    if extension in DATA_EXTENSIONS:
+        return DATA_EXTENSIONS[extension]
+    if name in ("<stdin>", "<stream>") or not is_path(data_source):
+        return "csv"
+    error_message = f"File {name} is not an excel or csv file"
+    logger.error(error_message)
+    raise ValueError(error_message)
+
+
+def decompress_stream(stream: BinaryIO, compression: str) -> BinaryIO:
+    """
+    Wrap a binary stream in a streaming decompressor, which never holds the whole uncompressed data
+
+    Raises:
+        ImportError: If the compression is zstd and zstandard is not installed
+    """
+    if compression is None:
+        return stream
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(stream, mode="rb")
+    if compression == "xz":
+        return lzma.LZMAFile(stream, mode="rb")
+    try:
+        import zstandard
+    except ImportError as e:
+        error_message = "Reading zstd compressed data requires zstandard to be installed"
+        logger.error(error_message)
+        raise ImportError(error_message) from e
+    return zstandard.ZstdDecompressor().stream_reader(stream)
+
+
+@contextmanager
+def open_data_source(data_source, seekable: bool = False):
+    """
+    Open a data source as a binary stream of the uncompressed data. Compressed files are decompressed
+    on the fly, by their extension
+
+    Args:
+        data_source (str | os.PathLike | BinaryIO): path, "-" for the standard input, or a binary
+            file object
+        seekable (bool, optional): the reader needs to seek, as the excel readers. Streams that
+            cannot seek are then read into memory. Defaults to False.
+    """
+    _, compression = split_compression(get_source_name(data_source))
+    if is_path(data_source) and data_source != STDIN:
+        raw_stream = open(data_source, "rb")
+        owned = True
+    else:
+        raw_stream = sys.stdin.buffer if data_source == STDIN else data_source
+        owned = False
+    try:
+        stream = decompress_stream(raw_stream, compression)
+        if seekable and not (hasattr(stream, "seekable") and stream.seekable()):
+            stream = io.BytesIO(stream.read())
+        yield stream
+    finally:
+        if owned:
+            raw_stream.close()
@@ -0,0 +1,173 @@
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from histogram2d.builder import BinnedHistogram
+from histogram2d.export import ExportSettings
+from histogram2d.parallel import ParallelSettings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UncertaintySettings(object):
+    """
+    Settings of the bootstrap uncertainty of the percentage of each bin of each group, to tell which
+    differences between the normalized histograms are noise.
+
+    Each group is resampled number_of_resamples times as a multinomial draw of its bin counts, with
+    the size of the group and the probabilities of its bins. The count of one bin across multinomial
+    draws is binomial, so the occupied bins of all the groups are drawn from their binomial marginals
+    in one vectorized call per chunk, which gives the same per bin grids as the joint draw without
+    resampling the empty bins, nor any row.
+
+    statistic:
+        "se": standard error of the percentage of each bin, in percentage points
+        "ci": confidence interval of the percentage of each bin. The maps show its width, in
+            percentage points
+    """
+
+    number_of_resamples: int = 1000
+    statistic: str = "se"
+    confidence: float = 0.95
+    seed: int = None
+    # resamples x bins drawn at once, bounding the memory
+    max_chunk_size: int = 10_000_000
+    colorscale: str = "Viridis"
+
+    STATISTICS = ("se", "ci")
+
+    def __post_init__(self):
+        if self.statistic not in self.STATISTICS:
+            error_message = (
+                f"Unknown uncertainty statistic {self.statistic}. Expected one of {self.STATISTICS}"
+            )
+            logger.error(error_message)
+            raise ValueError(error_message)
+        if not 0 < self.confidence < 1:
+            error_message = f"Confidence must be between 0 and 1, got {self.confidence}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+        if self.number_of_resamples < 2:
+            error_message = f"At least 2 resamples are needed, got {self.number_of_resamples}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+    def get_grid_names(self) -> list[str]:
+        """
+        Get the names of the grids computed for the statistic
+        """
+        return ["se"] if self.statistic == "se" else ["ci_lower", "ci_upper"]
+
+    def summarize_chunk(
+        self, chunk: tuple[np.random.SeedSequence, np.ndarray, np.ndarray]
+    ) -> np.ndarray:
+        """
+        Resample a chunk of occupied bins and summarize the resampled percentages
+
+        Args:
+            chunk: seed of the chunk, size of the group of each bin and probability of each bin
+
+        Returns:
+            np.ndarray: grids x bins statistics, in the order of get_grid_names
+        """
+        seed, sizes, probabilities = chunk
+        rng = np.random.default_rng(seed)
+        counts = rng.binomial(sizes, probabilities, size=(self.number_of_resamples, len(sizes)))
+        percentages = counts * 100.0 / sizes
+        if self.statistic == "se":
+            return percentages.std(axis=0, ddof=1)[None]
+        alpha = (1 - self.confidence) / 2
+        return np.quantile(percentages, [alpha, 1 - alpha], axis=0)
+
+    def compute(
+        self,
+        binned: list[BinnedHistogram],
+        parallel: ParallelSettings = None,
+        logger: logging.Logger | logging.LoggerAdapter = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Compute the bootstrap uncertainty of the percentages of the groups binned on a shared grid.
+        The chunks are independent, seeded from the settings seed, so the results do not depend on
+        the parallel mode
+
+        Args:
+            binned (list[BinnedHistogram]): groups binned on a shared grid
+            parallel (ParallelSettings, optional): executor of the chunks. Defaults to serial.
+            logger (logging.Logger | logging.LoggerAdapter, optional): logger of the resampling, as
+                the one of the run of the orchestrator. Defaults to the logger of this module.
+
+        Returns:
+            dict[str, np.ndarray]: "percentage" and the grids of get_grid_names, each one
+                groups x y bins x x bins, in percentage points
+        """
+        counts = np.stack([np.rint(group.counts) for group in binned]).astype(np.int64)
+        shape = counts.shape
+        counts = counts.reshape(len(binned), -1)
+        sizes = counts.sum(axis=1)
+        percentages = np.divide(
+            counts * 100.0,
+            sizes[:, None],
+            out=np.zeros(counts.shape),
+            where=sizes[:, None] > 0,
+        )
+        # empty bins are never resampled, and a bin holding the whole group always holds it
+        occupied = np.nonzero((counts > 0) & (counts < sizes[:, None]))
+        occupied_sizes = sizes[occupied[0]]
+        occupied_probabilities = counts[occupied] / occupied_sizes
+        chunk_length = max(1, self.max_chunk_size // self.number_of_resamples)
+        starts = range(0, len(occupied_sizes), chunk_length)
+        seeds = np.random.SeedSequence(self.seed).spawn(len(starts))
+        chunks = [
+            (
+                seed,
+                occupied_sizes[start : start + chunk_length],
+                occupied_probabilities[start : start + chunk_length],
+            )
+            for seed, start in zip(seeds, starts)
+        ]
+        (logger or logging.getLogger(__name__)).info(
+            f"Resampling {len(occupied_sizes)} occupied bins {self.number_of_resamples} times "
+            f"in {len(chunks)} chunks"
+        )
+        if parallel is None:
+            parallel = ParallelSettings()
+        summaries = parallel.map(self.summarize_chunk, chunks, releases_gil=False)
+        grids = {"percentage": percentages.reshape(shape)}
+        for idx, name in enumerate(self.get_grid_names()):
+            # bins not resampled have no spread, their interval is the percentage itself
+            grid = np.zeros(counts.shape) if name == "se" else percentages.copy()
+            if len(summaries) > 0:
+                grid[occupied] = np.concatenate([summary[idx] for summary in summaries])
+            grids[name] = grid.reshape(shape)
+        return grids
+
+    def get_map(self, grids: dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Get the maps plotted: the standard error, or the width of the confidence interval
+        """
+        if self.statistic == "se":
+            return grids["se"]
+        return grids["ci_upper"] - grids["ci_lower"]
+
+    def get_map_label(self) -> str:
+        if self.statistic == "se":
+            return "SE (pp)"
+        return f"{self.confidence:.0%} CI width (pp)"
+
+    def get_table(
+        self, grids: dict[str, np.ndarray], binned: list[BinnedHistogram], groups: list[str]
+    ) -> pd.DataFrame:
+        """
+        Flatten the uncertainty grids into one table, as the bins export
+
+        Returns:
+            pd.DataFrame: one row per group and bin, with the bin edges, its count and percentage,
+                and its uncertainty
+        """
+        table = ExportSettings.get_bins(binned, groups)
+        for name in self.get_grid_names():
+            table[name] = grids[name].ravel()
+        return table
@@ -0,0 +1,534 @@
+import math
+import zlib
+from dataclasses import dataclass
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from histogram2d.builder import BinnedHistogram, Histogram2DContourSettings
+from histogram2d.raster import RasterSettings, format_tick, get_band_colors
+from histogram2d.visualize import VisualizeSettings
+
+BLACK = (0, 0, 0)
+GREY = (90, 90, 90)
+
+# edges crossed by the contour in each marching squares case, the corners being
+# bottom left = 1, bottom right = 2, top right = 4, top left = 8 when above the level
+CASE_SEGMENTS = {
+    1: [("left", "bottom")],
+    2: [("bottom", "right")],
+    3: [("left", "right")],
+    4: [("right", "top")],
+    6: [("bottom", "top")],
+    7: [("left", "top")],
+    8: [("left", "top")],
+    9: [("bottom", "top")],
+    11: [("right", "top")],
+    12: [("left", "right")],
+    13: [("bottom", "right")],
+    14: [("left", "bottom")],
+}
+# ambiguous cases, resolved by whether the center of the cell is above the level
+SADDLE_SEGMENTS = {
+    5: {
+        True: [("bottom", "right"), ("left", "top")],
+        False: [("left", "bottom"), ("right", "top")],
+    },
+    10: {
+        True: [("left", "bottom"), ("right", "top")],
+        False: [("bottom", "right"), ("left", "top")],
+    },
+}
+SIDES = ("bottom", "right", "top", "left")
+
+
+def get_segment_table() -> np.ndarray:
+    """
+    Get the sides joined by the segments of each case, as a lookup table indexed by the case and by
+    whether the center of the cell is above the level
+
+    Returns:
+        np.ndarray: 16 x 2 x 2 segments x 2 sides indices in SIDES, -1 for no segment
+    """
+    table = np.full((16, 2, 2, 2), -1)
+    for case in range(16):
+        for center_above in (False, True):
+            segments = SADDLE_SEGMENTS.get(case, {}).get(center_above, CASE_SEGMENTS.get(case, []))
+            for idx, (first, second) in enumerate(segments):
+                table[case, int(center_above), idx] = (SIDES.index(first), SIDES.index(second))
+    return table
+
+
+SEGMENT_TABLE = get_segment_table()
+
+
+def marching_squares(z: np.ndarray, x: np.ndarray, y: np.ndarray, level: float) -> list[np.ndarray]:
+    """
+    Compute the closed outlines of the region where z >= level. The grid is padded with nodes below
+    the level, at the coordinates of the border, so every outline is closed on the border of the
+    grid. Filling the outlines with the even-odd rule gives the region, holes included.
+
+    The cases of the cells, their segments and the crossing points are computed as array operations.
+    Only the chaining of the crossed edges into outlines walks them one by one
+
+    Args:
+        z (np.ndarray): y x x values, at the nodes of the grid
+        x (np.ndarray): x coordinate of each column of nodes
+        y (np.ndarray): y coordinate of each row of nodes
+        level (float): contour level
+
+    Returns:
+        list[np.ndarray]: outlines, as n x 2 arrays of (x, y) points
+    """
+    below = min(float(np.min(z)), level) - 1
+    z = np.pad(z.astype(float), 1, constant_values=below)
+    x = np.concatenate([[x[0]], x, [x[-1]]])
+    y = np.concatenate([[y[0]], y, [y[-1]]])
+    rows, cols = z.shape
+    above = z >= level
+    cases = above[:-1, :-1] * 1 + above[:-1, 1:] * 2 + above[1:, 1:] * 4 + above[1:, :-1] * 8
+
+    # segments of the crossed cells, as pairs of edge ids. The horizontal edge from node (i, j) to
+    # (i, j + 1) is i * (cols - 1) + j, the vertical one from (i, j) to (i + 1, j) comes after them
+    i, j = np.nonzero((cases != 0) & (cases != 15))
+    center_above = (z[i, j] + z[i, j + 1] + z[i + 1, j] + z[i + 1, j + 1]) / 4 >= level
+    sides = SEGMENT_TABLE[cases[i, j], center_above.astype(int)]
+    horizontal_edges = rows * (cols - 1)
+    # edge id of the bottom, right, top and left sides of each cell
+    cell_edges = np.stack(
+        [
+            i * (cols - 1) + j,
+            horizontal_edges + i * cols + j + 1,
+            (i + 1) * (cols - 1) + j,
+            horizontal_edges + i * cols + j,
+        ],
+        axis=1,
+    )
+    segments = np.take_along_axis(cell_edges[:, None, :], sides.reshape(len(i), 1, 4), axis=2)
+    segments = segments.reshape(len(i), 2, 2)[sides[:, :, 0] >= 0]
+    if len(segments) == 0:
+        return []
+
+    # crossing point of each edge, interpolated between its nodes
+    edges, nodes = np.unique(segments, return_inverse=True)
+    nodes = nodes.reshape(segments.shape)
+    is_horizontal = edges < horizontal_edges
+    vertical = edges - horizontal_edges
+    start_i = np.where(is_horizontal, edges // (cols - 1), vertical // cols)
+    start_j = np.where(is_horizontal, edges % (cols - 1), vertical % cols)
+    end_i = start_i + ~is_horizontal
+    end_j = start_j + is_horizontal
+    start, end = z[start_i, start_j], z[end_i, end_j]
+    weight = (level - start) / (end - start)
+    points = np.column_stack(
+        [
+            x[start_j] + weight * (x[end_j] - x[start_j]),
+            y[start_i] + weight * (y[end_i] - y[start_i]),
+        ]
+    )
+
+    # every crossed edge is shared by the segments of the two cells around it
+    sources = np.concatenate([nodes[:, 0], nodes[:, 1]])
+    targets = np.concatenate([nodes[:, 1], nodes[:, 0]])
+    neighbors = targets[np.argsort(sources, kind="stable")].reshape(len(edges), 2)
+    outlines = []
+    visited = np.zeros(len(edges), dtype=bool)
+    for first in range(len(edges)):
+        if visited[first]:
+            continue
+        outline = [first]
+        visited[first] = True
+        previous, current = -1, first
+        while True:
+            following = neighbors[current, 1 if neighbors[current, 0] == previous else 0]
+            if visited[following]:
+                break
+            outline.append(following)
+            visited[following] = True
+            previous, current = current, following
+        outlines.append(points[outline])
+    return outlines
+
+
+def get_nice_ticks(start: float, end: float, target: int = 5) -> list[float]:
+    """
+    Get round tick values between start and end, about target of them
+    """
+    if end <= start:
+        return [start]
+    raw_step = (end - start) / target
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = min(
+        (factor * magnitude for factor in (1, 2, 5, 10) if factor * magnitude >= raw_step),
+        default=10 * magnitude,
+    )
+    first = math.ceil(start / step) * step
+    # rounding drops the floating point noise of the multiples of the step
+    return [round(float(value), 12) for value in np.arange(first, end + step * 1e-9, step)]
+
+
+class VectorCanvas:
+    """
+    Drawing commands of a figure, in points from the top left corner, that can be written as SVG or
+    as a PDF page
+    """
+
+    def __init__(self, width: float, height: float, precision: int = 2) -> None:
+        self.width = width
+        self.height = height
+        self.precision = precision
+        self.items = []
+
+    def path(self, outlines: list[np.ndarray], fill=None, stroke=None, line_width: float = 1.0):
+        if len(outlines) > 0:
+            self.items.append(("path", outlines, fill, stroke, line_width))
+
+    def rect(self, x: float, y: float, width: float, height: float, fill=None, stroke=None):
+        corners = np.array([[x, y], [x + width, y], [x + width, y + height], [x, y + height]])
+        self.path([corners], fill=fill, stroke=stroke)
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, stroke=BLACK, line_width=1.0):
+        self.items.append(("line", (x1, y1, x2, y2), stroke, line_width))
+
+    def text(self, x: float, y: float, text: str, size: float, anchor="middle", rotate=False):
+        self.items.append(("text", x, y, str(text), size, anchor, rotate))
+
+    def number(self, value: float) -> str:
+        return f"{value:.{self.precision}f}".rstrip("0").rstrip(".")
+
+    def to_svg(self) -> str:
+        """
+        Write the drawing as a standalone SVG document
+        """
+        number = self.number
+        elements = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{number(self.width)}" '
+            f'height="{number(self.height)}" viewBox="0 0 {number(self.width)} '
+            f'{number(self.height)}" font-family="Helvetica, Arial, sans-serif">',
+            f'<rect width="100%" height="100%" fill="white"/>',
+        ]
+        anchors = {"start": "start", "middle": "middle", "end": "end"}
+        for item in self.items:
+            if item[0] == "path":
+                _, outlines, fill, stroke, line_width = item
+                d = "".join(
+                    "M" + "L".join(f"{number(px)} {number(py)}" for px, py in outline) + "Z"
+                    for outline in outlines
+                )
+                fill_attribute = f"rgb{tuple(int(c) for c in fill)}" if fill is not None else "none"
+                stroke_attribute = (
+                    f' stroke="rgb{tuple(int(c) for c in stroke)}" stroke-width="{line_width}"'
+                    if stroke is not None
+                    else ""
+                )
+                elements.append(
+                    f'<path d="{d}" fill="{fill_attribute}" fill-rule="evenodd"{stroke_attribute}/>'
+                )
+            elif item[0] == "line":
+                _, (x1, y1, x2, y2), stroke, line_width = item
+                elements.append(
+                    f'<line x1="{number(x1)}" y1="{number(y1)}" x2="{number(x2)}" y2="{number(y2)}" '
+                    f'stroke="rgb{tuple(int(c) for c in stroke)}" stroke-width="{line_width}"/>'
+                )
+            else:
+                _, x, y, text, size, anchor, rotate = item
+                transform = f' transform="rotate(-90 {number(x)} {number(y)})"' if rotate else ""
+                elements.append(
+                    f'<text x="{number(x)}" y="{number(y)}" font-size="{size}" '
+                    f'text-anchor="{anchors[anchor]}"{transform}>{escape(text)}</text>'
+                )
+        elements.append("</svg>")
+        return "\n".join(elements)
+
+    def to_pdf_content(self) -> bytes:
+        """
+        Write the drawing as the content stream of a PDF page, whose origin is the bottom left corner
+        """
+        number = self.number
+        commands = []
+
+        def point(px: float, py: float) -> str:
+            return f"{number(px)} {number(self.height - py)}"
+
+        def color(rgb) -> str:
+            return " ".join(number(c / 255) for c in rgb)
+
+        for item in self.items:
+            if item[0] == "path":
+                _, outlines, fill, stroke, line_width = item
+                for outline in outlines:
+                    commands.append(f"{point(*outline[0])} m")
+                    commands.extend(f"{point(px, py)} l" for px, py in outline[1:])
+                    commands.append("h")
+                if fill is not None:
+                    commands.append(f"{color(fill)} rg")
+                if stroke is not None:
+                    commands.append(f"{color(stroke)} RG {line_width} w")
+                if fill is not None and stroke is not None:
+                    commands.append("B*")
+                elif fill is not None:
+                    commands.append("f*")
+                else:
+                    commands.append("S")
+            elif item[0] == "line":
+                _, (x1, y1, x2, y2), stroke, line_width = item
+                commands.append(
+                    f"{color(stroke)} RG {line_width} w {point(x1, y1)} m {point(x2, y2)} l S"
+                )
+            else:
+                _, x, y, text, size, anchor, rotate = item
+                # Helvetica is not embedded, its average width is about half of the font size
+                shift = {"start": 0, "middle": 0.5, "end": 1}[anchor] * 0.5 * size * len(text)
+                if rotate:
+                    matrix = f"0 1 -1 0 {point(x, y + shift)}"
+                else:
+                    matrix = f"1 0 0 1 {point(x - shift, y)}"
+                escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+                commands.append(f"0 g BT /F1 {size} Tf {matrix} Tm ({escaped}) Tj ET")
+        return "\n".join(commands).encode("latin-1", errors="replace")
+
+
+def encode_pdf(canvases: list[VectorCanvas]) -> bytes:
+    """
+    Write the canvases as the pages of a PDF document, with compressed content streams
+
+    Returns:
+        bytes: content of the PDF file
+    """
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    page_ids = []
+    for idx, canvas in enumerate(canvases):
+        page_id, content_id = 4 + 2 * idx, 5 + 2 * idx
+        page_ids.append(page_id)
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {canvas.number(canvas.width)} "
+            f"{canvas.number(canvas.height)}] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {content_id} 0 R >>"
+        ).encode("ascii")
+        stream = zlib.compress(canvas.to_pdf_content())
+        objects[content_id] = (
+            f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode("ascii")
+            + stream
+            + b"\nendstream"
+        )
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[2] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("ascii")
+
+    content = b"%PDF-1.4\n"
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(content)
+        content += f"{object_id} 0 obj\n".encode("ascii") + objects[object_id] + b"\nendobj\n"
+    xref_offset = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for object_id in sorted(objects):
+        content += f"{offsets[object_id]:010d} 00000 n \n".encode("ascii")
+    content += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+    ).encode("ascii")
+    return content
+
+
+@dataclass
+class VectorSettings(object):
+    """
+    Settings of the native vector writer, which draws the contour polygons of the binned grid of each
+    group straight into SVG and PDF files, without plotly and kaleido. The layout follows the
+    VisualizeSettings of the figure
+    """
+
+    number_of_contours: int = 10
+    font_size: float = 12
+    line_width: float = 0.5
+    precision: int = 2
+    margin_left: float = 80
+    margin_right: float = 130
+    margin_top: float = 70
+    margin_bottom: float = 60
+
+    def draw_panel(
+        self,
+        canvas: VectorCanvas,
+        binned: BinnedHistogram,
+        title: str,
+        settings_histogram: Histogram2DContourSettings,
+        z_range: tuple[float, float],
+        box: tuple[float, float, float, float],
+    ) -> None:
+        """
+        Draw the contours of one group, with its axes and titles, in the (left, top, width, height) box
+        """
+        left, top, width, height = box
+        zmin, zmax = z_range
+        x_centers, y_centers = binned.x_centers, binned.y_centers
+        x_range = (
+            (x_centers[0], x_centers[-1])
+            if len(x_centers) > 1
+            else (x_centers[0] - 1, x_centers[0] + 1)
+        )
+        y_range = (
+            (y_centers[0], y_centers[-1])
+            if len(y_centers) > 1
+            else (y_centers[0] - 1, y_centers[0] + 1)
+        )
+
+        def to_canvas(points: np.ndarray) -> np.ndarray:
+            px = left + (points[:, 0] - x_range[0]) / (x_range[1] - x_range[0]) * width
+            py = top + height - (points[:, 1] - y_range[0]) / (y_range[1] - y_range[0]) * height
+            return np.column_stack([px, py])
+
+        colors = get_band_colors(settings_histogram.colorscale, self.number_of_contours)
+        levels = (
+            zmin + (zmax - zmin) * np.arange(1, self.number_of_contours) / self.number_of_contours
+        )
+        filled = settings_histogram.contour_filling != "lines"
+        if filled:
+            canvas.rect(left, top, width, height, fill=colors[0])
+        z = binned.z.astype(float)
+        for band, level in enumerate(levels, start=1):
+            outlines = [
+                to_canvas(outline) for outline in marching_squares(z, x_centers, y_centers, level)
+            ]
+            if filled:
+                stroke = GREY if settings_histogram.contour_show_lines else None
+                canvas.path(outlines, fill=colors[band], stroke=stroke, line_width=self.line_width)
+            else:
+                canvas.path(outlines, stroke=colors[band], line_width=self.line_width * 2)
+
+        # axes
+        canvas.rect(left, top, width, height, stroke=BLACK)
+        for value in get_nice_ticks(*x_range):
+            px = left + (value - x_range[0]) / (x_range[1] - x_range[0]) * width
+            canvas.line(px, top + height, px, top + height + 4)
+            canvas.text(
+                px, top + height + 4 + self.font_size, format_tick(value), self.font_size * 0.8
+            )
+        for value in get_nice_ticks(*y_range):
+            py = top + height - (value - y_range[0]) / (y_range[1] - y_range[0]) * height
+            canvas.line(left - 4, py, left, py)
+            canvas.text(
+                left - 6,
+                py + self.font_size * 0.3,
+                format_tick(value),
+                self.font_size * 0.8,
+                anchor="end",
+            )
+        canvas.text(left + width / 2, top - self.font_size * 0.6, title, self.font_size * 1.2)
+        canvas.text(
+            left + width / 2,
+            top + height + 8 + self.font_size * 2.2,
+            settings_histogram.x_axis_title,
+            self.font_size,
+        )
+        canvas.text(
+            left - self.font_size * 4.5,
+            top + height / 2,
+            settings_histogram.y_axis_title,
+            self.font_size,
+            rotate=True,
+        )
+        return None
+
+    def draw_colorbar(
+        self,
+        canvas: VectorCanvas,
+        settings_histogram: Histogram2DContourSettings,
+        z_range: tuple[float, float],
+        box: tuple[float, float, float, float],
+    ) -> None:
+        left, top, width, height = box
+        zmin, zmax = z_range
+        colors = get_band_colors(settings_histogram.colorscale, self.number_of_contours)
+        band_height = height / self.number_of_contours
+        for band, band_color in enumerate(colors):
+            canvas.rect(
+                left, top + height - (band + 1) * band_height, width, band_height, fill=band_color
+            )
+        suffix = "%" if settings_histogram.normalized else ""
+        for value in get_nice_ticks(zmin, zmax):
+            py = top + height - (value - zmin) / (zmax - zmin) * height
+            canvas.text(
+                left + width + 4,
+                py + self.font_size * 0.3,
+                format_tick(value) + suffix,
+                self.font_size * 0.8,
+                anchor="start",
+            )
+        canvas.text(
+            left,
+            top - self.font_size * 0.8,
+            settings_histogram.get_z_colorbar_label(),
+            self.font_size,
+            anchor="start",
+        )
+        return None
+
+    def build_canvas(
+        self,
+        binned: list[BinnedHistogram],
+        titles: list[str],
+        settings_histogram: Histogram2DContourSettings,
+        multiplot_settings: VisualizeSettings,
+        numbers_cols: int = 3,
+    ) -> VectorCanvas:
+        """
+        Lay out the groups in a grid of numbers_cols columns, as VisualizeSettings does, sharing the
+        color range and the colorbar
+        """
+        numbers_cols = min(numbers_cols, len(binned))
+        numbers_rows = -(-len(binned) // numbers_cols)
+        canvas = VectorCanvas(
+            multiplot_settings.fig_suplots_width,
+            multiplot_settings.fig_subplot_height_per_row * numbers_rows,
+            self.precision,
+        )
+        domain_width = canvas.width - self.margin_left - self.margin_right
+        domain_height = canvas.height - self.margin_top - self.margin_bottom
+        horizontal_gap = (
+            multiplot_settings.horizontal_spacing * domain_width if numbers_cols > 1 else 0
+        )
+        vertical_gap = (
+            multiplot_settings.vertical_spacing * domain_height if numbers_rows > 1 else 0
+        )
+        panel_width = (domain_width - horizontal_gap * (numbers_cols - 1)) / numbers_cols
+        panel_height = (domain_height - vertical_gap * (numbers_rows - 1)) / numbers_rows
+        z_range = RasterSettings.get_z_range(binned, settings_histogram)
+        for i, (group, title) in enumerate(zip(binned, titles)):
+            row = i // numbers_cols
+            col = i % numbers_cols
+            box = (
+                self.margin_left + col * (panel_width + horizontal_gap),
+                self.margin_top + row * (panel_height + vertical_gap),
+                panel_width,
+                panel_height,
+            )
+            self.draw_panel(canvas, group, title, settings_histogram, z_range, box)
+        self.draw_colorbar(
+            canvas,
+            settings_histogram,
+            z_range,
+            (canvas.width - self.margin_right + 30, self.margin_top, 18, domain_height),
+        )
+        return canvas
+
+    def render(
+        self,
+        binned: list[BinnedHistogram],
+        titles: list[str],
+        settings_histogram: Histogram2DContourSettings,
+        multiplot_settings: VisualizeSettings,
+        extension: str = "svg",
+        numbers_cols: int = 3,
+    ) -> bytes:
+        """
+        Draw the groups as the content of a SVG or PDF file
+        """
+        canvas = self.build_canvas(
+            binned, titles, settings_histogram, multiplot_settings, numbers_cols
+        )
+        if extension == "svg":
+            return canvas.to_svg().encode("utf-8")
+        return encode_pdf([canvas])
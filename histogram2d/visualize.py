@@ -1,7 +1,11 @@
 from plotly.subplots import make_subplots
-from plotly.graph_objects import Figure
+from plotly.graph_objects import Contour, Figure, Histogram
+import numpy as np
 import pandas as pd
-from histogram2d.builder import Histogram2DContourSettings
+from histogram2d.builder import SAMPLING_ATTRS_KEY, BinnedHistogram, Histogram2DContourSettings
+from histogram2d.compare import ComparisonSettings
+from histogram2d.parallel import ParallelSettings
+from histogram2d.uncertainty import UncertaintySettings
 from dataclasses import dataclass
 
 
@@ -11,12 +15,30 @@ class VisualizeSettings(object):
     vertical_spacing: float = 0.15
     fig_suplots_width: int = 1600
     fig_subplot_height_per_row: int = 400
+    groups_per_page: int = None
+    stitch_pages: bool = False
+
+    COMPARISON_CONTOURS = 10
+
+    def get_pages(self, number_of_groups: int) -> list[slice]:
+        """
+        Split the groups of the combined figure into pages of groups_per_page groups. Without
+        groups_per_page, or when all the groups fit in one page, there is a single page
+        """
+        if not self.groups_per_page or number_of_groups <= self.groups_per_page:
+            return [slice(0, number_of_groups)]
+        return [
+            slice(start, start + self.groups_per_page)
+            for start in range(0, number_of_groups, self.groups_per_page)
+        ]
 
     def build_multiplots_figure(
         self,
         dataframes: list[pd.DataFrame],
         titles: list[str],
         settings_histogram: Histogram2DContourSettings,
+        parallel: ParallelSettings = None,
+        binned: list[BinnedHistogram] = None,
     ) -> Figure:
         # for len of dataframes, create a subplot 3xn necessary to display all dataframes
         numbers_cols = 3
@@ -37,19 +59,47 @@ class VisualizeSettings(object):
             column_widths=column_widths,
             row_heights=row_heights,
         )
-        for i, df in enumerate(dataframes):
+        z_range = None
+        if settings_histogram.bin_shape == "hexagon":
+            # the hexagons of every group are filled on the range of all of them
+            hexagons = (parallel or ParallelSettings()).map(
+                settings_histogram.bin_hexagons, dataframes
+            )
+            z_range = settings_histogram.get_hexagon_z_range(hexagons)
+            traces = [
+                settings_histogram.create_hexbin_traces(
+                    group_hexagons, meta=df.attrs.get(SAMPLING_ATTRS_KEY), z_range=z_range
+                )
+                for group_hexagons, df in zip(hexagons, dataframes)
+            ]
+        elif binned is not None:
+            # the groups are already binned, plotly only draws their grids
+            traces = [
+                [
+                    settings_histogram.create_binned_contour(
+                        group_binned, meta=df.attrs.get(SAMPLING_ATTRS_KEY)
+                    )
+                ]
+                for group_binned, df in zip(binned, dataframes)
+            ]
+        else:
+            # building and validating the traces is pure python, so it only scales in processes
+            traces = (parallel or ParallelSettings()).map(
+                settings_histogram.create_traces, dataframes, releases_gil=False
+            )
+        for i, group_traces in enumerate(traces):
             row = i // numbers_cols + 1
             col = i % numbers_cols + 1
-            fig.add_trace(
-                settings_histogram.create_histogram2dcontour(df=df),
-                row=row,
-                col=col,
-            )
+            for trace in group_traces:
+                fig.add_trace(
+                    trace,
+                    row=row,
+                    col=col,
+                )
 
-        fig.update_traces(
-            contours_coloring=settings_histogram.contour_filling,
-            contours_showlines=settings_histogram.contour_show_lines,
-        )
+        self.update_contours(fig, settings_histogram)
+        if z_range is not None:
+            self.update_hexbin_coloraxis(fig, settings_histogram, z_range)
         # set size of plot
         fig.update_layout(
             width=self.fig_suplots_width, height=self.fig_subplot_height_per_row * numbers_rows
@@ -59,18 +109,61 @@ class VisualizeSettings(object):
 
         return fig
 
+    @staticmethod
+    def update_contours(fig: Figure, settings_histogram: Histogram2DContourSettings) -> None:
+        """
+        Style the contour traces of the figure, the hexagons being drawn as filled polygons
+        """
+        fig.update_traces(
+            contours_coloring=settings_histogram.contour_filling,
+            contours_showlines=settings_histogram.contour_show_lines,
+            selector=lambda trace: trace.type in ("histogram2dcontour", "contour"),
+        )
+        return None
+
+    @staticmethod
+    def update_hexbin_coloraxis(
+        fig: Figure, settings_histogram: Histogram2DContourSettings, z_range: tuple[float, float]
+    ) -> None:
+        """
+        Move the colorbars of the hexagons of every subplot to one shared color axis, so the figure
+        shows a single colorbar
+        """
+        fig.update_traces(
+            marker_coloraxis="coloraxis", selector=dict(type="scatter", mode="markers")
+        )
+        colorbar = dict(title=settings_histogram.get_z_colorbar_label())
+        if settings_histogram.normalized:
+            colorbar["ticksuffix"] = "%"
+        fig.update_layout(
+            coloraxis=dict(
+                colorscale=settings_histogram.colorscale,
+                cmin=z_range[0],
+                cmax=z_range[1],
+                colorbar=colorbar,
+            )
+        )
+        return None
+
     def build_individual_plot(
         self,
         df: pd.DataFrame,
         title: str,
         settings_histogram: Histogram2DContourSettings,
+        binned: BinnedHistogram = None,
     ) -> Figure:
         fig = make_subplots(rows=1, cols=1, subplot_titles=[title])
-        fig.add_trace(settings_histogram.create_histogram2dcontour(df=df), row=1, col=1)
-        fig.update_traces(
-            contours_coloring=settings_histogram.contour_filling,
-            contours_showlines=settings_histogram.contour_show_lines,
-        )
+        if binned is not None and settings_histogram.bin_shape == "rectangle":
+            traces = [
+                settings_histogram.create_binned_contour(
+                    binned, meta=df.attrs.get(SAMPLING_ATTRS_KEY)
+                )
+            ]
+        else:
+            traces = settings_histogram.create_traces(df=df)
+        for trace in traces:
+            fig.add_trace(trace, row=1, col=1)
+        self.update_contours(fig, settings_histogram)
 
         # set size of plot
         fig.update_layout(width=self.fig_suplots_width, height=self.fig_subplot_height_per_row)
@@ -78,3 +171,218 @@ class VisualizeSettings(object):
         fig.update_yaxes(title_text=settings_histogram.y_axis_title)
 
         return fig
+
+    def build_comparison_figure(
+        self,
+        maps: np.ndarray,
+        rows: np.ndarray,
+        titles: list[str],
+        binned: BinnedHistogram,
+        settings_histogram: Histogram2DContourSettings,
+        settings_comparison: ComparisonSettings,
+    ) -> Figure:
+        """
+        Build the small multiples of the comparison maps, one row per compared group and one column
+        per group, sharing one colorbar
+
+        Args:
+            maps (np.ndarray): rows x groups x y bins x x bins comparison maps
+            rows (np.ndarray): index of the group compared in each row
+            titles (list[str]): group names
+            binned (BinnedHistogram): any of the groups, for the shared grid
+        """
+        numbers_rows, numbers_cols = maps.shape[:2]
+        subplot_titles = [
+            f"{titles[row]} vs {titles[col]}" for row in rows for col in range(numbers_cols)
+        ]
+        fig = make_subplots(
+            rows=numbers_rows,
+            cols=numbers_cols,
+            subplot_titles=subplot_titles,
+            # make_subplots rejects spacings larger than the room left by the number of subplots
+            horizontal_spacing=min(self.horizontal_spacing, 0.5 / max(numbers_cols - 1, 1)),
+            vertical_spacing=min(self.vertical_spacing, 0.5 / max(numbers_rows - 1, 1)),
+        )
+        limit = float(np.abs(maps).max()) or 1.0
+        if settings_comparison.metric in settings_comparison.SIGNED_METRICS:
+            zmin, colorscale = -limit, settings_comparison.colorscale
+        else:
+            zmin, colorscale = 0.0, settings_histogram.colorscale
+        # fixed levels, so all the subplots share the bands of the colorbar
+        contours = dict(
+            start=zmin,
+            end=limit,
+            size=(limit - zmin) / self.COMPARISON_CONTOURS,
+            coloring=settings_histogram.contour_filling,
+            showlines=settings_histogram.contour_show_lines,
+        )
+        for i in range(numbers_rows):
+            for j in range(numbers_cols):
+                fig.add_trace(
+                    Contour(
+                        z=maps[i, j],
+                        x=binned.x_centers,
+                        y=binned.y_centers,
+                        coloraxis="coloraxis",
+                        autocontour=False,
+                        contours=contours,
+                    ),
+                    row=i + 1,
+                    col=j + 1,
+                )
+        fig.update_layout(
+            coloraxis=dict(
+                colorscale=colorscale,
+                cmin=zmin,
+                cmax=limit,
+                colorbar=dict(title=settings_comparison.get_map_label()),
+            ),
+            width=self.fig_suplots_width,
+            height=self.fig_subplot_height_per_row * numbers_rows,
+        )
+        fig.update_xaxes(title_text=settings_histogram.x_axis_title)
+        fig.update_yaxes(title_text=settings_histogram.y_axis_title)
+
+        return fig
+
+    def build_uncertainty_figure(
+        self,
+        maps: np.ndarray,
+        titles: list[str],
+        binned: BinnedHistogram,
+        settings_histogram: Histogram2DContourSettings,
+        settings_uncertainty: UncertaintySettings,
+    ) -> Figure:
+        """
+        Build the companion figure of the combined figure, with the uncertainty map of each group in
+        the same place as its histogram, sharing one colorbar
+
+        Args:
+            maps (np.ndarray): groups x y bins x x bins uncertainty maps
+            titles (list[str]): group names
+            binned (BinnedHistogram): any of the groups, for the shared grid
+        """
+        numbers_cols = 3
+        numbers_rows = -(-len(maps) // numbers_cols)
+        fig = make_subplots(
+            rows=numbers_rows,
+            cols=numbers_cols,
+            subplot_titles=titles,
+            horizontal_spacing=self.horizontal_spacing,
+            vertical_spacing=min(self.vertical_spacing, 0.5 / max(numbers_rows - 1, 1)),
+        )
+        limit = float(maps.max()) if maps.size > 0 else 0.0
+        limit = limit or 1.0
+        # fixed levels, so all the subplots share the bands of the colorbar
+        contours = dict(
+            start=0.0,
+            end=limit,
+            size=limit / self.COMPARISON_CONTOURS,
+            coloring=settings_histogram.contour_filling,
+            showlines=settings_histogram.contour_show_lines,
+        )
+        for i, group_map in enumerate(maps):
+            fig.add_trace(
+                Contour(
+                    z=group_map,
+                    x=binned.x_centers,
+                    y=binned.y_centers,
+                    coloraxis="coloraxis",
+                    autocontour=False,
+                    contours=contours,
+                ),
+                row=i // numbers_cols + 1,
+                col=i % numbers_cols + 1,
+            )
+        fig.update_layout(
+            coloraxis=dict(
+                colorscale=settings_uncertainty.colorscale,
+                cmin=0.0,
+                cmax=limit,
+                colorbar=dict(title=settings_uncertainty.get_map_label()),
+            ),
+            width=self.fig_suplots_width,
+            height=self.fig_subplot_height_per_row * numbers_rows,
+        )
+        fig.update_xaxes(title_text=settings_histogram.x_axis_title)
+        fig.update_yaxes(title_text=settings_histogram.y_axis_title)
+
+        return fig
+
+    def build_pair_grid_figure(
+        self,
+        df: pd.DataFrame,
+        title: str,
+        features: list[str],
+        pair_settings: dict,
+    ) -> Figure:
+        """
+        Build the scatter matrix style grid of one group: the 2D histogram of every pair of features
+        off the diagonal, with the feature of the column in x and the feature of the row in y, and the
+        distribution of each feature in the diagonal
+
+        Args:
+            df (pd.DataFrame): data of the group
+            title (str): title of the figure
+            features (list[str]): features of the grid
+            pair_settings (dict): histogram settings of each (x feature, y feature) pair
+        """
+        numbers_features = len(features)
+        fig = make_subplots(
+            rows=numbers_features,
+            cols=numbers_features,
+            horizontal_spacing=min(self.horizontal_spacing, 0.5 / (numbers_features - 1)),
+            vertical_spacing=min(self.vertical_spacing, 0.5 / (numbers_features - 1)),
+        )
+        # the pairs share the colorbar settings, unset bounds span the z of every pair
+        settings_histogram = next(iter(pair_settings.values()))
+        cmin, cmax = settings_histogram.hist_colorbar_min, settings_histogram.hist_colorbar_max
+        hexagons = {}
+        if settings_histogram.bin_shape == "hexagon":
+            # the hexagons are filled with the colors of the shared range
+            hexagons = {pair: settings.bin_hexagons(df) for pair, settings in pair_settings.items()}
+            cmin, cmax = settings_histogram.get_hexagon_z_range(list(hexagons.values()))
+        for row, y_feature in enumerate(features):
+            for col, x_feature in enumerate(features):
+                if x_feature == y_feature:
+                    fig.add_trace(
+                        Histogram(x=df[x_feature], showlegend=False, marker_color="grey"),
+                        row=row + 1,
+                        col=col + 1,
+                    )
+                    continue
+                pair = (x_feature, y_feature)
+                # every pair is colored on one shared axis, so the single colorbar holds for all
+                if pair in hexagons:
+                    traces = pair_settings[pair].create_hexbin_traces(
+                        hexagons[pair], z_range=(cmin, cmax)
+                    )
+                    traces[-1].update(marker_coloraxis="coloraxis")
+                else:
+                    traces = [pair_settings[pair].create_histogram2dcontour(df=df)]
+                    traces[0].update(
+                        contours_coloring=pair_settings[pair].contour_filling,
+                        contours_showlines=pair_settings[pair].contour_show_lines,
+                        coloraxis="coloraxis",
+                    )
+                for trace in traces:
+                    fig.add_trace(trace, row=row + 1, col=col + 1)
+        for idx, feature in enumerate(features):
+            fig.update_xaxes(title_text=feature, row=numbers_features, col=idx + 1)
+            fig.update_yaxes(title_text=feature, row=idx + 1, col=1)
+        colorbar = dict(title=settings_histogram.get_z_colorbar_label())
+        if settings_histogram.normalized:
+            colorbar["ticksuffix"] = "%"
+        fig.update_layout(
+            coloraxis=dict(
+                colorscale=settings_histogram.colorscale,
+                cmin=cmin,
+                cmax=cmax,
+                colorbar=colorbar,
+            ),
+            title_text=title,
+            width=self.fig_suplots_width,
+            height=self.fig_suplots_width,
+        )
+
+        return fig
@@ -0,0 +1,125 @@
+import tempfile
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from pytest import fixture, raises
+
+from histogram2d.backends import (
+    ColumnarBackend,
+    DataFrameBackend,
+    PandasBackend,
+    PolarsBackend,
+    PyArrowBackend,
+    get_backend,
+    get_group_spans,
+)
+from histogram2d.filters import FilterSettings
+
+
+@fixture
+def write_sample_csv() -> str:
+    data = {
+        "A": ["F1", 2, 3, 4, 5],
+        "Unnamed 1": ["F2", 2.1, 3.1, None, 5.1],
+        "Unnamed 2": ["F3", 2.2, 3.3, 4.4, 5.5],
+        "B": ["F1", 2, 3, 4, 5],
+        "Unnamed 3": ["F2", 2.1, 3.1, 4.1, 5.1],
+    }
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as temp_file:
+        file_path = temp_file.name
+        pd.DataFrame(data).to_csv(file_path, index=False)
+        return file_path
+
+
+def test_get_group_spans():
+    spans = get_group_spans(["A", "Unnamed: 1", "Unnamed: 2", "B", "Unnamed: 4"])
+    assert spans == [("A", 0, 3), ("B", 3, 5)]
+
+    assert get_group_spans(["Unnamed: 0", "Unnamed: 1"]) == []
+
+
+def test_get_backend():
+    assert isinstance(get_backend(), PandasBackend)
+    assert isinstance(get_backend("auto"), (PandasBackend, PyArrowBackend, PolarsBackend))
+
+    with raises(ValueError):
+        get_backend("spark")
+
+
+def test_incomplete_backend_fails_when_created():
+    class IncompleteBackend(ColumnarBackend):
+        name = "incomplete"
+
+        def read_csv_as_strings(self, stream):
+            return None
+
+    with raises(TypeError):
+        DataFrameBackend()
+    with raises(TypeError):
+        IncompleteBackend()
+
+
+@pytest.mark.parametrize("backend_name", ["pyarrow", "polars"])
+def test_columnar_backend_matches_pandas(backend_name, write_sample_csv):
+    pytest.importorskip(backend_name)
+    # Arrange
+    backend = get_backend(backend_name)
+    expected_dfs, expected_groups = PandasBackend().read_groups(write_sample_csv)
+
+    # Act
+    dfs, groups = backend.read_groups(write_sample_csv)
+
+    # Assert
+    assert groups == expected_groups == ["A", "B"]
+    for df, expected_df in zip(dfs, expected_dfs):
+        assert df.columns.tolist() == expected_df.columns.tolist()
+        assert df.shape == expected_df.shape
+        assert (df.to_numpy() == expected_df.to_numpy(dtype=float)).all()
+
+
+@pytest.mark.parametrize("backend_name", ["pyarrow", "polars"])
+def test_columnar_backend_non_numeric(backend_name):
+    pytest.importorskip(backend_name)
+    data = {"A": ["F1", "F1", "3", "4"], "Unnamed: 1": ["F2", "1", "2", "3"]}
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as temp_file:
+        file_path = temp_file.name
+        pd.DataFrame(data).to_csv(file_path, index=False)
+
+    with raises(ValueError):
+        get_backend(backend_name).read_groups(file_path)
+
+
+@pytest.mark.parametrize("backend_name", ["pandas", "pyarrow", "polars"])
+def test_backend_filters_rows_while_reading(backend_name, write_sample_csv):
+    pytest.importorskip(backend_name)
+    # Arrange
+    backend = get_backend(backend_name, filters=FilterSettings(["F1 > 2"], {"F2": (None, 4)}))
+
+    # Act
+    dfs, groups = backend.read_groups(write_sample_csv)
+
+    # Assert: the incomplete row of A is dropped, then the rows with F1 <= 2
+    assert dfs[0]["F1"].tolist() == [3, 5]
+    assert dfs[1]["F1"].tolist() == [3, 4, 5]
+    assert dfs[1]["F2"].tolist() == [3.1, 4, 4]
+
+
+def test_pandas_backend_filters_before_building_the_group():
+    # Arrange: a raw group, feature names as first row
+    df = pd.DataFrame({"A": ["F1", 1, 2, 3, 4], "Unnamed 1": ["F2", 1.5, None, 3.5, 9.5]})
+    filters = FilterSettings(["F1 > 1"], {"F2": (None, 5)})
+
+    # Act
+    with patch("histogram2d.backends.pd.DataFrame", wraps=pd.DataFrame) as mock_dataframe:
+        group_df = PandasBackend.cleanup_group_df(df, filters)
+
+    # Assert: the group is built once, from the arrays of the kept rows only
+    mock_dataframe.assert_called_once()
+    columns = mock_dataframe.call_args.args[0]
+    assert {feature: values.tolist() for feature, values in columns.items()} == {
+        "F1": [3, 4],
+        "F2": [3.5, 5],
+    }
+    assert group_df.index.tolist() == [0, 1]
+    assert group_df["F2"].tolist() == [3.5, 5]
@@ -0,0 +1,94 @@
+import numpy as np
+from pytest import fixture, raises
+
+from histogram2d.builder import BinnedHistogram, Histogram2DContourSettings
+from histogram2d.compare import ComparisonSettings
+from histogram2d.visualize import VisualizeSettings
+
+
+@fixture
+def sample_binned() -> list[BinnedHistogram]:
+    edges = np.arange(3, dtype=float)
+    return [
+        BinnedHistogram(counts=np.array([[2.0, 0.0], [0.0, 2.0]]), x_edges=edges, y_edges=edges),
+        BinnedHistogram(counts=np.array([[1.0, 1.0], [1.0, 1.0]]), x_edges=edges, y_edges=edges),
+        BinnedHistogram(counts=np.array([[4.0, 0.0], [0.0, 4.0]]), x_edges=edges, y_edges=edges),
+    ]
+
+
+def test_compare_difference(sample_binned):
+    # Act
+    rows, maps, distances = ComparisonSettings(metric="difference").compare(
+        sample_binned, ["A", "B", "C"]
+    )
+
+    # Assert
+    assert rows.tolist() == [0, 1, 2]
+    assert maps.shape == (3, 3, 2, 2)
+    assert maps[0, 1].tolist() == [[25, -25], [-25, 25]]
+    assert np.allclose(maps[0, 1], -maps[1, 0])
+    # same distribution, different sizes
+    assert distances[0, 2] == 0
+    assert distances[0, 1] == 50
+    assert np.allclose(distances, distances.T)
+
+
+def test_compare_against_reference(sample_binned):
+    # Act
+    rows, maps, distances = ComparisonSettings(metric="kl", reference="A").compare(
+        sample_binned, ["A", "B", "C"]
+    )
+
+    # Assert
+    assert rows.tolist() == [0]
+    assert maps.shape == (1, 3, 2, 2)
+    assert distances.shape == (1, 3)
+    assert distances[0, 0] == 0
+    # half of the points of A fall where B has a quarter of its points: 1 bit
+    assert np.isclose(distances[0, 1], 1, atol=1e-3)
+
+
+def test_compare_cdf_l1(sample_binned):
+    _, maps, distances = ComparisonSettings(metric="cdf_l1").compare(sample_binned, ["A", "B", "C"])
+
+    # the cumulative distributions only differ at the first bin, by a quarter
+    assert np.allclose(maps[0, 1], [[0.25, 0], [0, 0]])
+    assert np.isclose(distances[0, 1], 0.0625)
+
+
+def test_compare_metrics_are_zero_on_identical_groups(sample_binned):
+    for metric in ComparisonSettings.METRICS:
+        _, _, distances = ComparisonSettings(metric=metric).compare(sample_binned, ["A", "B", "C"])
+        assert np.allclose(np.diag(distances), 0)
+        assert np.isclose(distances[0, 2], 0, atol=1e-5)
+        assert distances[0, 1] > 0
+
+
+def test_invalid_settings(sample_binned):
+    with raises(ValueError):
+        ComparisonSettings(metric="cosine")
+
+    with raises(ValueError):
+        ComparisonSettings(reference="D").compare(sample_binned, ["A", "B", "C"])
+
+
+def test_kl_map_is_drawn_around_zero(sample_binned):
+    # Arrange : A has less mass than B in the off diagonal bins
+    settings_comparison = ComparisonSettings(metric="kl")
+    rows, maps, _ = settings_comparison.compare(sample_binned, ["A", "B", "C"])
+
+    # Act
+    fig = VisualizeSettings().build_comparison_figure(
+        maps,
+        rows,
+        ["A", "B", "C"],
+        sample_binned[0],
+        Histogram2DContourSettings(),
+        settings_comparison,
+    )
+
+    # Assert : the negative contributions are within the colors
+    assert maps.min() < 0
+    assert fig.layout.coloraxis.cmin == -fig.layout.coloraxis.cmax
+    assert fig.layout.coloraxis.cmin <= maps.min()
+    assert fig.data[0].contours.start == fig.layout.coloraxis.cmin
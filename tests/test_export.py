@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from pytest import fixture, raises
+
+from histogram2d.builder import SAMPLING_ATTRS_KEY, BinnedHistogram
+from histogram2d.export import ExportSettings
+
+
+@fixture
+def sample_dfs() -> list[pd.DataFrame]:
+    return [
+        pd.DataFrame({"F1": [1.0, 2.0, 3.0, 4.0], "F2": [10.0, 20.0, 30.0, 40.0]}),
+        pd.DataFrame({"F1": [5.0], "F2": [50.0]}),
+    ]
+
+
+@fixture
+def sample_binned() -> list[BinnedHistogram]:
+    return [
+        BinnedHistogram(
+            counts=np.array([[1.0, 3.0], [0.0, 0.0]]),
+            x_edges=np.array([0.0, 1.0, 2.0]),
+            y_edges=np.array([0.0, 10.0, 20.0]),
+        ),
+        BinnedHistogram(
+            counts=np.zeros((2, 2)),
+            x_edges=np.array([0.0, 1.0, 2.0]),
+            y_edges=np.array([0.0, 10.0, 20.0]),
+        ),
+    ]
+
+
+def test_unknown_format():
+    with raises(ValueError):
+        ExportSettings(formats=["xlsx"])
+
+
+def test_get_filenames():
+    settings = ExportSettings(formats=["npz", "csv"])
+    assert settings.get_filenames() == ["binned.npz", "bins.csv", "statistics.csv"]
+
+
+def test_get_statistics(sample_dfs):
+    # Arrange: the first group stands for a sample of 400 rows
+    sample_dfs[0].attrs[SAMPLING_ATTRS_KEY] = {"sampled_rows": 4, "total_rows": 400, "weight": 100}
+
+    # Act
+    statistics = ExportSettings(quantiles=[0.5]).get_statistics(
+        sample_dfs, ["A", "B"], ["F1", "F2"]
+    )
+
+    # Assert
+    assert list(statistics.columns) == ["group", "feature", "n", "min", "max", "mean", "q0.5"]
+    first = statistics.iloc[0]
+    assert (first["group"], first["feature"], first["n"]) == ("A", "F1", 400)
+    assert (first["min"], first["max"], first["mean"], first["q0.5"]) == (1, 4, 2.5, 2.5)
+    assert statistics.iloc[3]["mean"] == 50
+
+
+def test_get_bins(sample_binned):
+    bins = ExportSettings.get_bins(sample_binned, ["A", "B"])
+    assert len(bins) == 8
+    first_group = bins[bins["group"] == "A"]
+    assert first_group["percentage"].tolist() == [25, 75, 0, 0]
+    assert first_group.iloc[1][["x_start", "x_end", "y_start", "y_end"]].tolist() == [1, 2, 0, 10]
+    assert (bins[bins["group"] == "B"]["percentage"] == 0).all()
+
+
+def test_write(sample_dfs, sample_binned, tmp_path):
+    # Arrange
+    settings = ExportSettings(formats=["csv", "npz"])
+    statistics = settings.get_statistics(sample_dfs, ["A", "B"], ["F1", "F2"])
+
+    # Act
+    written = settings.write(str(tmp_path), sample_binned, ["A", "B"], statistics)
+
+    # Assert
+    assert written == ["bins.csv", "statistics.csv", "binned.npz"]
+    assert len(pd.read_csv(tmp_path / "statistics.csv")) == 4
+    with np.load(tmp_path / "binned.npz") as arrays:
+        assert arrays["groups"].tolist() == ["A", "B"]
+        assert np.array_equal(arrays["counts_0"], sample_binned[0].counts)
+        assert arrays["statistics_n"].tolist() == [4, 4, 1, 1]
@@ -0,0 +1,38 @@
+import numpy as np
+from pytest import raises
+
+from histogram2d.filters import FilterSettings, RowFilter
+
+
+def test_parse_row_filter():
+    assert RowFilter.parse("Area > 1000") == RowFilter("Area", ">", 1000.0)
+    assert RowFilter.parse("Mean Intensity<=0.5") == RowFilter("Mean Intensity", "<=", 0.5)
+
+    with raises(ValueError):
+        RowFilter.parse("Area is large")
+    with raises(ValueError):
+        RowFilter("Area", "=>", 1)
+
+
+def test_apply_filters_and_clip():
+    # Arrange
+    settings = FilterSettings(
+        filters=["Area > 1", RowFilter("Intensity", "<", 0.5)],
+        clip={"Area": (None, 3)},
+    )
+    columns = {"Area": np.array([1.0, 2.0, 4.0, 5.0]), "Intensity": np.array([0.1, 0.2, 0.3, 0.9])}
+
+    # Act
+    filtered = settings.apply(columns)
+
+    # Assert: rows failing any filter are dropped, then the values clipped
+    np.testing.assert_array_equal(filtered["Area"], [2.0, 3.0])
+    np.testing.assert_array_equal(filtered["Intensity"], [0.2, 0.3])
+
+
+def test_filter_on_missing_feature():
+    with raises(ValueError):
+        FilterSettings(filters=["Volume > 1"]).get_mask({"Area": np.array([1.0])})
+
+    with raises(ValueError):
+        FilterSettings(filters=["Volume >> 1"])
@@ -1,8 +1,11 @@
 from unittest.mock import Mock, patch
 import pytest
+import numpy as np
 import pandas as pd
+import plotly.graph_objects as go
 from plotly.graph_objects import Histogram2dContour
 from histogram2d.builder import Histogram2DContourSettings
+from histogram2d.visualize import VisualizeSettings
 
 @pytest.fixture()
 def sample_histogram_settings() -> Histogram2DContourSettings:
@@ -61,4 +64,171 @@ def test_create_count_histogram2dcontour(sample_histogram_settings):
 
     # Assert
     assert result is not None  # add more specific checks if needed
-    assert isinstance(result, Histogram2dContour)
\ No newline at end of file
+    assert isinstance(result, Histogram2dContour)
+
+def test_bin_dataframe(sample_histogram_settings):
+    # Arrange
+    sample_histogram_settings.x_axis_title = "x"
+    sample_histogram_settings.y_axis_title = "y"
+    sample_histogram_settings.min_feature_1 = 0
+    sample_histogram_settings.max_feature_1 = 4
+    sample_histogram_settings.feature_1_bin_size = 1
+    sample_histogram_settings.min_feature_2 = 0
+    sample_histogram_settings.max_feature_2 = 2
+    sample_histogram_settings.feature_2_bin_size = 1
+    df = pd.DataFrame({"x": [0, 0.5, 3, 4], "y": [0, 0, 2, 1]})
+
+    # Act
+    binned = sample_histogram_settings.bin_dataframe(df)
+
+    # Assert: edges follow the plotly bins, starting one bin before the minimum and closed by the
+    # maximum when it falls on an edge
+    assert binned.x_edges.tolist() == [-1, 0, 1, 2, 3, 4]
+    assert binned.y_edges.tolist() == [-1, 0, 1, 2]
+    assert binned.counts.shape == (3, 5)
+    assert binned.counts.sum() == 4
+    assert binned.counts[1, 1] == 2
+    assert binned.z.sum() == 100
+
+
+def test_get_axis_edges_follow_plotly_auto_bins():
+    # Arrange
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=200)
+    y = rng.integers(0, 20, size=200).astype(float)
+
+    # Act
+    x_edges = Histogram2DContourSettings.get_axis_edges(x, {})
+    y_edges = Histogram2DContourSettings.get_axis_edges(y, {})
+    figure = go.Figure(go.Histogram2dContour(x=x, y=y)).full_figure_for_development(warn=False)
+
+    # Assert: the bins plotly auto calculates, padded with an empty bin on each side
+    for edges, bins in [(x_edges, figure.data[0].xbins), (y_edges, figure.data[0].ybins)]:
+        assert edges[0] == pytest.approx(bins.start)
+        assert edges[-1] == pytest.approx(bins.end)
+        assert edges[1] - edges[0] == pytest.approx(bins.size)
+
+
+def test_bin_dataframes_shares_the_grid(sample_histogram_settings):
+    # Arrange: no bin size, the edges are computed from all groups
+    sample_histogram_settings.x_axis_title = "x"
+    sample_histogram_settings.y_axis_title = "y"
+    sample_histogram_settings.feature_1_bin_size = None
+    sample_histogram_settings.feature_2_bin_size = None
+    dfs = [
+        pd.DataFrame({"x": [0, 1, 2], "y": [0, 1, 2]}),
+        pd.DataFrame({"x": [5, 6], "y": [10, 12]}),
+    ]
+
+    # Act
+    binned = sample_histogram_settings.get_shared_grid_settings(dfs).bin_dataframes(dfs)
+
+    # Assert
+    assert len(binned) == 2
+    assert (binned[0].x_edges == binned[1].x_edges).all()
+    assert binned[0].x_edges[0] < 0 and binned[0].x_edges[-1] > 6
+    assert binned[1].y_edges[-1] > 12
+    assert binned[0].counts.sum() == 3
+    assert binned[1].counts.sum() == 2
+    single = sample_histogram_settings.bin_dataframe(pd.concat(dfs))
+    assert (binned[0].counts + binned[1].counts == single.counts).all()
+
+
+def test_bin_dataframes_auto_sized(sample_histogram_settings):
+    # Arrange: default settings, the bin sizes are auto calculated by plotly for each trace
+    sample_histogram_settings.x_axis_title = "x"
+    sample_histogram_settings.y_axis_title = "y"
+    dfs = [
+        pd.DataFrame({"x": [0, 1, 2], "y": [0, 1, 2]}),
+        pd.DataFrame({"x": [5.5, 6.1], "y": [10, 12]}),
+    ]
+
+    # Act
+    binned = sample_histogram_settings.bin_dataframes(dfs)
+
+    # Assert: each group is binned on its own grid, as bin_dataframe does
+    for df, group_binned in zip(dfs, binned):
+        single = sample_histogram_settings.bin_dataframe(df)
+        assert (group_binned.x_edges == single.x_edges).all()
+        assert (group_binned.y_edges == single.y_edges).all()
+        assert (group_binned.counts == single.counts).all()
+    assert not sample_histogram_settings.has_bin_sizes()
+
+
+def test_create_binned_contour(sample_histogram_settings):
+    # Arrange
+    df = pd.DataFrame({"Feature 1": [1, 2, 2, 3], "Feature 2": [1, 2, 2, 3]})
+    sample_histogram_settings.normalized = True
+    binned = sample_histogram_settings.bin_dataframes([df])[0]
+
+    # Act
+    trace = sample_histogram_settings.create_binned_contour(binned)
+
+    # Assert: the same grid and percentages as the histogram trace
+    assert len(trace.x) == len(binned.x_centers)
+    assert sum(map(sum, trace.z)) == pytest.approx(100)
+    assert trace.colorbar.ticksuffix == "%"
+
+
+def test_create_hexbin_traces(sample_histogram_settings):
+    # Arrange
+    df = pd.DataFrame({"Feature 1": [1, 2, 2, 3], "Feature 2": [1, 2, 2, 3]})
+    sample_histogram_settings.bin_shape = "hexagon"
+    sample_histogram_settings.hexagon_gridsize = 4
+
+    # Act
+    binned = sample_histogram_settings.bin_hexagons(df)
+    traces = sample_histogram_settings.create_traces(df)
+
+    # Assert: the hexagons holding points drawn as closed polygons, and their values as markers
+    assert binned.counts.sum() == 4
+    assert binned.x_size == pytest.approx(0.5)
+    polygons, markers = traces[:-1], traces[-1]
+    assert all(trace.fill == "toself" for trace in polygons)
+    number_of_points = sum(np.isfinite(trace.x).sum() for trace in polygons)
+    assert number_of_points == 7 * np.count_nonzero(binned.counts)
+    assert list(markers.marker.color) == pytest.approx(list(binned.z[binned.counts > 0]))
+    assert sum(markers.marker.color) == pytest.approx(100)
+    assert markers.marker.colorbar.ticksuffix == "%"
+
+
+def test_multiplots_hexagons_share_one_colorbar(sample_histogram_settings):
+    # Arrange: a dense and a sparse group
+    dfs = [
+        pd.DataFrame({"Feature 1": [1.0, 1.0, 1.0, 3.0], "Feature 2": [1.0, 1.0, 1.0, 3.0]}),
+        pd.DataFrame({"Feature 1": np.arange(4.0), "Feature 2": np.arange(4.0)}),
+    ]
+    sample_histogram_settings.bin_shape = "hexagon"
+    sample_histogram_settings.hexagon_gridsize = 4
+
+    # Act
+    fig = VisualizeSettings().build_multiplots_figure(dfs, ["A", "B"], sample_histogram_settings)
+
+    # Assert: both groups are colored on the range of the densest hexagon
+    markers = [trace for trace in fig.data if trace.mode == "markers"]
+    assert [trace.marker.coloraxis for trace in markers] == ["coloraxis", "coloraxis"]
+    assert fig.layout.coloraxis.cmin == 0
+    assert fig.layout.coloraxis.cmax == pytest.approx(75)
+    assert max(markers[1].marker.color) < fig.layout.coloraxis.cmax
+
+
+def test_hexagon_gridsize_is_independent_of_the_bins(sample_histogram_settings):
+    # Arrange
+    df = pd.DataFrame({"Feature 1": np.arange(10.0), "Feature 2": np.arange(10.0)})
+    sample_histogram_settings.bin_shape = "hexagon"
+    sample_histogram_settings.hexagon_gridsize = 10
+
+    # Act
+    sample_histogram_settings.feature_1_bin_size = 1
+    small_bins = sample_histogram_settings.bin_hexagons(df)
+    sample_histogram_settings.feature_1_bin_size = 5
+    large_bins = sample_histogram_settings.bin_hexagons(df)
+
+    # Assert
+    assert small_bins.x_size == large_bins.x_size == pytest.approx(0.9)
+    assert (small_bins.counts == large_bins.counts).all()
+
+
+def test_invalid_bin_shape():
+    with pytest.raises(ValueError):
+        Histogram2DContourSettings(bin_shape="triangle")
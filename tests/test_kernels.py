@@ -0,0 +1,90 @@
+import numpy as np
+from pytest import fixture, mark
+
+from histogram2d import kernels
+
+
+@fixture
+def sample_rows():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-1, 11, 500)
+    y = rng.uniform(-1, 6, 500)
+    # values on the edges, and a missing value
+    x[:3] = [0, 10, np.nan]
+    y[:3] = [0, 5, 1]
+    group_index = rng.integers(0, 3, 500)
+    return group_index, y, x, np.linspace(0, 5, 6), np.linspace(0, 10, 11)
+
+
+def get_expected_counts(group_index, y, x, y_edges, x_edges):
+    expected, _ = np.histogramdd((group_index, y, x), bins=[np.arange(4) - 0.5, y_edges, x_edges])
+    return expected
+
+
+def test_get_bin_index():
+    index = kernels.get_bin_index(np.array([-1, 0, 0.5, 1, 2, np.nan]), np.array([0.0, 1.0, 2.0]))
+    assert index.tolist() == [-1, 0, 0, 1, 1, -1]
+
+
+def test_count_groups_numpy(sample_rows):
+    counts = kernels.count_groups_numpy(*sample_rows, 3)
+    assert counts.shape == (3, 5, 10)
+    assert np.array_equal(counts, get_expected_counts(*sample_rows))
+
+
+def test_count_groups_loop(sample_rows):
+    # the kernel compiled by numba, run by the interpreter
+    counts = kernels._count_groups_loop(*sample_rows, 3)
+    assert np.array_equal(counts, get_expected_counts(*sample_rows))
+
+
+@mark.skipif(kernels.count_groups_jit is None, reason="numba is not installed")
+def test_count_groups_jit(sample_rows):
+    counts = kernels.count_groups(*sample_rows, 3, use_jit=True)
+    assert np.array_equal(counts, get_expected_counts(*sample_rows))
+
+
+def test_get_hexagon_index_is_the_nearest_center(sample_rows):
+    # Arrange
+    _, y, x, _, _ = sample_rows
+    x_range, y_range = (0.0, 10.0), (0.0, 5.0)
+    x_size, y_size, _, _ = kernels.get_hexagon_grid(x_range, y_range, 5)
+    x_centers, y_centers = kernels.get_hexagon_centers(x_range, y_range, 5)
+
+    # Act
+    index = kernels.get_hexagon_index(x, y, x_range, y_range, 5)
+
+    # Assert: the nearest center with y scaled to regular hexagons, -1 out of the ranges
+    inside = (x >= 0) & (x <= 10) & (y >= 0) & (y <= 5)
+    distances = ((x[:, None] - x_centers) / x_size) ** 2 + 3 * (
+        (y[:, None] - y_centers) / y_size
+    ) ** 2
+    np.testing.assert_array_equal(index[inside], distances[inside].argmin(axis=1))
+    assert np.all(index[~inside] == -1)
+
+
+def test_count_hexagons(sample_rows):
+    _, y, x, _, _ = sample_rows
+
+    counts, x_centers, y_centers = kernels.count_hexagons(x, y, (0.0, 10.0), (0.0, 5.0), 5)
+
+    # 5 columns and round(5 / sqrt(3)) = 3 rows in the second lattice, one more in the first
+    inside = (x >= 0) & (x <= 10) & (y >= 0) & (y <= 5)
+    assert counts.sum() == inside.sum()
+    assert len(counts) == len(x_centers) == len(y_centers) == 6 * 4 + 5 * 3
+
+
+def test_get_hexagon_vertices_tile_the_grid():
+    # Arrange
+    x_range, y_range = (0.0, 10.0), (0.0, 5.0)
+    x_size, y_size, _, _ = kernels.get_hexagon_grid(x_range, y_range, 5)
+
+    # Act: a center of the first lattice and its upper right neighbour in the second one
+    x_vertices, y_vertices = kernels.get_hexagon_vertices(
+        np.array([0.0, x_size / 2]), np.array([0.0, y_size / 2]), x_size, y_size
+    )
+
+    # Assert: they share the edge between the upper right corner of the first and the lower
+    # corner of the second
+    assert (x_vertices[0, 1], y_vertices[0, 1]) == (x_vertices[1, 5], y_vertices[1, 5])
+    assert (x_vertices[0, 2], y_vertices[0, 2]) == (x_vertices[1, 4], y_vertices[1, 4])
@@ -0,0 +1,56 @@
+import json
+import os
+
+from pytest import fixture
+
+from histogram2d.builder import Histogram2DContourSettings
+from histogram2d.manifest import RunManifest
+
+
+@fixture
+def sample_manifest() -> RunManifest:
+    return RunManifest(
+        inputs=[{"path": "/data/file.csv", "size": 10, "mtime_ns": 1}],
+        settings_hash="abc",
+        planned_outputs=["combined.png", "A.png"],
+    )
+
+
+def test_save_and_load(sample_manifest, tmp_path):
+    # Act
+    sample_manifest.save(str(tmp_path))
+
+    # Assert: no temporary file is left behind
+    assert os.listdir(tmp_path) == [RunManifest.FILENAME]
+    loaded_manifest = RunManifest.load(str(tmp_path))
+    assert loaded_manifest == sample_manifest
+    with open(tmp_path / RunManifest.FILENAME) as file:
+        assert json.load(file)["settings_hash"] == "abc"
+
+
+def test_mark_completed(sample_manifest, tmp_path):
+    # Arrange
+    (tmp_path / "combined.png").write_bytes(b"")
+
+    # Act
+    sample_manifest.mark_completed("combined.png", str(tmp_path))
+
+    # Assert
+    assert sample_manifest.is_completed("combined.png", str(tmp_path))
+    assert not sample_manifest.is_completed("A.png", str(tmp_path))
+    assert not sample_manifest.is_finished()
+    assert RunManifest.load(str(tmp_path)).completed_outputs == ["combined.png"]
+
+    # Assert: outputs removed from the folder are not completed anymore
+    os.remove(tmp_path / "combined.png")
+    assert not sample_manifest.is_completed("combined.png", str(tmp_path))
+
+
+def test_hash_settings():
+    settings = Histogram2DContourSettings()
+    assert RunManifest.hash_settings(settings, ["A"]) == RunManifest.hash_settings(
+        Histogram2DContourSettings(), ["A"]
+    )
+    assert RunManifest.hash_settings(settings, ["A"]) != RunManifest.hash_settings(
+        Histogram2DContourSettings(colorscale="viridis"), ["A"]
+    )
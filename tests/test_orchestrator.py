@@ -1,13 +1,26 @@
+import numpy as np
 import pandas as pd
 
-from pytest import fixture, raises
+from pytest import approx, fixture, raises
 from unittest.mock import patch, Mock
+import gzip
+import io
+import logging
 import tempfile
+import threading
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from histogram2d.builder import Histogram2DContourSettings
+from histogram2d.export import ExportSettings
+from histogram2d.filters import FilterSettings
 from histogram2d.orchestrator import Orchestrator
+from histogram2d.parallel import ParallelSettings
+from histogram2d.plan import OutputPlan
+from histogram2d.uncertainty import UncertaintySettings
+from histogram2d.visualize import VisualizeSettings
 
 @fixture
 def sample_raw_df() -> pd.DataFrame:
@@ -158,8 +171,10 @@ def test_init(sample_orchestrator):
     # Assert that the orchestrator is created with the correct debug value
     assert sample_orchestrator.debug
 
-    # Assert that the orchestrator is created with the correct root folder
-    assert os.path.exists(sample_orchestrator.output_folder)
+    # Assert that the outputs folder is only created on the first write
+    assert sample_orchestrator.output_folder is None
+    assert os.path.exists(sample_orchestrator.get_output_folder())
+    assert sample_orchestrator.get_output_folder() == sample_orchestrator.output_folder
 
 
 def test_is_group_column_name(sample_orchestrator):
@@ -261,6 +276,19 @@ def test_get_features_ranges(sample_orchestrator, sample_groups_dfs):
         feature_ranges = sample_orchestrator.get_features_ranges(sample_groups_dfs, ['D'])
     
 
+def test_get_features_ranges_excludes_filtered_rows(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        runner = Orchestrator(
+            root_folder=temp_dir, filter_settings=FilterSettings(filters=["F1 < 5"])
+        )
+
+        dfs, _, features = runner.prepare_data(write_sample_csv)
+
+        assert all(len(df) == 3 for df in dfs)
+        assert runner.histogram2d_settings.max_feature_1 == 4
+        assert runner.histogram2d_settings.max_feature_2 == 4.1
+
+
 def test_update_settings_with_max_min_feature_1(sample_orchestrator):
     # Act : Update the settings with the min and max values of the first feature
     sample_orchestrator.update_settings_with_max_min_feature_1(1,2)
@@ -338,3 +366,698 @@ def test_get_features(sample_orchestrator, sample_groups_dfs):
     with raises(Exception):
         features = sample_orchestrator.get_features([first_df])
 
+
+
+def test_get_plotly_formats_with_raster_renderer():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator = Orchestrator(root_folder=temp_dir, png_renderer="raster")
+        assert orchestrator.get_plotly_formats() == ["pdf", "svg"]
+
+        orchestrator.png_renderer = "kaleido"
+        assert orchestrator.get_plotly_formats() == ["pdf", "svg", "png"]
+
+        with raises(ValueError):
+            Orchestrator(root_folder=temp_dir, png_renderer="matplotlib")
+
+
+def test_run_resume(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange : a run interrupted after the combined figure
+        first_runner = Orchestrator(root_folder=temp_dir, png_renderer="raster")
+        with patch.object(
+            Orchestrator, "write_image_to_formats", autospec=True
+        ) as mock_write_image:
+            mock_write_image.side_effect = [None, RuntimeError("kaleido crashed")]
+            with raises(RuntimeError):
+                first_runner.run(write_sample_csv)
+        assert first_runner.manifest.completed_outputs == ["combined.png"]
+
+        # Act : resume the run
+        runner = Orchestrator(root_folder=temp_dir, png_renderer="raster", resume=True)
+        with patch.object(Orchestrator, "write_image_to_formats", autospec=True) as mock_write_image:
+            runner.run(write_sample_csv)
+
+        # Assert : same folder, and the combined png is not rendered again. The mocked kaleido
+        # outputs were never written, so they are all rendered
+        assert runner.output_folder == first_runner.output_folder
+        assert sorted(runner.manifest.completed_outputs) == ["A.png", "B.png", "combined.png"]
+        assert [call.args[2] for call in mock_write_image.call_args_list] == [
+            "combined",
+            "A",
+            "B",
+        ]
+
+
+def test_run_comparison(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(root_folder=temp_dir)
+
+        # Act
+        with patch.object(Orchestrator, "write_image_to_formats") as mock_write_image:
+            distances = runner.run_comparison(write_sample_csv, features=["F1", "F2"])
+
+        # Assert
+        assert distances.index.tolist() == ["A", "B"]
+        assert distances.columns.tolist() == ["A", "B"]
+        assert distances.loc["A", "B"] == 0
+        assert os.path.exists(os.path.join(runner.output_folder, "distances.csv"))
+        mock_write_image.assert_called_once()
+        assert mock_write_image.call_args.args[1] == "comparison"
+
+
+def test_run_uncertainty(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(root_folder=temp_dir)
+
+        # Act
+        with patch.object(Orchestrator, "write_image_to_formats") as mock_write_image:
+            grids = runner.run_uncertainty(
+                write_sample_csv,
+                features=["F1", "F2"],
+                settings_uncertainty=UncertaintySettings(number_of_resamples=100, seed=0),
+            )
+
+        # Assert
+        assert grids["se"].shape == grids["percentage"].shape
+        assert grids["se"].shape[0] == 2
+        assert os.path.exists(os.path.join(runner.output_folder, "uncertainty.csv"))
+        mock_write_image.assert_called_once()
+        assert mock_write_image.call_args.args[1] == "uncertainty"
+
+
+def test_run_leaves_the_root_logger_unconfigured(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(root_folder=temp_dir)
+        root_logger = logging.getLogger()
+        root_handlers = list(root_logger.handlers)
+
+        # Act
+        with patch.object(logging.root, "handlers", []), patch.object(
+            Orchestrator, "write_image_to_formats"
+        ):
+            runner.run_uncertainty(
+                write_sample_csv,
+                features=["F1", "F2"],
+                settings_uncertainty=UncertaintySettings(number_of_resamples=10, seed=0),
+            )
+            handlers_during_run = list(root_logger.handlers)
+
+        # Assert
+        assert handlers_during_run == []
+        assert root_logger.handlers == root_handlers
+
+
+def test_get_pair_settings(sample_orchestrator, sample_groups_dfs):
+    # Arrange
+    features = sample_orchestrator.get_features(sample_groups_dfs, max_feature_count=None)
+    feature_ranges = sample_orchestrator.get_features_ranges(
+        sample_groups_dfs, features, max_feature_count=None
+    )
+
+    # Act
+    pair_settings = sample_orchestrator.get_pair_settings(features, feature_ranges, {"A": 1})
+
+    # Assert : every ordered pair of different features, ranged from the shared ranges
+    assert features == ["A", "B", "C"]
+    assert len(pair_settings) == 6
+    settings = pair_settings[("C", "B")]
+    assert (settings.x_axis_title, settings.y_axis_title) == ("C", "B")
+    assert (settings.min_feature_1, settings.max_feature_1) == (0, 1)
+    assert (settings.min_feature_2, settings.max_feature_2) == (-1, 10)
+    assert pair_settings[("A", "B")].feature_1_bin_size == 1
+    assert pair_settings[("A", "B")].feature_2_bin_size is None
+    # the settings of the orchestrator are left untouched
+    assert sample_orchestrator.histogram2d_settings.x_axis_title != "C"
+
+
+def test_run_pair_grid(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(root_folder=temp_dir)
+
+        # Act
+        with patch.object(Orchestrator, "write_image_to_formats") as mock_write_image:
+            runner.run_pair_grid(write_sample_csv, features=["F1", "F2"])
+
+        # Assert : one grid per group, with one subplot per pair of features
+        titles = [call.args[1] for call in mock_write_image.call_args_list]
+        assert titles == ["A_pairs", "B_pairs"]
+        fig = mock_write_image.call_args_list[0].args[0]
+        assert [trace.type for trace in fig.data] == [
+            "histogram",
+            "histogram2dcontour",
+            "histogram2dcontour",
+            "histogram",
+        ]
+        # both pairs are colored on the one colorbar of the figure
+        assert [trace.coloraxis for trace in fig.data[1:3]] == ["coloraxis", "coloraxis"]
+        assert fig.layout.coloraxis.colorbar.title.text == "Percentage"
+
+
+def test_run_pair_grid_with_hexagonal_bins(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(
+            root_folder=temp_dir,
+            histogram2d_settings=Histogram2DContourSettings(bin_shape="hexagon"),
+        )
+
+        # Act
+        with patch.object(Orchestrator, "write_image_to_formats") as mock_write_image:
+            runner.run_pair_grid(write_sample_csv, features=["F1", "F2"])
+
+        # Assert : the hexagons of both pairs are filled on the shared colorbar range
+        fig = mock_write_image.call_args_list[0].args[0]
+        scatters = [trace for trace in fig.data if trace.type == "scatter"]
+        markers = [trace for trace in scatters if trace.mode == "markers"]
+        assert len(markers) == 2
+        assert [trace.marker.coloraxis for trace in markers] == ["coloraxis", "coloraxis"]
+        assert fig.layout.coloraxis.cmin == 0
+        assert fig.layout.coloraxis.cmax == max(max(trace.marker.color) for trace in markers)
+
+
+def test_get_plotly_formats_with_native_vector_renderer():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator = Orchestrator(root_folder=temp_dir, vector_renderer="native")
+        assert orchestrator.get_plotly_formats() == ["png"]
+
+        orchestrator.png_renderer = "raster"
+        assert orchestrator.get_plotly_formats() == []
+
+        with raises(ValueError):
+            Orchestrator(root_folder=temp_dir, vector_renderer="cairo")
+
+
+def test_get_plotly_formats_with_hexagonal_bins():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator = Orchestrator(
+            histogram2d_settings=Histogram2DContourSettings(bin_shape="hexagon"),
+            root_folder=temp_dir,
+            png_renderer="raster",
+            vector_renderer="native",
+        )
+        assert orchestrator.get_plotly_formats() == ["pdf", "svg", "png"]
+
+
+def test_run_native_renderers(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(root_folder=temp_dir, png_renderer="raster", vector_renderer="native")
+
+        # Act
+        with patch.object(Orchestrator, "write_image_to_formats") as mock_write_image:
+            runner.run(write_sample_csv)
+
+        # Assert: plotly is never used
+        mock_write_image.assert_not_called()
+        assert sorted(os.listdir(runner.output_folder)) == sorted(
+            [
+                f"{title}.{extension}"
+                for title in ["combined", "A", "B"]
+                for extension in ["pdf", "svg", "png"]
+            ]
+            + ["manifest.json"]
+        )
+
+
+def test_run_plan_writes_only_requested_outputs(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(
+            root_folder=temp_dir,
+            png_renderer="raster",
+            vector_renderer="native",
+            export_settings=ExportSettings(),
+        )
+        plan = OutputPlan(groups=["B"], figures=["individual"], formats=["png"], exports=False)
+
+        # Act
+        with patch.object(Orchestrator, "sample_groups", wraps=runner.sample_groups) as mock_sample:
+            runner.run(write_sample_csv, plan=plan)
+
+        # Assert: only the group of the requested figure is sampled
+        assert sorted(os.listdir(runner.output_folder)) == ["B.png", "manifest.json"]
+        assert mock_sample.call_args.args[1] == ["B"]
+        assert runner.manifest.planned_outputs == ["B.png"]
+
+
+def test_get_combined_titles():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator = Orchestrator(
+            root_folder=temp_dir, multiplot_settings=VisualizeSettings(groups_per_page=4)
+        )
+        assert orchestrator.multiplot_settings.get_pages(4) == [slice(0, 4)]
+        assert orchestrator.multiplot_settings.get_pages(9) == [
+            slice(0, 4),
+            slice(4, 8),
+            slice(8, 12),
+        ]
+        assert orchestrator.get_combined_titles(1) == ["combined"]
+        assert orchestrator.get_combined_titles(10)[0] == "combined_page_01"
+        assert orchestrator.get_stitched_outputs(10) == []
+
+
+def test_run_paged_combined_figure(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange: one group per page, stitched
+        runner = Orchestrator(
+            histogram2d_settings=Histogram2DContourSettings(
+                hist_colorbar_min=None, hist_colorbar_max=None
+            ),
+            multiplot_settings=VisualizeSettings(groups_per_page=1, stitch_pages=True),
+            root_folder=temp_dir,
+            png_renderer="raster",
+            vector_renderer="native",
+            parallel_settings=ParallelSettings(mode="thread", max_workers=2),
+        )
+
+        # Act
+        runner.run(write_sample_csv)
+
+        # Assert
+        outputs = os.listdir(runner.output_folder)
+        assert "combined.svg" not in outputs
+        assert {"combined_page_1.svg", "combined_page_2.png", "combined.pdf"} <= set(outputs)
+        with open(os.path.join(runner.output_folder, "combined.pdf"), "rb") as file:
+            assert b"/Count 2" in file.read()
+        assert runner.manifest.is_finished()
+
+
+def test_run_paged_combined_figure_reuses_the_binned_groups(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange: explicit bin sizes, so the grid of the settings is shared by the groups
+        runner = Orchestrator(
+            histogram2d_settings=Histogram2DContourSettings(
+                feature_1_bin_size=1, feature_2_bin_size=1
+            ),
+            multiplot_settings=VisualizeSettings(groups_per_page=1),
+            root_folder=temp_dir,
+            png_renderer="raster",
+            vector_renderer="native",
+        )
+
+        # Act
+        with patch.object(
+            Histogram2DContourSettings,
+            "count_dataframes",
+            autospec=True,
+            side_effect=Histogram2DContourSettings.count_dataframes,
+        ) as mock_count:
+            runner.run(write_sample_csv)
+
+        # Assert: the pages and the individual figures are drawn from one binning of the groups
+        mock_count.assert_called_once()
+        assert {"combined_page_1.png", "combined_page_2.svg", "A.png"} <= set(
+            os.listdir(runner.output_folder)
+        )
+
+
+def test_get_shared_scale_settings(sample_orchestrator):
+    # Arrange
+    dfs = [
+        pd.DataFrame({"Feature 1": [0.0, 1.0, 2.0], "Feature 2": [0.0, 1.0, 2.0]}),
+        pd.DataFrame({"Feature 1": [4.0, 4.0], "Feature 2": [1.0, 1.0]}),
+    ]
+    sample_orchestrator.histogram2d_settings = Histogram2DContourSettings(
+        hist_colorbar_min=None, hist_colorbar_max=None, normalized=False
+    )
+    shared_settings = sample_orchestrator.histogram2d_settings.get_shared_grid_settings(dfs)
+    binned = shared_settings.bin_dataframes(dfs)
+
+    # Act
+    settings = sample_orchestrator.get_shared_scale_settings(binned)
+
+    # Assert: a page with the first group only keeps the grid and colour range of both groups
+    assert (settings.hist_colorbar_min, settings.hist_colorbar_max) == (0, 2)
+    assert settings.bin_dataframes(dfs[:1])[0].x_edges[0] == binned[0].x_edges[0]
+    assert settings.bin_dataframes(dfs[:1])[0].x_edges[-1] >= binned[0].x_edges[-1]
+
+
+def test_get_shared_scale_settings_with_hexagonal_bins(sample_orchestrator):
+    # Arrange
+    dfs = [
+        pd.DataFrame({"Feature 1": [0.0, 1.0, 2.0], "Feature 2": [0.0, 1.0, 2.0]}),
+        pd.DataFrame({"Feature 1": [4.0, 4.0, 4.0], "Feature 2": [1.0, 1.0, 1.0]}),
+    ]
+    sample_orchestrator.histogram2d_settings = Histogram2DContourSettings(
+        hist_colorbar_min=None, hist_colorbar_max=None, normalized=False, bin_shape="hexagon"
+    )
+    shared_settings = sample_orchestrator.histogram2d_settings.get_shared_grid_settings(dfs)
+    binned = shared_settings.bin_dataframes(dfs)
+
+    # Act
+    settings = sample_orchestrator.get_shared_scale_settings(binned, dfs)
+
+    # Assert: the colour range of the pages is the one of the hexagons of all the groups
+    hexagons = [sample_orchestrator.histogram2d_settings.bin_hexagons(df) for df in dfs]
+    assert (settings.hist_colorbar_min, settings.hist_colorbar_max) == (0, 3)
+    assert max(group.counts.max() for group in hexagons) == 3
+
+
+def test_run_with_data_export(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(
+            root_folder=temp_dir, export_settings=ExportSettings(formats=["csv", "parquet"])
+        )
+
+        # Act
+        with patch.object(Orchestrator, "write_image_to_formats"):
+            runner.run(write_sample_csv)
+
+        # Assert
+        bins = pd.read_parquet(os.path.join(runner.output_folder, "bins.parquet"))
+        assert sorted(bins["group"].unique()) == ["A", "B"]
+        statistics = pd.read_csv(os.path.join(runner.output_folder, "statistics.csv"))
+        assert statistics["n"].tolist() == [4, 4, 4, 4]
+        assert {"bins.csv", "statistics.parquet"} <= set(runner.manifest.completed_outputs)
+
+
+def test_exported_bins_are_the_figure_bins(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange: default settings, the bin sizes are auto calculated
+        runner = Orchestrator(root_folder=temp_dir, export_settings=ExportSettings(formats=["csv"]))
+
+        # Act
+        with patch.object(Orchestrator, "write_image_to_formats", autospec=True) as mock_write_image:
+            runner.run(write_sample_csv)
+
+        # Assert: each group's exported edges are the bins its trace draws
+        bins = pd.read_csv(os.path.join(runner.output_folder, "bins.csv"))
+        combined = mock_write_image.call_args_list[0].args[1]
+        for trace, group in zip(combined.data, ["A", "B"]):
+            group_bins = bins[bins["group"] == group]
+            for axis in ["x", "y"]:
+                trace_bins = trace[f"{axis}bins"]
+                starts = np.unique(group_bins[f"{axis}_start"])
+                ends = np.unique(group_bins[f"{axis}_end"])
+                assert trace_bins.size > 0
+                assert starts[0] == approx(trace_bins.start)
+                assert np.diff(starts) == approx(trace_bins.size)
+                assert ends[-1] >= trace_bins.end > ends[-1] - trace_bins.size
+
+
+def test_run_with_prebinned_traces(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(root_folder=temp_dir, prebinned_traces=True)
+
+        # Act
+        with patch.object(Orchestrator, "write_image_to_formats", autospec=True) as mock_write_image:
+            runner.run(write_sample_csv)
+
+        # Assert: the combined and individual figures draw the binned grids
+        figures = [call.args[1] for call in mock_write_image.call_args_list]
+        assert [len(figure.data) for figure in figures] == [2, 1, 1]
+        assert all(trace.type == "contour" for figure in figures for trace in figure.data)
+
+
+def test_render_in_memory(sample_raw_df):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(
+            root_folder=temp_dir,
+            png_renderer="raster",
+            vector_renderer="native",
+        )
+
+        # Act
+        result = runner.render(sample_raw_df, titles=["combined", "B"], formats=["png", "svg"])
+
+        # Assert: nothing written to disk
+        assert os.listdir(temp_dir) == []
+        assert result.groups == ["A", "B"]
+        assert result.features == ["F1", "F2"]
+        assert len(result.binned) == 2
+        assert list(result.figures) == ["combined", "B"]
+        assert len(result.figures["combined"].data) == 2
+        assert result.images["B"]["png"].startswith(b"\x89PNG")
+        assert result.images["combined"]["svg"].startswith(b"<svg")
+
+
+def test_render_default_orchestrator_leaves_filesystem_untouched(sample_raw_df):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(root_folder=temp_dir)
+
+        # Act
+        result = runner.render(sample_raw_df, titles=["A"], formats=["svg"])
+
+        # Assert
+        assert os.listdir(temp_dir) == []
+        assert runner.output_folder is None
+        assert result.images["A"]["svg"].startswith(b"<svg")
+
+
+def test_render_pre_split_groups():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(root_folder=temp_dir, png_renderer="raster")
+        data = {
+            "A": pd.DataFrame({"F1": [1, 2, None], "F2": [1.0, 2.0, 3.0]}),
+            "B": pd.DataFrame({"F1": [3, 4, 5], "F2": ["1", "2", "3"]}),
+        }
+
+        # Act
+        result = runner.render(data, formats=["png"], return_figures=False, save=True)
+
+        # Assert
+        assert result.figures == {}
+        assert [len(binned.counts.nonzero()[0]) > 0 for binned in result.binned] == [True, True]
+        assert sorted(os.listdir(runner.output_folder)) == ["A.png", "B.png", "combined.png"]
+
+        with raises(ValueError):
+            runner.render(data, titles=["C"])
+        with raises(ValueError):
+            runner.render(data, formats=["jpg"])
+
+
+def test_run_from_compressed_file_object(sample_raw_df):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange: a gzip compressed csv, as piped from an archive
+        stream = io.BytesIO(gzip.compress(sample_raw_df.to_csv(index=False).encode("utf-8")))
+        stream.name = "archive.csv.gz"
+        runner = Orchestrator(root_folder=temp_dir, png_renderer="raster", vector_renderer="native")
+
+        # Act
+        runner.run(stream)
+
+        # Assert
+        assert "A.png" in os.listdir(runner.output_folder)
+        assert runner.manifest.inputs[0]["path"] == "archive.csv.gz"
+
+
+@fixture
+def write_sample_workbook(sample_raw_df) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as temp_file:
+        file_path = temp_file.name
+    second_sheet_df = sample_raw_df.copy()
+    second_sheet_df.iloc[1:, :] = second_sheet_df.iloc[1:, :] * 10
+    with pd.ExcelWriter(file_path) as writer:
+        sample_raw_df.to_excel(writer, sheet_name="Day 1", index=False)
+        second_sheet_df.to_excel(writer, sheet_name="Day 2|3", index=False)
+    return file_path
+
+
+def test_run_workbook(write_sample_workbook):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(
+            root_folder=temp_dir,
+            png_renderer="raster",
+            vector_renderer="native",
+            parallel_settings=ParallelSettings(mode="process", max_workers=2),
+        )
+
+        # Act
+        output_folders = runner.run_workbook(write_sample_workbook, shared_ranges=True)
+
+        # Assert: one subfolder per sheet, binned on the ranges of both sheets
+        assert list(output_folders) == ["Day 1", "Day 2|3"]
+        assert output_folders["Day 2|3"] == os.path.join(runner.output_folder, "Day 2_3")
+        for output_folder in output_folders.values():
+            assert {"combined.png", "A.svg", "B.pdf", "manifest.json"} <= set(os.listdir(output_folder))
+        assert runner.last_run.histogram2d_settings.max_feature_1 == 50
+        assert runner.histogram2d_settings.max_feature_1 == 0
+
+
+def test_run_workbook_selected_sheets(write_sample_workbook):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        runner = Orchestrator(root_folder=temp_dir, png_renderer="raster", vector_renderer="native")
+        output_folders = runner.run_workbook(write_sample_workbook, sheets=["Day 2|3"])
+        assert list(output_folders) == ["Day 2|3"]
+
+        with raises(ValueError):
+            runner.run_workbook(write_sample_workbook, sheets=["Day 4"])
+
+
+def test_update_outputs_renders_only_changed_groups(sample_raw_df, write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        runner = Orchestrator(root_folder=temp_dir, png_renderer="raster", vector_renderer="native")
+        assert runner.update_outputs(write_sample_csv) == ["A", "B"]
+
+        # Act: nothing changed, then a value of B changes within the ranges
+        unchanged = runner.update_outputs(write_sample_csv)
+        sample_raw_df.loc[2, "B"] = 4
+        sample_raw_df.to_csv(write_sample_csv, index=False)
+        with patch.object(
+            Orchestrator,
+            "write_binned_output",
+            autospec=True,
+            side_effect=Orchestrator.write_binned_output,
+        ) as mock_write:
+            changed = runner.update_outputs(write_sample_csv)
+
+        # Assert
+        assert unchanged == []
+        assert changed == ["B"]
+        assert {call.args[3] for call in mock_write.call_args_list} == {"combined", "B"}
+        assert len(runner.manifest.completed_outputs) == len(runner.manifest.planned_outputs)
+
+
+def test_update_outputs_removes_outputs_of_removed_groups(sample_raw_df, write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        runner = Orchestrator(root_folder=temp_dir, png_renderer="raster", vector_renderer="native")
+        runner.update_outputs(write_sample_csv)
+
+        sample_raw_df.drop(columns=["B", "Unnamed 3"]).to_csv(write_sample_csv, index=False)
+        runner.update_outputs(write_sample_csv)
+
+        assert "B.png" not in os.listdir(runner.output_folder)
+        assert "A.png" in os.listdir(runner.output_folder)
+
+
+def test_watch_updates_only_when_the_file_changes(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        runner = Orchestrator(root_folder=temp_dir, png_renderer="raster", vector_renderer="native")
+        with patch.object(Orchestrator, "update_outputs") as mock_update:
+            runner.watch(write_sample_csv, poll_interval=0, max_polls=3)
+        mock_update.assert_called_once_with(write_sample_csv, [])
+
+
+def test_settings_are_not_shared(write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange
+        settings_histogram = Histogram2DContourSettings()
+        runner = Orchestrator(histogram2d_settings=settings_histogram, root_folder=temp_dir)
+        other_runner = Orchestrator(root_folder=temp_dir)
+
+        # Act
+        runner.prepare_data(write_sample_csv)
+
+        # Assert: the ranges are derived on the snapshot of the orchestrator only
+        assert runner.histogram2d_settings.max_feature_1 == 5
+        assert settings_histogram.max_feature_1 == 0
+        assert other_runner.histogram2d_settings.max_feature_1 == 0
+        assert runner.get_output_folder() != other_runner.get_output_folder()
+
+
+@patch("histogram2d.orchestrator.datetime")
+def test_prepare_outputs_folder_is_unique(mock_datetime):
+    mock_datetime.now.return_value = datetime(2021, 1, 1, 12, 0, 0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folders = [Orchestrator.prepare_outputs_folder(temp_dir) for _ in range(3)]
+
+        assert [os.path.basename(folder) for folder in folders] == [
+            "2021-01-01_12-00-00",
+            "2021-01-01_12-00-00_1",
+            "2021-01-01_12-00-00_2",
+        ]
+
+
+def test_concurrent_runs(sample_raw_df, write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange: a second file with other ranges
+        scaled_df = sample_raw_df.copy()
+        scaled_df.iloc[1:, :] = scaled_df.iloc[1:, :] * 10
+        scaled_filepath = os.path.join(temp_dir, "scaled.csv")
+        scaled_df.to_csv(scaled_filepath, index=False)
+        runners = [
+            Orchestrator(root_folder=temp_dir, png_renderer="raster", vector_renderer="native")
+            for _ in range(4)
+        ]
+        filepaths = [write_sample_csv, scaled_filepath] * 2
+
+        # Act
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda job: job[0].run(job[1]), zip(runners, filepaths)))
+
+        # Assert
+        assert len({runner.output_folder for runner in runners}) == 4
+        assert [runner.last_run.histogram2d_settings.max_feature_1 for runner in runners] == [
+            5,
+            50,
+            5,
+            50,
+        ]
+        for runner in runners:
+            assert "combined.png" in os.listdir(runner.output_folder)
+
+
+def test_concurrent_runs_on_one_orchestrator(sample_raw_df, write_sample_csv):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Arrange: a second file with other ranges, and both runs held until both are ranged
+        scaled_df = sample_raw_df.copy()
+        scaled_df.iloc[1:, :] = scaled_df.iloc[1:, :] * 10
+        scaled_filepath = os.path.join(temp_dir, "scaled.csv")
+        scaled_df.to_csv(scaled_filepath, index=False)
+        runner = Orchestrator(root_folder=temp_dir, png_renderer="raster", vector_renderer="native")
+        barrier = threading.Barrier(2)
+        write_run_outputs = Orchestrator.write_run_outputs
+        runs = {}
+
+        def write_run_outputs_together(run, data_filepath, *args, **kwargs):
+            barrier.wait(timeout=10)
+            write_run_outputs(run, data_filepath, *args, **kwargs)
+            runs[data_filepath] = run
+
+        # Act
+        with patch.object(
+            Orchestrator,
+            "write_run_outputs",
+            autospec=True,
+            side_effect=write_run_outputs_together,
+        ):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(runner.run, [write_sample_csv, scaled_filepath]))
+
+        # Assert: each run on its own ranges, outputs folder and manifest
+        assert runs[write_sample_csv].histogram2d_settings.max_feature_1 == 5
+        assert runs[scaled_filepath].histogram2d_settings.max_feature_1 == 50
+        assert runs[write_sample_csv].output_folder != runs[scaled_filepath].output_folder
+        for filepath, run in runs.items():
+            assert run.manifest.inputs[0]["path"] == os.path.abspath(filepath)
+            assert run.manifest.is_finished()
+            assert "combined.png" in os.listdir(run.output_folder)
+        assert runner.histogram2d_settings.max_feature_1 == 0
+        assert runner.last_run in runs.values()
+
+
+def test_debug_mode_is_per_orchestrator(caplog):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        debug_runner = Orchestrator(root_folder=temp_dir, debug=True)
+        runner = Orchestrator(root_folder=temp_dir)
+
+        with caplog.at_level(logging.DEBUG, logger="histogram2d.orchestrator"):
+            debug_runner.logger.debug("debug message")
+            runner.logger.debug("hidden message")
+
+        assert f"[{debug_runner.run_id}] debug message" in caplog.messages
+        assert all("hidden message" not in message for message in caplog.messages)
+
+
+def test_reads_log_with_the_run_logger(write_sample_csv, caplog):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        runner = Orchestrator(
+            root_folder=temp_dir, filter_settings=FilterSettings(filters=["F9 > 1"])
+        )
+
+        with raises(ValueError):
+            runner.run(write_sample_csv)
+
+        assert f"[{runner.last_run.run_id}] Filtered feature F9 does not exist" in caplog.text
+        assert runner.last_run.run_id != runner.run_id
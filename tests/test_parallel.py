@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+from pytest import raises
+
+from histogram2d.backends import PandasBackend
+from histogram2d.parallel import ParallelSettings
+
+
+@pytest.mark.parametrize("mode", ["serial", "thread", "process", "auto"])
+def test_map_keeps_order(mode):
+    parallel = ParallelSettings(mode=mode, max_workers=4)
+    items = list(range(-20, 20))
+
+    assert parallel.map(abs, items) == [abs(item) for item in items]
+    assert parallel.map(abs, items, releases_gil=False) == [abs(item) for item in items]
+
+
+def test_get_mode():
+    assert ParallelSettings(mode="auto").get_mode(releases_gil=True) == "thread"
+    assert ParallelSettings(mode="auto").get_mode(releases_gil=False) == "process"
+    assert ParallelSettings(mode="thread").get_mode(releases_gil=False) == "thread"
+
+    with raises(ValueError):
+        ParallelSettings(mode="gpu")
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_parallel_get_groups_df(mode):
+    # Arrange
+    data = {
+        "A": ["F1", 2, 3, 4, 5],
+        "Unnamed 1": ["F2", 2.1, 3.1, 4.1, 5.1],
+        "B": ["F1", 2, 3, None, 5],
+        "Unnamed 3": ["F2", 2.1, 3.1, 4.1, 5.1],
+        "C": ["F1", 7, 8, 9, 10],
+    }
+    df = pd.DataFrame(data)
+    expected_dfs, expected_groups = PandasBackend.get_groups_df(df.copy())
+
+    # Act
+    dfs, groups = PandasBackend.get_groups_df(df.copy(), ParallelSettings(mode=mode))
+
+    # Assert
+    assert groups == expected_groups == ["A", "B", "C"]
+    for group_df, expected_df in zip(dfs, expected_dfs):
+        pd.testing.assert_frame_equal(group_df, expected_df)
@@ -0,0 +1,51 @@
+from unittest.mock import Mock
+
+from pytest import raises
+
+from histogram2d.plan import LazyGraph, OutputPlan
+
+
+def test_get_groups():
+    groups = ["A", "B", "C"]
+
+    assert OutputPlan().get_groups(groups) == groups
+    # in the order of the file
+    assert OutputPlan(groups=["C", "A"]).get_groups(groups) == ["A", "C"]
+    assert OutputPlan(groups=["A"], figures=["combined"]).get_groups(groups) == []
+    with raises(ValueError):
+        OutputPlan(groups=["D"]).get_groups(groups)
+
+
+def test_get_formats():
+    formats = ["pdf", "svg", "png"]
+
+    assert OutputPlan().get_formats(formats) == formats
+    assert OutputPlan(formats=["png", "pdf"]).get_formats(formats) == ["pdf", "png"]
+    with raises(ValueError):
+        OutputPlan(formats=["jpg"]).get_formats(formats)
+
+
+def test_invalid_figures():
+    with raises(ValueError):
+        OutputPlan(figures=["pairs"])
+
+
+def test_lazy_graph_computes_nodes_once_and_on_request():
+    # Arrange
+    read = Mock(return_value=[1, 2, 3])
+    unused = Mock()
+    graph = LazyGraph()
+    graph.add("data", read)
+    graph.add("total", sum, ("data",))
+    graph.add("maximum", max, ("data",))
+    graph.add("unused", unused)
+
+    # Act
+    total = graph.get("total")
+    maximum = graph.get("maximum")
+
+    # Assert
+    assert (total, maximum) == (6, 3)
+    read.assert_called_once()
+    unused.assert_not_called()
+    assert graph.computed == ["data", "total", "maximum"]
@@ -0,0 +1,62 @@
+import struct
+import zlib
+
+import numpy as np
+from pytest import fixture
+
+from histogram2d.builder import BinnedHistogram, Histogram2DContourSettings
+from histogram2d.raster import RasterSettings, encode_png, render_text
+
+
+@fixture
+def sample_binned() -> BinnedHistogram:
+    return BinnedHistogram(
+        counts=np.arange(12, dtype=float).reshape(3, 4),
+        x_edges=np.arange(5, dtype=float),
+        y_edges=np.arange(4, dtype=float) / 10,
+    )
+
+
+def test_encode_png():
+    # Arrange
+    image = np.zeros((2, 3, 3), dtype=np.uint8)
+    image[1, 2] = [255, 0, 10]
+
+    # Act
+    content = encode_png(image)
+
+    # Assert: signature, header and decompressed scanlines
+    assert content.startswith(b"\x89PNG\r\n\x1a\n")
+    width, height = struct.unpack(">II", content[16:24])
+    assert (width, height) == (3, 2)
+    idat_length = struct.unpack(">I", content[33:37])[0]
+    scanlines = zlib.decompress(content[41 : 41 + idat_length])
+    assert len(scanlines) == 2 * (1 + 3 * 3)
+    assert scanlines[-3:] == bytes([255, 0, 10])
+
+
+def test_render_text():
+    mask = render_text("ab1", scale=2)
+    assert mask.shape == (10, 2 * (3 * 3 + 2))
+    assert mask.any()
+
+
+def test_render_grid(sample_binned):
+    # Arrange
+    raster = RasterSettings(panel_width=300, panel_height=200)
+    settings = Histogram2DContourSettings(hist_colorbar_min=None, hist_colorbar_max=None)
+
+    # Act
+    image = raster.render_grid([sample_binned] * 4, ["A", "B", "C", "D"], settings)
+
+    # Assert: 3 columns and 2 rows of panels
+    assert image.shape == (400, 900, 3)
+    assert image.dtype == np.uint8
+    # the last slot of the grid is left blank
+    assert (image[200:, 600:] == 255).all()
+    assert not (image[:200, :300] == 255).all()
+
+
+def test_render_png(sample_binned):
+    content = RasterSettings().render_png([sample_binned], ["A"], Histogram2DContourSettings())
+    assert content.startswith(b"\x89PNG")
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from pytest import fixture
+
+from histogram2d.builder import BinnedHistogram, Histogram2DContourSettings
+from histogram2d.sampling import SamplingSettings
+
+
+@fixture
+def sample_large_df() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"x": rng.normal(size=5000), "y": rng.normal(size=5000), "z": 1.0})
+
+
+def test_reservoir_sample_is_uniform():
+    # Arrange
+    values = np.arange(100)[:, None]
+    inclusions = np.zeros(100)
+
+    # Act
+    for seed in range(2000):
+        settings = SamplingSettings(sample_size=10, chunk_size=7, seed=seed)
+        sample, seen = settings.reservoir_sample(
+            values[start : start + 7] for start in range(0, 100, 7)
+        )
+        inclusions[sample[:, 0]] += 1
+
+    # Assert: rows without repetition, each row sampled 10% of the times
+    assert seen == 100
+    assert len(np.unique(sample[:, 0])) == 10
+    assert np.abs(inclusions / 2000 - 0.1).max() < 0.04
+
+
+def test_reservoir_sample_smaller_than_sample_size():
+    sample, seen = SamplingSettings(sample_size=10).reservoir_sample([np.arange(4)[:, None]])
+    assert seen == 4
+    assert sample[:, 0].tolist() == [0, 1, 2, 3]
+
+
+def test_sample(sample_large_df):
+    # Arrange
+    settings = SamplingSettings(sample_size=500, row_threshold=1000, chunk_size=300, seed=1)
+
+    # Act
+    sample_df = settings.sample(sample_large_df, ["x", "y"])
+
+    # Assert
+    assert sample_df.shape == (500, 2)
+    assert settings.get_sampling_metadata(sample_df) == {
+        "sampled_rows": 500,
+        "total_rows": 5000,
+        "weight": 10,
+    }
+    # groups below the threshold are kept as they are
+    small_df = sample_large_df.head(1000)
+    assert settings.sample(small_df, ["x", "y"]) is small_df
+
+
+def test_sampled_count_histogram_is_scaled(sample_large_df):
+    # Arrange
+    settings = SamplingSettings(sample_size=500, row_threshold=1000, seed=1)
+    histogram = Histogram2DContourSettings(x_axis_title="x", y_axis_title="y", normalized=False)
+    sample_df = settings.sample(sample_large_df, ["x", "y"])
+
+    # Act
+    trace = histogram.create_count_histogram2dcontour(sample_df)
+    binned = histogram.bin_dataframe(sample_df)
+
+    # Assert
+    assert trace.histfunc == "sum"
+    assert (np.asarray(trace.z) == 10).all()
+    assert trace.meta["total_rows"] == 5000
+    assert binned.counts.sum() == 5000
+
+
+def test_estimate_error():
+    # Arrange
+    binned = BinnedHistogram(
+        counts=np.array([[50.0, 50.0]]), x_edges=np.arange(3.0), y_edges=np.arange(2.0)
+    )
+    settings = SamplingSettings(confidence_z=1)
+
+    # Act and Assert: standard error of a proportion of 0.5 over 100 rows is 5%
+    assert np.allclose(settings.estimate_error(binned, 100, 10**9), 5, atol=1e-3)
+    # no error when all the rows were sampled
+    assert np.allclose(settings.estimate_error(binned, 100, 100), 0)
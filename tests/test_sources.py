@@ -0,0 +1,77 @@
+import bz2
+import gzip
+import io
+import lzma
+
+import pandas as pd
+from pytest import fixture, mark, raises
+
+from histogram2d.backends import get_backend
+from histogram2d.sources import get_data_format, open_data_source, split_compression
+
+CSV_CONTENT = b"A,,B,\nF1,F2,F1,F2\n1,2,3,4\n5,6,7,8\n"
+
+
+@fixture
+def write_compressed_csvs(tmp_path) -> dict:
+    paths = {}
+    for suffix, compress in [
+        ("csv", lambda content: content),
+        ("csv.gz", gzip.compress),
+        ("csv.bz2", bz2.compress),
+        ("csv.xz", lzma.compress),
+    ]:
+        path = tmp_path / f"data.{suffix}"
+        path.write_bytes(compress(CSV_CONTENT))
+        paths[suffix] = str(path)
+    return paths
+
+
+def test_split_compression():
+    assert split_compression("data.csv.gz") == ("data.csv", "gzip")
+    assert split_compression("data.CSV.ZST") == ("data.CSV", "zstd")
+    assert split_compression("data.xlsx") == ("data.xlsx", None)
+
+
+def test_get_data_format():
+    assert get_data_format("data.csv.bz2") == "csv"
+    assert get_data_format("data.xlsx") == "excel"
+    assert get_data_format("-") == "csv"
+    assert get_data_format(io.BytesIO(CSV_CONTENT)) == "csv"
+    with raises(ValueError):
+        get_data_format("data.png.gz")
+
+
+def test_open_data_source(write_compressed_csvs):
+    for path in write_compressed_csvs.values():
+        with open_data_source(path) as stream:
+            assert stream.read() == CSV_CONTENT
+
+
+def test_open_data_source_file_object():
+    # a compressed file object is decompressed by its name
+    stream = io.BytesIO(gzip.compress(CSV_CONTENT))
+    stream.name = "data.csv.gz"
+    with open_data_source(stream, seekable=True) as uncompressed:
+        assert uncompressed.read() == CSV_CONTENT
+
+
+@mark.parametrize("backend_name", ["pandas", "pyarrow"])
+def test_read_compressed_groups(write_compressed_csvs, backend_name):
+    backend = get_backend(backend_name)
+    expected_dfs, expected_groups = backend.read_groups(write_compressed_csvs["csv"])
+    for path in write_compressed_csvs.values():
+        dfs, groups = backend.read_groups(path)
+        assert groups == expected_groups == ["A", "B"]
+        for df, expected_df in zip(dfs, expected_dfs):
+            pd.testing.assert_frame_equal(
+                df.reset_index(drop=True).astype(float),
+                expected_df.reset_index(drop=True).astype(float),
+            )
+
+
+def test_read_stdin(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(CSV_CONTENT)))
+    dfs, groups = get_backend("pandas").read_groups("-")
+    assert groups == ["A", "B"]
+    assert dfs[1]["F2"].tolist() == [4, 8]
@@ -0,0 +1,71 @@
+import numpy as np
+from pytest import fixture, raises
+
+from histogram2d.builder import BinnedHistogram
+from histogram2d.parallel import ParallelSettings
+from histogram2d.uncertainty import UncertaintySettings
+
+
+@fixture
+def sample_binned() -> list[BinnedHistogram]:
+    edges = np.arange(3, dtype=float)
+    return [
+        BinnedHistogram(
+            counts=np.array([[100.0, 300.0], [0.0, 600.0]]), x_edges=edges, y_edges=edges
+        ),
+        BinnedHistogram(counts=np.array([[0.0, 0.0], [0.0, 50.0]]), x_edges=edges, y_edges=edges),
+    ]
+
+
+def test_compute_standard_error(sample_binned):
+    # Act
+    grids = UncertaintySettings(number_of_resamples=4000, seed=0).compute(sample_binned)
+
+    # Assert: the bootstrap error of a percentage p of n points is close to sqrt(p (100 - p) / n)
+    assert grids["percentage"].shape == (2, 2, 2)
+    np.testing.assert_allclose(grids["percentage"][0], [[10, 30], [0, 60]])
+    expected = np.sqrt(grids["percentage"][0] * (100 - grids["percentage"][0]) / 1000)
+    np.testing.assert_allclose(grids["se"][0], expected, rtol=0.1)
+    # empty bins and bins holding the whole group have no spread
+    np.testing.assert_array_equal(grids["se"][1], np.zeros((2, 2)))
+
+
+def test_compute_confidence_interval(sample_binned):
+    settings = UncertaintySettings(statistic="ci", seed=0)
+
+    grids = settings.compute(sample_binned)
+
+    assert settings.get_grid_names() == ["ci_lower", "ci_upper"]
+    assert np.all(grids["ci_lower"] <= grids["percentage"])
+    assert np.all(grids["percentage"] <= grids["ci_upper"])
+    np.testing.assert_array_equal(grids["ci_lower"][1], grids["percentage"][1])
+    assert np.all(settings.get_map(grids)[0][grids["percentage"][0] > 0] > 0)
+    assert settings.get_map_label() == "95% CI width (pp)"
+
+
+def test_compute_does_not_depend_on_chunks_executor(sample_binned):
+    settings = UncertaintySettings(seed=1, max_chunk_size=2000)
+
+    serial = settings.compute(sample_binned)
+    threaded = settings.compute(sample_binned, ParallelSettings(mode="thread", max_workers=2))
+
+    np.testing.assert_array_equal(serial["se"], threaded["se"])
+
+
+def test_get_table(sample_binned):
+    settings = UncertaintySettings(seed=0)
+
+    table = settings.get_table(settings.compute(sample_binned), sample_binned, ["A", "B"])
+
+    assert len(table) == 8
+    assert table["se"].iloc[3] > 0
+    assert table["se"].iloc[4:].eq(0).all()
+
+
+def test_invalid_settings():
+    with raises(ValueError):
+        UncertaintySettings(statistic="variance")
+    with raises(ValueError):
+        UncertaintySettings(confidence=1.5)
+    with raises(ValueError):
+        UncertaintySettings(number_of_resamples=1)
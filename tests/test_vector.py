@@ -0,0 +1,92 @@
+import zlib
+
+import numpy as np
+from pytest import fixture
+
+from histogram2d.builder import BinnedHistogram, Histogram2DContourSettings
+from histogram2d.vector import VectorSettings, encode_pdf, get_nice_ticks, marching_squares
+from histogram2d.visualize import VisualizeSettings
+
+
+@fixture
+def sample_binned() -> BinnedHistogram:
+    counts = np.zeros((7, 7))
+    counts[1:6, 1:6] = 1
+    counts[2:5, 2:5] = 4
+    counts[3, 3] = 0
+    return BinnedHistogram(
+        counts=counts, x_edges=np.arange(8, dtype=float), y_edges=np.arange(8, dtype=float)
+    )
+
+
+def is_inside(point: tuple[float, float], outlines: list[np.ndarray]) -> bool:
+    # even-odd rule, as the outlines are filled
+    crossings = 0
+    x, y = point
+    for outline in outlines:
+        for (x1, y1), (x2, y2) in zip(outline, np.roll(outline, -1, axis=0)):
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                crossings += 1
+    return crossings % 2 == 1
+
+
+def test_marching_squares(sample_binned):
+    # Arrange
+    z = sample_binned.counts
+    x, y = sample_binned.x_centers, sample_binned.y_centers
+
+    # Act
+    outlines = marching_squares(z, x, y, level=2)
+
+    # Assert: a ring with a hole, and every node above the level is filled
+    assert len(outlines) == 2
+    for i in range(1, z.shape[0] - 1):
+        for j in range(1, z.shape[1] - 1):
+            assert is_inside((x[j], y[i]), outlines) == (z[i, j] >= 2)
+
+
+def test_marching_squares_without_contour():
+    assert marching_squares(np.zeros((3, 3)), np.arange(3.0), np.arange(3.0), level=0.5) == []
+
+
+def test_marching_squares_closes_on_border():
+    z = np.ones((3, 3))
+    outlines = marching_squares(z, np.arange(3.0), np.arange(3.0), level=0.5)
+    assert len(outlines) == 1
+    assert is_inside((1.0, 1.0), outlines)
+
+
+def test_get_nice_ticks():
+    assert get_nice_ticks(0, 10) == [0, 2, 4, 6, 8, 10]
+    assert get_nice_ticks(0.13, 0.61) == [0.2, 0.3, 0.4, 0.5, 0.6]
+
+
+def test_render_svg(sample_binned):
+    settings = Histogram2DContourSettings(hist_colorbar_min=None, hist_colorbar_max=None)
+    content = (
+        VectorSettings()
+        .render([sample_binned] * 2, ["A", "B"], settings, VisualizeSettings(), "svg")
+        .decode("utf-8")
+    )
+    assert content.startswith("<svg")
+    assert content.count(">A</text>") == 1
+    assert 'fill-rule="evenodd"' in content
+
+
+def test_encode_pdf(sample_binned):
+    # Arrange
+    settings = Histogram2DContourSettings()
+    canvas = VectorSettings().build_canvas(
+        [sample_binned], ["A (1)"], settings, VisualizeSettings()
+    )
+
+    # Act
+    content = encode_pdf([canvas, canvas])
+
+    # Assert: two pages, the text escaped in the content streams
+    assert content.startswith(b"%PDF-1.4")
+    assert content.rstrip().endswith(b"%%EOF")
+    assert b"/Count 2" in content
+    start = content.index(b"stream\n") + len(b"stream\n")
+    stream = zlib.decompress(content[start : content.index(b"\nendstream")])
+    assert b"(A \\(1\\)) Tj" in stream